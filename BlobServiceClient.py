@@ -1,6 +1,6 @@
 # Author: Ashish Porwal
 # Date Created: 06/Aug/2023
-# Date Modified: 06/Aug/2023
+# Date Modified: 17/Oct/2026
 
 # Install library - pip install azure-storage-blob
 # In this we connect with Connection string
@@ -64,12 +64,27 @@ Configuration:
 import time
 from datetime import datetime, timedelta
 from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient
+from client_factory import load_config, get_blob_service_client, factory_stats, close_all_clients
+from instrumentation import instrumented
 
-# Set your blob account connection string
-connect_str = "YOUR_CONNECTION_STRING"
+# Set your blob account connection string - it is read from config.ini ([connection_string] > your_conn_string)
+connect_str = load_config()['connection_string']['your_conn_string']
 
-# Create the BlobServiceClient object which will be used to create a container client
-blob_service_client = BlobServiceClient.from_connection_string(connect_str)
+# Create the BlobServiceClient object which will be used to create a container client.
+# client_factory keeps one client per account on top of one shared HTTP connection pool,
+# so asking for it again anywhere in the code returns the same client (no new connections / TLS handshakes).
+# With [instrumentation] enabled=true in config.ini its requests are measured as well (instrumentation.py),
+# and the bigger helpers below are timed as a whole with @instrumented.
+blob_service_client = get_blob_service_client(connect_str)
+
+# Helpers and examples below that change blobs (upload, delete, undelete, metadata, copy) call notify_blob_changed,
+# so anything that keeps blob information around (like the properties cache further down)
+# can drop what is stale. blob_name=None means the whole container changed.
+blob_change_hooks = []
+
+def notify_blob_changed(container_name, blob_name=None):
+    for hook in blob_change_hooks:
+        hook(container_name, blob_name)
 
 
 # --------------------------------------------------------------------------------
@@ -108,6 +123,220 @@ def list_all_blobs_in_all_containers():
 
 list_all_blobs_in_all_containers()
 
+# --------------------------------------------------------------------------------
+# listing all blobs in all containers in parallel (asyncio)
+# --------------------------------------------------------------------------------
+
+# Above function lists containers one after another, so total time is the sum of all listings.
+# With the async clients (pip install aiohttp, as azure.storage.blob.aio needs it)
+# we can list many containers at the same time.
+
+#   * max_concurrency - how many containers are being listed at once.
+#   * queue_size - how many (container, blob) records can wait for the consumer.
+#     Listers pause when the queue is full, so memory stays bounded however many blobs there are.
+#   * Blobs of one container always come out in listing order, containers are interleaved.
+
+import asyncio
+from client_factory import get_async_blob_service_client
+
+_LISTER_DONE = object()
+
+
+async def list_all_blobs_async(async_blob_service_client, max_concurrency=16, queue_size=1000):
+    container_names = asyncio.Queue(maxsize=max_concurrency)
+    records = asyncio.Queue(maxsize=queue_size)
+
+    async def feed_container_names():
+        try:
+            async for container in async_blob_service_client.list_containers():
+                await container_names.put(container['name'])
+        except Exception as e:
+            await records.put(e)
+        for _ in range(max_concurrency):
+            await container_names.put(None)  # one stop signal per lister
+
+    async def lister():
+        try:
+            while True:
+                container_name = await container_names.get()
+                if container_name is None:
+                    break
+                container_client = async_blob_service_client.get_container_client(container_name)
+                async for blob in container_client.list_blobs():
+                    await records.put((container_name, blob))
+        except Exception as e:
+            await records.put(e)
+        await records.put(_LISTER_DONE)
+
+    tasks = [asyncio.create_task(feed_container_names())]
+    tasks += [asyncio.create_task(lister()) for _ in range(max_concurrency)]
+    try:
+        running = max_concurrency
+        while running:
+            record = await records.get()
+            if record is _LISTER_DONE:
+                running -= 1
+            elif isinstance(record, Exception):
+                raise record
+            else:
+                yield record
+    finally:
+        # if the caller stops early (or something failed) don't leave listers running
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def print_all_blobs_in_all_containers_async():
+    async with get_async_blob_service_client(connect_str) as async_client:
+        async for container_name, blob in list_all_blobs_async(async_client, max_concurrency=32):
+            print(f"{container_name}/{blob.name}")
+
+asyncio.run(print_all_blobs_in_all_containers_async())
+
+# --------------------------------------------------------------------------------
+# Local blob inventory (SQLite) with incremental refresh
+# --------------------------------------------------------------------------------
+
+# Every listing above goes to the storage account again. If we mostly ask questions like
+# "which blobs under logs/ are bigger than 1 GB" or "what is older than 90 days",
+# we can keep an inventory in a local SQLite file and answer those queries locally in milliseconds.
+
+# Refresh is incremental:
+#   * each container is split into shards by name prefix (name_starts_with), shards are listed in parallel,
+#     and we can refresh only the shards we care about.
+#   * a row is only written when the blob is new or its etag changed,
+#     and blobs that disappeared from a shard are removed from the inventory.
+
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+
+def open_blob_inventory(path="blob_inventory.db"):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            container TEXT NOT NULL,
+            name TEXT NOT NULL,
+            size INTEGER,
+            etag TEXT,
+            last_modified REAL,
+            tier TEXT,
+            PRIMARY KEY (container, name)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS blobs_size ON blobs (container, size)")
+    conn.execute("CREATE INDEX IF NOT EXISTS blobs_last_modified ON blobs (container, last_modified)")
+    conn.commit()
+    return conn
+
+
+def _prefix_range(prefix):
+    # all names starting with prefix are >= prefix and < prefix with its last character bumped by one
+    if not prefix:
+        return None, None
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _list_shard(container_name, prefix):
+    container_client = blob_service_client.get_container_client(container_name)
+    return [
+        (blob.name, blob.size, blob.etag, blob.last_modified.timestamp() if blob.last_modified else None, blob.blob_tier)
+        for blob in container_client.list_blobs(name_starts_with=prefix or None)
+    ]
+
+
+def _apply_shard(conn, container_name, prefix, listed, summary):
+    low, high = _prefix_range(prefix)
+    sql = "SELECT name, etag FROM blobs WHERE container = ?"
+    params = [container_name]
+    if low is not None:
+        sql += " AND name >= ? AND name < ?"
+        params += [low, high]
+    known_etags = dict(conn.execute(sql, params))
+
+    changed = []
+    for row in listed:
+        old_etag = known_etags.pop(row[0], None)
+        if old_etag != row[2]:
+            summary['updated' if old_etag else 'added'] += 1
+            changed.append((container_name,) + row)
+    # whatever is left in known_etags was not listed anymore - it has been deleted
+    conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", changed)
+    conn.executemany("DELETE FROM blobs WHERE container = ? AND name = ?",
+                     [(container_name, name) for name in known_etags])
+    summary['removed'] += len(known_etags)
+    summary['listed'] += len(listed)
+    conn.commit()
+
+
+@instrumented("refresh_blob_inventory")
+def refresh_blob_inventory(conn, container_names=None, shard_prefixes=("",), max_workers=8):
+    # shard_prefixes should not overlap, e.g. ("2024/", "2025/", "2026/") or ("a", "b", ..., "z")
+    start = time.time()
+    summary = {'listed': 0, 'added': 0, 'updated': 0, 'removed': 0}
+
+    refresh_all = container_names is None
+    if refresh_all:
+        container_names = [container['name'] for container in blob_service_client.list_containers()]
+        # drop containers that do not exist anymore
+        gone = [name for (name,) in conn.execute("SELECT DISTINCT container FROM blobs")
+                if name not in set(container_names)]
+        for name in gone:
+            summary['removed'] += conn.execute("DELETE FROM blobs WHERE container = ?", (name,)).rowcount
+        conn.commit()
+
+    # listing happens in worker threads, all SQLite writes stay on this thread
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        shards = {
+            executor.submit(_list_shard, container_name, prefix): (container_name, prefix)
+            for container_name in container_names
+            for prefix in shard_prefixes
+        }
+        for future, (container_name, prefix) in shards.items():
+            _apply_shard(conn, container_name, prefix, future.result(), summary)
+
+    summary['elapsed_seconds'] = round(time.time() - start, 3)
+    return summary
+
+
+def query_blob_inventory(conn, container=None, prefix=None, min_size=None, max_size=None,
+                         older_than_days=None, newer_than_days=None):
+    sql = "SELECT container, name, size, etag, last_modified, tier FROM blobs WHERE 1 = 1"
+    params = []
+    if container is not None:
+        sql += " AND container = ?"
+        params.append(container)
+    low, high = _prefix_range(prefix)
+    if low is not None:
+        sql += " AND name >= ? AND name < ?"
+        params += [low, high]
+    if min_size is not None:
+        sql += " AND size >= ?"
+        params.append(min_size)
+    if max_size is not None:
+        sql += " AND size <= ?"
+        params.append(max_size)
+    if older_than_days is not None:
+        sql += " AND last_modified < ?"
+        params.append(time.time() - older_than_days * 86400)
+    if newer_than_days is not None:
+        sql += " AND last_modified >= ?"
+        params.append(time.time() - newer_than_days * 86400)
+    return conn.execute(sql + " ORDER BY container, name", params).fetchall()
+
+
+inventory = open_blob_inventory("blob_inventory.db")
+print(refresh_blob_inventory(inventory))
+
+# only refresh one container, split into shards listed in parallel
+print(refresh_blob_inventory(inventory, ["your_container_name"], shard_prefixes=("2024/", "2025/", "2026/")))
+
+# answered from the local file, no calls to the storage account
+for container, name, size, etag, last_modified, tier in query_blob_inventory(
+        inventory, prefix="logs/", min_size=1024 * 1024 * 1024, older_than_days=90):
+    print(f"{container}/{name} - {size} bytes - {tier}")
+
 # --------------------------------------------------------------------------------
 # Creating container
 # --------------------------------------------------------------------------------
@@ -131,6 +360,7 @@ def delete_existing_container(container_name):
     try:
         # Delete the container
         blob_service_client.delete_container(container_name)
+        notify_blob_changed(container_name)
         print(f"Container '{container_name}' deleted successfully.")
     except Exception as e:
         print(f"Error deleting container '{container_name}'. {e}")
@@ -153,6 +383,124 @@ blob_client = blob_service_client.get_blob_client(container=container_name, blob
 
 with open("your_file_path", "rb") as data:
     blob_client.upload_blob(data)
+notify_blob_changed(blob_client.container_name, blob_client.blob_name)
+
+# --------------------------------------------------------------------------------
+# Upload a large file in parallel blocks (with resume)
+# --------------------------------------------------------------------------------
+
+# upload_blob with default settings sends a multi-GB file as one slow stream.
+# A block blob can instead be uploaded as many blocks (stage_block) in parallel,
+# and the blob only appears once we commit the list of blocks (commit_block_list).
+
+#   * The file is memory-mapped, and each block is read straight out of the mapping,
+#     so we never hold whole blocks as Python bytes.
+#   * Staged but uncommitted blocks are kept by the service for about a week,
+#     so after a failure we ask for the uncommitted block list and only send the blocks that are missing.
+#   * Block ids carry a fingerprint of the file (size + modified time),
+#     so blocks left over from a different version of the file are never reused.
+
+import hashlib
+import io
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from azure.core.exceptions import ResourceNotFoundError
+
+
+class _MemoryViewReader(io.RawIOBase):
+    # read-only, seekable file object over a slice of the mmap (seekable so the SDK can retry a block)
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        self.position = max(0, min(offset, len(self.view)))
+        return self.position
+
+    def readinto(self, buffer):
+        chunk = self.view[self.position:self.position + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self.position += len(chunk)
+        return len(chunk)
+
+    def __len__(self):
+        return len(self.view)
+
+    def close(self):
+        # the mmap can only be closed once no slice of it is alive anymore
+        self.view.release()
+        super().close()
+
+
+@instrumented("upload_large_file")
+def upload_large_file(blob_client, file_path, block_size=8 * 1024 * 1024, max_workers=8, **commit_kwargs):
+    start = time.time()
+    stat = os.stat(file_path)
+    if stat.st_size == 0:
+        blob_client.upload_blob(b"", overwrite=True, **commit_kwargs)
+        notify_blob_changed(blob_client.container_name, blob_client.blob_name)
+        return {'blocks': 0, 'reused_blocks': 0, 'bytes_uploaded': 0, 'elapsed_seconds': 0, 'mb_per_second': 0}
+
+    # all block ids of a blob must have the same length
+    fingerprint = hashlib.md5(f"{stat.st_size}:{stat.st_mtime_ns}:{block_size}".encode()).hexdigest()[:16]
+    blocks = [
+        (f"{fingerprint}-{index:08d}", offset, min(block_size, stat.st_size - offset))
+        for index, offset in enumerate(range(0, stat.st_size, block_size))
+    ]
+
+    # resume - blocks that are already staged with the right size don't need to be sent again
+    try:
+        _, uncommitted = blob_client.get_block_list(block_list_type="uncommitted")
+        already_staged = {block.id: block.size for block in uncommitted}
+    except ResourceNotFoundError:
+        already_staged = {}
+    missing = [block for block in blocks if already_staged.get(block[0]) != block[2]]
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            def stage(block):
+                block_id, offset, length = block
+                with _MemoryViewReader(view[offset:offset + length]) as reader:
+                    blob_client.stage_block(block_id, reader, length=length)
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # list() re-raises the first failed block; leaving the with block still waits for the other
+                # blocks, and the ones that got staged are skipped by the next run (nothing is committed)
+                list(executor.map(stage, missing))
+        finally:
+            view.release()
+
+    blob_client.commit_block_list([block[0] for block in blocks], **commit_kwargs)
+    notify_blob_changed(blob_client.container_name, blob_client.blob_name)
+
+    elapsed = time.time() - start
+    bytes_uploaded = sum(block[2] for block in missing)
+    result = {
+        'blocks': len(blocks),
+        'reused_blocks': len(blocks) - len(missing),
+        'bytes_uploaded': bytes_uploaded,
+        'elapsed_seconds': round(elapsed, 3),
+        'mb_per_second': round(bytes_uploaded / (1024 * 1024) / max(elapsed, 0.001), 2),
+    }
+    print(f"Uploaded {file_path}: {result['mb_per_second']} MB/s ({result['reused_blocks']} blocks reused)")
+    return result
+
+upload_large_file(blob_client, "your_large_file_path", block_size=16 * 1024 * 1024, max_workers=16)
 
 # --------------------------------------------------------------------------------
 # Download a Blob:
@@ -162,11 +510,200 @@ with open("destination_file_path", "wb") as my_blob:
     blob_data = blob_client.download_blob()
     blob_data.readinto(my_blob)
 
+# --------------------------------------------------------------------------------
+# Download a large Blob in parallel ranges
+# --------------------------------------------------------------------------------
+
+# For big blobs we can read the size from the blob properties, create the destination file
+# with that size up front, and download byte ranges at the same time from a thread pool.
+# Every chunk is written straight at its offset in the file (os.pwrite, or a writable mmap where pwrite
+# is not available, e.g. on Windows), so there is no intermediate buffer holding a whole range.
+
+#   * A range that fails is retried on its own, the rest of the download is not repeated.
+#   * All ranges are requested with the etag we read first - if the blob is changed in the middle
+#     of the download we fail instead of mixing two versions of the blob.
+#   * verify_md5 checks the assembled file against the blob's Content-MD5. The service only stores
+#     one MD5 for the whole blob (there is no whole-blob CRC64), and only if it was set on upload.
+#     validate_content=True additionally checks a transactional MD5 on every range (ranges up to 4 MB).
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceModifiedError
+
+
+@instrumented("download_blob_in_ranges")
+def download_blob_in_ranges(blob_client, destination_path, range_size=16 * 1024 * 1024, max_workers=8,
+                            retries=3, verify_md5=False, validate_content=False):
+    start = time.time()
+    properties = blob_client.get_blob_properties()
+    size = properties.size
+    ranges = [(offset, min(range_size, size - offset)) for offset in range(0, size, range_size)]
+
+    with open(destination_path, "wb+") as f:
+        # preallocate, so writes at any offset never have to grow the file
+        if hasattr(os, "posix_fallocate") and size:
+            os.posix_fallocate(f.fileno(), 0, size)
+        else:
+            f.truncate(size)
+
+        mapped = None
+        if size and not hasattr(os, "pwrite"):
+            mapped = mmap.mmap(f.fileno(), size)
+
+        def write_at(offset, chunk):
+            if mapped is None:
+                os.pwrite(f.fileno(), chunk, offset)
+            else:
+                mapped[offset:offset + len(chunk)] = chunk
+
+        def fetch(block_range):
+            offset, length = block_range
+            for attempt in range(retries + 1):
+                try:
+                    downloader = blob_client.download_blob(
+                        offset=offset, length=length, validate_content=validate_content,
+                        etag=properties.etag, match_condition=MatchConditions.IfNotModified
+                    )
+                    position = offset
+                    for chunk in downloader.chunks():
+                        write_at(position, chunk)
+                        position += len(chunk)
+                    return attempt  # number of retries this range needed
+                except ResourceModifiedError:
+                    raise  # the blob changed, retrying the range would not help
+                except Exception as e:
+                    if attempt == retries:
+                        raise
+                    print(f"Range {offset}-{offset + length - 1} failed ({e}), retrying...")
+                    time.sleep(0.5 * 2 ** attempt)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                retried = sum(executor.map(fetch, ranges))
+        finally:
+            if mapped is not None:
+                mapped.flush()
+                mapped.close()
+
+    elapsed = time.time() - start
+    result = {
+        'bytes': size,
+        'ranges': len(ranges),
+        'retried_ranges': retried,
+        'elapsed_seconds': round(elapsed, 3),
+        'mb_per_second': round(size / (1024 * 1024) / max(elapsed, 0.001), 2),
+        'md5_verified': None,
+    }
+
+    if verify_md5:
+        expected_md5 = properties.content_settings.content_md5
+        if not expected_md5:
+            print("Blob has no Content-MD5 stored, skipping verification.")
+        else:
+            md5 = hashlib.md5()
+            with open(destination_path, "rb") as f:
+                for chunk in iter(lambda: f.read(8 * 1024 * 1024), b""):
+                    md5.update(chunk)
+            result['md5_verified'] = md5.digest() == bytes(expected_md5)
+            if not result['md5_verified']:
+                raise ValueError(f"MD5 mismatch for downloaded file {destination_path}")
+
+    print(f"Downloaded {destination_path}: {result['mb_per_second']} MB/s")
+    return result
+
+download_blob_in_ranges(blob_client, "destination_file_path", range_size=32 * 1024 * 1024, max_workers=16, verify_md5=True)
+
 # --------------------------------------------------------------------------------
 # Delete a Blob:
 # --------------------------------------------------------------------------------
 
 blob_client.delete_blob()
+notify_blob_changed(blob_client.container_name, blob_client.blob_name)
+
+# --------------------------------------------------------------------------------
+# Delete many Blobs with batch requests
+# --------------------------------------------------------------------------------
+
+# delete_blob is one HTTP call per blob. ContainerClient.delete_blobs sends up to 256 deletes
+# as sub-requests of one batch request, and gives back one response (status code) per blob.
+
+#   * blobs - iterable of blob names, or dicts like {'name': ..., 'snapshot': ...} / {'name': ..., 'etag': ...},
+#     or give a prefix instead and the container listing is streamed into the batches.
+#   * delete_snapshots - None, 'include' (delete the blob and its snapshots) or 'only' (just the snapshots).
+#     Without it, blobs that have snapshots fail with 409.
+#   * Only sub-requests that failed with a retryable status (throttling / server busy) are sent again.
+#   * on_done(blob, status) is called with the final status of every blob.
+
+from collections import Counter
+from concurrent.futures import wait, FIRST_COMPLETED
+from itertools import islice
+from azure.core.exceptions import HttpResponseError
+
+BATCH_DELETE_LIMIT = 256
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def _delete_batch(container_client, blobs, delete_snapshots, retries, on_done=None):
+    statuses = Counter()
+    for attempt in range(retries + 1):
+        try:
+            responses = list(container_client.delete_blobs(
+                *blobs, delete_snapshots=delete_snapshots, raise_on_any_failure=False
+            ))
+            results = [(blob, response.status_code) for blob, response in zip(blobs, responses)]
+        except HttpResponseError as e:
+            # the whole batch request failed, so every sub-request gets the batch status
+            results = [(blob, e.status_code or 500) for blob in blobs]
+
+        retry = [blob for blob, status in results if status in RETRYABLE_STATUSES]
+        for blob, status in results:
+            if status not in RETRYABLE_STATUSES or attempt == retries:
+                statuses[status] += 1
+                if on_done:
+                    on_done(blob, status)
+            if status in (202, 404):
+                notify_blob_changed(container_client.container_name, blob['name'] if isinstance(blob, dict) else blob)
+        if not retry or attempt == retries:
+            break
+        blobs = retry
+        time.sleep(0.5 * 2 ** attempt)
+    return statuses
+
+
+@instrumented("bulk_delete_blobs")
+def bulk_delete_blobs(container_name, blobs=None, prefix=None, delete_snapshots=None, max_workers=8, retries=3,
+                      on_done=None):
+    start = time.time()
+    container_client = blob_service_client.get_container_client(container_name)
+    if blobs is None:
+        blobs = (blob.name for blob in container_client.list_blobs(name_starts_with=prefix))
+    blobs = iter(blobs)
+
+    statuses = Counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+        while True:
+            batch = list(islice(blobs, BATCH_DELETE_LIMIT))
+            if batch:
+                in_flight.add(executor.submit(_delete_batch, container_client, batch, delete_snapshots, retries, on_done))
+            # only keep a couple of batches per worker queued, the listing is consumed as we go
+            if in_flight and (len(in_flight) >= max_workers * 2 or not batch):
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    statuses.update(future.result())
+            if not batch and not in_flight:
+                break
+
+    elapsed = time.time() - start
+    return {
+        'statuses': dict(statuses),
+        'deleted': statuses[202],
+        'not_found': statuses[404],
+        'failed': sum(count for status, count in statuses.items() if status not in (202, 404)),
+        'elapsed_seconds': round(elapsed, 3),
+        'deletes_per_second': round(sum(statuses.values()) / max(elapsed, 0.001), 1),
+    }
+
+print(bulk_delete_blobs("your_container_name", prefix="expired/", delete_snapshots="include"))
 
 # --------------------------------------------------------------------------------
 # Restore soft delete
@@ -180,6 +717,7 @@ blob_client.delete_blob()
 
 # Restore the soft deleted blob
 blob_client.undelete_blob()
+notify_blob_changed(blob_client.container_name, blob_client.blob_name)
 
 # --------------------------------------------------------------------------------
 # copy blob to new location
@@ -197,27 +735,445 @@ def copy_blob_to_new_location(src_container_name, src_blob_name, dest_container_
 
     # Start the copy operation
     copy_operation = dest_blob_client.start_copy_from_url(src_blob_url)
-
-    # You can also check the copy status if needed
-    properties = dest_blob_client.get_blob_properties()
-    while properties['copy']['status'] != 'success':
-        time.sleep(1)
-        properties = dest_blob_client.get_blob_properties()
+    notify_blob_changed(dest_container_name, dest_blob_name)
+
+    # You can also check the copy status if needed.
+    # Copies inside one account often finish right away, so we check quickly first and back off after that.
+    # The status can also end as 'failed' or 'aborted' - stop waiting in that case too.
+    status = copy_operation['copy_status']
+    delay = 0.1
+    while status == 'pending':
+        time.sleep(delay)
+        delay = min(delay * 2, 5)
+        status = dest_blob_client.get_blob_properties()['copy']['status']
+
+    if status != 'success':
+        print(f"Copy of '{src_blob_name}' to '{dest_blob_name}' ended with status '{status}'.")
+    return status
 
 copy_blob_to_new_location("source_container", "source_blob.txt", "destination_container", "destination_blob.txt")
 
+# --------------------------------------------------------------------------------
+# copy many blobs at once
+# --------------------------------------------------------------------------------
+
+# Copying N blobs with the function above costs N waits one after another.
+# copy_blobs starts many copies at the same time and then checks every copy that is due in one
+# concurrent round, with its own exponential backoff (first_poll, doubling up to max_poll).
+
+#   * copies - iterable of (src_container, src_blob, dest_container, dest_blob) tuples, optionally with
+#     the source size as 5th item. It is consumed lazily, at most max_in_flight copies run at a time.
+#   * Optionally (small_blob_threshold=<bytes>) blobs up to that size are copied with upload_blob_from_url,
+#     which finishes in the same request. Put Blob From URL must be able to read the source (SAS or public URL).
+#     It is off by default: with a plain source URL every small blob would cost a get_blob_properties
+#     (unless the size is given) and a refused (403) upload before the normal copy starts.
+#     After the first 403 of a source container its other blobs go straight to start_copy_from_url.
+#   * on_done(copy, status, latency_seconds, description) is called for every finished copy.
+
+from concurrent.futures import wait, FIRST_COMPLETED
+from azure.core.exceptions import HttpResponseError
+from instrumentation import latency_stats
+
+
+def _start_copy(copy, small_blob_threshold, refused_containers):
+    src_blob_client = blob_service_client.get_blob_client(container=copy[0], blob=copy[1])
+    dest_blob_client = blob_service_client.get_blob_client(container=copy[2], blob=copy[3])
+
+    if small_blob_threshold and copy[0] not in refused_containers:
+        size = copy[4] if len(copy) > 4 else src_blob_client.get_blob_properties()['size']
+        if size <= small_blob_threshold:
+            try:
+                dest_blob_client.upload_blob_from_url(src_blob_client.url, overwrite=True)
+                return dest_blob_client, 'success'
+            except HttpResponseError as e:
+                if e.status_code != 403:
+                    raise
+                # the service could not read the source URL - use the asynchronous copy instead,
+                # and for the rest of this container too
+                refused_containers.add(copy[0])
+
+    copy_operation = dest_blob_client.start_copy_from_url(src_blob_client.url)
+    return dest_blob_client, copy_operation['copy_status']
+
+
+def _copy_status(dest_blob_client):
+    try:
+        copy_properties = dest_blob_client.get_blob_properties()['copy']
+        return copy_properties['status'], copy_properties['status_description']
+    except HttpResponseError as e:
+        return 'pending', str(e)  # a failed status check is not a failed copy, check again later
+
+
+@instrumented("copy_blobs")
+def copy_blobs(copies, small_blob_threshold=None, max_workers=16, max_in_flight=1000,
+               first_poll=0.2, max_poll=10, on_done=None):
+    start = time.time()
+    copies = enumerate(copies)
+    starting = {}  # future -> (index, copy, started)
+    pending = {}   # index -> [dest_blob_client, started, next_check, delay, copy]
+    refused_containers = set()  # source containers where upload_blob_from_url got a 403
+    counts = {'success': 0, 'failed': 0, 'aborted': 0}
+    latencies = []
+    exhausted = False
+
+    def finish(copy, status, started, description=None):
+        latency = time.time() - started
+        counts[status if status in counts else 'failed'] += 1
+        notify_blob_changed(copy[2], copy[3])
+        if status == 'success':
+            latencies.append(latency)
+        else:
+            print(f"Copy {copy[1]} -> {copy[3]} ended with status '{status}'. {description or ''}")
+        if on_done:
+            on_done(copy, status, latency, description)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            # keep the window of running copies full
+            while not exhausted and len(starting) + len(pending) < max_in_flight:
+                index, copy = next(copies, (None, None))
+                if copy is None:
+                    exhausted = True
+                else:
+                    starting[executor.submit(_start_copy, copy, small_blob_threshold, refused_containers)] = \
+                        (index, copy, time.time())
+            if exhausted and not starting and not pending:
+                break
+
+            for future in [future for future in starting if future.done()]:
+                index, copy, started = starting.pop(future)
+                try:
+                    dest_blob_client, status = future.result()
+                except Exception as e:
+                    finish(copy, 'failed', started, str(e))
+                    continue
+                if status == 'pending':
+                    pending[index] = [dest_blob_client, started, time.time() + first_poll, first_poll, copy]
+                else:
+                    finish(copy, status, started)
+
+            now = time.time()
+            due = [index for index, state in pending.items() if state[2] <= now]
+            if due:
+                # check all copies that are due in one concurrent round
+                statuses = executor.map(_copy_status, [pending[index][0] for index in due])
+                for index, (status, description) in zip(due, statuses):
+                    state = pending[index]
+                    if status == 'pending':
+                        state[3] = min(state[3] * 2, max_poll)
+                        state[2] = time.time() + state[3]
+                    else:
+                        del pending[index]
+                        finish(state[4], status, state[1], description)
+                continue
+
+            # nothing to check yet - sleep until the next check is due or a copy has been started
+            timeout = max(0, min((state[2] for state in pending.values()), default=now + 0.05) - now)
+            if starting:
+                wait(list(starting), timeout=timeout, return_when=FIRST_COMPLETED)
+            else:
+                time.sleep(timeout)
+
+    elapsed = time.time() - start
+    return {
+        **counts,
+        'latency_seconds': latency_stats(latencies),
+        'elapsed_seconds': round(elapsed, 3),
+        'copies_per_second': round(sum(counts.values()) / max(elapsed, 0.001), 1),
+    }
+
+copy_summary = copy_blobs([
+    ("source_container", "source_blob_1.txt", "destination_container", "destination_blob_1.txt"),
+    ("source_container", "source_blob_2.txt", "destination_container", "destination_blob_2.txt"),
+])
+print(copy_summary)
+
+# --------------------------------------------------------------------------------
+# copy / move a whole prefix between containers
+# --------------------------------------------------------------------------------
+
+# copy_prefix streams the listing of src_container/prefix straight into copy_blobs (so only
+# max_in_flight copies are queued at any time), and with move=True deletes every source blob
+# once its copy is verified (destination has the same size, source etag unchanged).
+
+# Progress goes into a checkpoint file so a rerun skips work that is already done:
+#   * blobs are listed in name order, so we only store the last name up to which everything is finished,
+#     plus the names that failed (those are tried again on the next run).
+#   * stats holds throughput and queue depth (in_flight = listed but not finished yet) while it runs.
+
+import json
+import threading
+from collections import OrderedDict
+
+
+def _load_prefix_checkpoint(checkpoint_path):
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return {'after': '', 'failed': []}
+    with open(checkpoint_path) as f:
+        return json.load(f)
+
+
+def _save_prefix_checkpoint(checkpoint_path, after, failed):
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'after': after, 'failed': sorted(failed)}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def _verify_and_delete_source(copy):
+    src_container_name, src_blob_name, dest_container_name, dest_blob_name, size, etag = copy
+    dest_blob_client = blob_service_client.get_blob_client(container=dest_container_name, blob=dest_blob_name)
+    if dest_blob_client.get_blob_properties()['size'] != size:
+        raise ValueError(f"Destination '{dest_blob_name}' does not match the source size, source kept.")
+    # only delete the source if nobody changed it after we listed it
+    src_blob_client = blob_service_client.get_blob_client(container=src_container_name, blob=src_blob_name)
+    src_blob_client.delete_blob(etag=etag, match_condition=MatchConditions.IfNotModified)
+    notify_blob_changed(src_container_name, src_blob_name)
+
+
+@instrumented("copy_prefix")
+def copy_prefix(src_container_name, prefix, dest_container_name, dest_prefix=None, move=False,
+                checkpoint_path=None, checkpoint_every=1000, report_every=30, stats=None, **copy_kwargs):
+    start = time.time()
+    checkpoint = _load_prefix_checkpoint(checkpoint_path)
+    retry_names = set(checkpoint['failed'])
+    failed = set()
+    outstanding = OrderedDict()  # listed names in listing order -> finished?
+    lock = threading.Lock()
+    progress = {'after': checkpoint['after'], 'finished_since_save': 0, 'last_report': start}
+    stats = stats if stats is not None else {}
+    stats.update({'listed': 0, 'skipped': 0, 'copied': 0, 'moved': 0, 'failed': 0, 'bytes': 0, 'in_flight': 0})
+
+    def mark_finished(copy, ok):
+        with lock:
+            outstanding[copy[1]] = True
+            if ok:
+                stats['moved' if move else 'copied'] += 1
+                stats['bytes'] += copy[4]
+                failed.discard(copy[1])
+                retry_names.discard(copy[1])
+            else:
+                stats['failed'] += 1
+                failed.add(copy[1])
+            # advance the "everything up to here is finished" mark
+            # (names retried from an earlier run can be behind the mark, it never moves back)
+            while outstanding and next(iter(outstanding.values())):
+                progress['after'] = max(progress['after'], outstanding.popitem(last=False)[0])
+            stats['in_flight'] = len(outstanding)
+
+            progress['finished_since_save'] += 1
+            if checkpoint_path and progress['finished_since_save'] >= checkpoint_every:
+                _save_prefix_checkpoint(checkpoint_path, progress['after'], failed | retry_names)
+                progress['finished_since_save'] = 0
+
+            now = time.time()
+            if now - progress['last_report'] >= report_every:
+                progress['last_report'] = now
+                elapsed = now - start
+                print(f"{stats['copied'] + stats['moved']} done, {stats['failed']} failed, "
+                      f"{stats['in_flight']} in flight, {round(stats['bytes'] / (1024 * 1024) / elapsed, 1)} MB/s")
+
+    def source_listing():
+        container_client = blob_service_client.get_container_client(src_container_name)
+        for blob in container_client.list_blobs(name_starts_with=prefix):
+            if blob.name <= checkpoint['after'] and blob.name not in retry_names:
+                stats['skipped'] += 1
+                continue
+            dest_blob_name = blob.name if dest_prefix is None else dest_prefix + blob.name[len(prefix):]
+            with lock:
+                outstanding[blob.name] = False
+                stats['listed'] += 1
+                stats['in_flight'] = len(outstanding)
+            yield (src_container_name, blob.name, dest_container_name, dest_blob_name, blob.size, blob.etag)
+
+    def delete_done(copy, future):
+        try:
+            future.result()
+            mark_finished(copy, True)
+        except Exception as e:
+            print(f"Could not move '{copy[1]}'. {e}")
+            mark_finished(copy, False)
+
+    with ThreadPoolExecutor(max_workers=8) as delete_executor:
+        def on_copy_done(copy, status, latency, description):
+            if status != 'success':
+                mark_finished(copy, False)
+            elif move:
+                future = delete_executor.submit(_verify_and_delete_source, copy)
+                future.add_done_callback(lambda future, copy=copy: delete_done(copy, future))
+            else:
+                mark_finished(copy, True)
+
+        copy_blobs(source_listing(), on_done=on_copy_done, **copy_kwargs)
+
+    if checkpoint_path:
+        _save_prefix_checkpoint(checkpoint_path, progress['after'], failed)
+    elapsed = time.time() - start
+    stats['elapsed_seconds'] = round(elapsed, 3)
+    stats['blobs_per_second'] = round((stats['copied'] + stats['moved']) / max(elapsed, 0.001), 1)
+    stats['mb_per_second'] = round(stats['bytes'] / (1024 * 1024) / max(elapsed, 0.001), 2)
+    return stats
+
+print(copy_prefix("source_container", "2025/", "archive_container", move=True, checkpoint_path="move_2025.json"))
+
+# --------------------------------------------------------------------------------
+# Cache blob properties / metadata
+# --------------------------------------------------------------------------------
+
+# get_blob_properties is one HTTP call every time, even when we just asked for the same blob.
+# BlobPropertiesCache keeps the answers in memory, keyed by (container, blob, snapshot):
+#   * every entry lives for ttl seconds (per entry, can be given on get). Snapshots never change,
+#     so snapshot entries never expire.
+#   * after the ttl we revalidate with the etag (If-None-Match) - if the blob did not change, the service
+#     answers 304 without a body and the entry is good for another ttl (stats 'revalidated'); if it did,
+#     the same request returns the new properties (stats 'modified').
+#   * least recently used entries are evicted once the (estimated) size goes over max_bytes.
+#   * it registers itself in blob_change_hooks, so uploads, deletes, metadata updates and copies done through
+#     the helpers in this file drop the cached entry right away.
+#   * an invalidation that arrives while get is still fetching the properties of that blob makes get drop the
+#     answer instead of caching it (it may have been read before the change). Blobs being fetched have
+#     a generation number that invalidate increases; get only stores if it is still the one it started with.
+
+from collections import defaultdict
+
+
+class BlobPropertiesCache:
+    def __init__(self, ttl=60, max_bytes=64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> [properties, size, expires_at]
+        self.keys_by_blob = defaultdict(set)  # (container, blob) -> keys of the blob and its snapshots
+        self.fetching = Counter()  # (container, blob) -> number of get calls fetching it right now
+        self.generations = {}      # (container, blob) -> generation, only while it is being fetched
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats = Counter({'hits': 0, 'misses': 0, 'revalidated': 0, 'modified': 0, 'evictions': 0,
+                              'invalidations': 0, 'stale_fetches': 0})
+
+    @staticmethod
+    def _estimate_size(properties):
+        # rough memory use of one entry - fixed part plus names and metadata
+        metadata = properties.metadata or {}
+        return 1024 + len(properties.name or '') + sum(len(k) + len(v) for k, v in metadata.items())
+
+    def get(self, container_name, blob_name, snapshot=None, ttl=None):
+        key = (container_name, blob_name, snapshot)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[2] > now:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[0]
+            self.fetching[key[:2]] += 1
+            generation = self.generations.setdefault(key[:2], 0)
+
+        try:
+            blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name, snapshot=snapshot)
+            properties = None
+            if entry:
+                try:
+                    properties = blob_client.get_blob_properties(etag=entry[0].etag,
+                                                                 match_condition=MatchConditions.IfModified)
+                except HttpResponseError as e:
+                    if e.status_code != 304:
+                        self.invalidate(container_name, blob_name)
+                        raise
+                    properties = entry[0]  # 304 - not modified, keep what we have
+                    with self.lock:
+                        self.stats['revalidated'] += 1
+                else:
+                    with self.lock:
+                        self.stats['modified'] += 1
+            if properties is None:
+                properties = blob_client.get_blob_properties()
+                with self.lock:
+                    self.stats['misses'] += 1
+
+            ttl = ttl if ttl is not None else self.ttl
+            self._store(key, properties, float('inf') if snapshot else time.time() + ttl, generation)
+        finally:
+            with self.lock:
+                self.fetching[key[:2]] -= 1
+                if not self.fetching[key[:2]]:
+                    del self.fetching[key[:2]]
+                    del self.generations[key[:2]]
+        return properties
+
+    def _store(self, key, properties, expires_at, generation):
+        size = self._estimate_size(properties)
+        with self.lock:
+            if self.generations[key[:2]] != generation:
+                # invalidated while we were fetching - the answer may be from before the change
+                self.stats['stale_fetches'] += 1
+                return
+            self._remove(key)
+            self.entries[key] = [properties, size, expires_at]
+            self.keys_by_blob[key[:2]].add(key)
+            self.size += size
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                self._remove(next(iter(self.entries)))
+                self.stats['evictions'] += 1
+
+    def _remove(self, key):
+        # caller holds the lock
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.size -= entry[1]
+            keys = self.keys_by_blob[key[:2]]
+            keys.discard(key)
+            if not keys:
+                del self.keys_by_blob[key[:2]]
+        return entry is not None
+
+    def invalidate(self, container_name, blob_name=None):
+        # blob_name=None drops the whole container, otherwise the blob with all its snapshots
+        with self.lock:
+            if blob_name is None:
+                stale = [key for blob, keys in self.keys_by_blob.items() if blob[0] == container_name for key in keys]
+            else:
+                stale = list(self.keys_by_blob.get((container_name, blob_name), ()))
+            for key in stale:
+                self._remove(key)
+            self.stats['invalidations'] += len(stale)
+            for blob in self.generations:
+                if blob[0] == container_name and blob_name in (None, blob[1]):
+                    self.generations[blob] += 1
+
+    def clear(self):
+        with self.lock:
+            for blob in self.generations:
+                self.generations[blob] += 1
+            self.entries.clear()
+            self.keys_by_blob.clear()
+            self.size = 0
+
+
+blob_properties_cache = BlobPropertiesCache(ttl=60)
+blob_change_hooks.append(blob_properties_cache.invalidate)
+
+properties = blob_properties_cache.get("your_container_name", "your_blob_name")
+properties = blob_properties_cache.get("your_container_name", "your_blob_name")  # served from memory
+print(f"Size: {properties.size}, etag: {properties.etag}, metadata: {properties.metadata}")
+print(dict(blob_properties_cache.stats))
+
 # --------------------------------------------------------------------------------
 # Abort the copy 
 # --------------------------------------------------------------------------------
 
 # This method is used to abort a blob copy operation that's currently in progress in Azure Blob Storage.
 
-dest_blob_client = 'some clinet'
-copy_operation = dest_blob_client.start_copy_from_url('src_blob_url')
+dest_blob_client = blob_service_client.get_blob_client(container="destination_container", blob="destination_blob.txt")
+copy_operation = dest_blob_client.start_copy_from_url(blob_client.url)
+notify_blob_changed(dest_blob_client.container_name, dest_blob_client.blob_name)
 
-# aborting above copy
+# aborting above copy - only a copy that is still pending can be aborted (copies within an account often finish at once)
 copy_id = copy_operation['copy_id']
-blob_client.abort_copy(copy_id)
+try:
+    dest_blob_client.abort_copy(copy_id)
+    notify_blob_changed(dest_blob_client.container_name, dest_blob_client.blob_name)
+except HttpResponseError as e:
+    print(f"Nothing to abort: {e.message}")
 
 # --------------------------------------------------------------------------------
 # Create Snapshot of blob
@@ -285,20 +1241,20 @@ service_properties = blob_service_client.get_service_properties()
 print("Blob Service Properties:")
 
 # Display analytics versioning
-print(f"Analytics Logging Version: {service_properties['logging']['version']}")
+print(f"Analytics Logging Version: {service_properties['analytics_logging'].version}")
 
-# Display hour metrics
+# Display hour metrics (the values of the dictionary are model objects, read with attributes)
 hour_metrics = service_properties['hour_metrics']
-print(f"Hour Metrics Enabled: {hour_metrics['enabled']}")
-if hour_metrics['enabled']:
-    print(f"Hour Metrics Retention Policy: {hour_metrics['retention_policy']['days']} days")
-    print(f"Hour Metrics Level: {hour_metrics['include_apis']}")
+print(f"Hour Metrics Enabled: {hour_metrics.enabled}")
+if hour_metrics.enabled:
+    print(f"Hour Metrics Retention Policy: {hour_metrics.retention_policy.days} days")
+    print(f"Hour Metrics Level: {hour_metrics.include_apis}")
 
 # Display CORS rules
 print("CORS Rules:")
 for rule in service_properties['cors']:
-    print(f"Allowed Origins: {rule['allowed_origins']}")
-    print(f"Allowed Methods: {rule['allowed_methods']}")
+    print(f"Allowed Origins: {rule.allowed_origins}")
+    print(f"Allowed Methods: {rule.allowed_methods}")
     print("----------")
 
 # --------------------------------------------------------------------------------
@@ -321,6 +1277,7 @@ metadata = {
 
 # Set metadata for the blob
 blob_client.set_blob_metadata(metadata=metadata)
+notify_blob_changed(container_name, blob_name)
 
 
 # A few things to note about blob metadata:
@@ -339,11 +1296,445 @@ blob_client.set_blob_metadata(metadata=metadata)
 #      so be cautious not to exceed them. 
 #      the total size of blob metadata was limited to 8 KB.
 
+# --------------------------------------------------------------------------------
+# Update metadata / tags of many blobs
+# --------------------------------------------------------------------------------
+
+# bulk_update_metadata sets metadata (and optionally blob index tags) on many blobs at once:
+#   * updates - iterable of (blob_name, metadata) pairs, or give a prefix + one metadata dict for all blobs under it.
+#     metadata=None only sets the tags (and tags=None leaves the tags alone) - one of the two is needed.
+#   * The rules from the notes above are checked locally first (8 KB total size, keys that only differ in case,
+#     valid key names, ASCII values), so an invalid update is rejected without any request. Tags are checked too:
+#     at most 10 per blob, keys of 1 to 128 and values of up to 256 characters from letters, digits, space
+#     and + - . / : = _
+#   * For a prefix the listing already returns etag, metadata and tags of every blob (include=['metadata', 'tags']),
+#     otherwise we read the properties once. If the metadata is already what we want, nothing is written.
+#   * Writes are conditional on the etag we read (If-Match), so we never overwrite a change made by someone else
+#     in between - we read again and retry instead.
+
+import re
+from concurrent.futures import as_completed
+
+METADATA_MAX_BYTES = 8 * 1024
+METADATA_KEY_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')  # metadata names must be valid C# identifiers
+TAGS_MAX_COUNT = 10
+TAG_KEY_MAX_LENGTH = 128
+TAG_VALUE_MAX_LENGTH = 256
+TAG_PATTERN = re.compile(r'^[A-Za-z0-9 +\-./:=_]*$')
+
+
+def map_bounded(fn, items, max_workers, max_queued=None):
+    # like executor.map, but only takes the next item when there is room, so items can be a huge generator.
+    # Results come back in completion order.
+    max_queued = max_queued or max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+        for item in items:
+            in_flight.add(executor.submit(fn, item))
+            if len(in_flight) >= max_queued:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield future.result()
+        for future in as_completed(in_flight):
+            yield future.result()
+
+
+def validate_metadata(metadata):
+    problems = []
+    seen = {}
+    size = 0
+    for name, value in metadata.items():
+        if not METADATA_KEY_PATTERN.match(name):
+            problems.append(f"invalid metadata name '{name}'")
+        if name.lower() in seen:
+            problems.append(f"metadata names '{seen[name.lower()]}' and '{name}' only differ in case")
+        seen[name.lower()] = name
+        if not isinstance(value, str) or not value.isascii():
+            problems.append(f"metadata value of '{name}' must be an ASCII string")
+        size += len(name.encode()) + len(str(value).encode())
+    if size > METADATA_MAX_BYTES:
+        problems.append(f"metadata is {size} bytes, limit is {METADATA_MAX_BYTES}")
+    return problems
+
+
+def validate_tags(tags):
+    problems = []
+    if len(tags) > TAGS_MAX_COUNT:
+        problems.append(f"{len(tags)} tags, limit is {TAGS_MAX_COUNT}")
+    for key, value in tags.items():
+        if not isinstance(key, str) or not 0 < len(key) <= TAG_KEY_MAX_LENGTH or not TAG_PATTERN.match(key):
+            problems.append(f"invalid tag key '{key}'")
+        if not isinstance(value, str) or len(value) > TAG_VALUE_MAX_LENGTH or not TAG_PATTERN.match(value):
+            problems.append(f"invalid value of tag '{key}'")
+    return problems
+
+
+def _update_blob_metadata(container_client, blob_name, new_metadata, tags, merge, listed, retries):
+    blob_client = container_client.get_blob_client(blob_name)
+    for attempt in range(retries + 1):
+        if listed is not None:
+            etag, current_metadata, current_tags = listed.etag, listed.metadata or {}, listed.tags or {}
+            listed = None  # only trust the listing for the first attempt
+        else:
+            properties = blob_client.get_blob_properties()
+            etag, current_metadata = properties.etag, properties.metadata or {}
+            current_tags = blob_client.get_blob_tags() if tags is not None else {}
+
+        if new_metadata is None:
+            target = current_metadata
+        else:
+            target = {**current_metadata, **new_metadata} if merge else dict(new_metadata)
+            problems = validate_metadata(target)
+            if problems:
+                print(f"Skipping '{blob_name}': {'; '.join(problems)}")
+                return 'invalid'
+
+        metadata_changed = target != current_metadata
+        tags_changed = tags is not None and tags != current_tags
+        if not metadata_changed and not tags_changed:
+            return 'unchanged'
+
+        try:
+            if metadata_changed:
+                blob_client.set_blob_metadata(metadata=target, etag=etag, match_condition=MatchConditions.IfNotModified)
+            if tags_changed:
+                blob_client.set_blob_tags(tags)
+            notify_blob_changed(container_client.container_name, blob_name)
+            return 'updated'
+        except ResourceModifiedError:
+            continue  # changed by someone else since we read it - read again
+    return 'conflict'
+
+
+@instrumented("bulk_update_metadata")
+def bulk_update_metadata(container_name, updates=None, prefix=None, metadata=None, tags=None, merge=False,
+                         max_workers=16, retries=3):
+    if updates is None and metadata is None and tags is None:
+        raise ValueError("nothing to update - give updates, metadata or tags")
+    problems = []
+    if updates is None and metadata is not None:
+        problems += validate_metadata(metadata)
+    if tags is not None:
+        problems += validate_tags(tags)
+    if problems:
+        raise ValueError('; '.join(problems))
+    start = time.time()
+    container_client = blob_service_client.get_container_client(container_name)
+
+    if updates is None:
+        listing = container_client.list_blobs(name_starts_with=prefix, include=['metadata', 'tags'])
+        work = ((blob.name, metadata, blob) for blob in listing)
+    else:
+        work = ((blob_name, blob_metadata, None) for blob_name, blob_metadata in updates)
+
+    def update(item):
+        blob_name, blob_metadata, listed = item
+        if not merge and blob_metadata is not None:
+            problems = validate_metadata(blob_metadata)
+            if problems:
+                print(f"Skipping '{blob_name}': {'; '.join(problems)}")
+                return 'invalid'
+        try:
+            return _update_blob_metadata(container_client, blob_name, blob_metadata, tags, merge, listed, retries)
+        except HttpResponseError as e:
+            print(f"Error updating metadata of '{blob_name}'. {e.message}")
+            return 'failed'
+
+    results = Counter(map_bounded(update, work, max_workers))
+    elapsed = time.time() - start
+    return {**results, 'elapsed_seconds': round(elapsed, 3),
+            'blobs_per_second': round(sum(results.values()) / max(elapsed, 0.001), 1)}
+
+# same metadata + tags on every blob of one ingest
+print(bulk_update_metadata(container_name, prefix="ingest/2026-10-17/", metadata={"ingest": "2026-10-17"},
+                           tags={"stage": "raw"}, merge=True))
+
+# different metadata per blob
+print(bulk_update_metadata(container_name, updates=[
+    ("your-blob-name", {"key1": "value1", "key2": "value2"}),
+    ("your-other-blob-name", {"key1": "value3"}),
+]))
+
+# --------------------------------------------------------------------------------
+# Syncing a local directory to a container (only new or changed files)
+# --------------------------------------------------------------------------------
+
+# Uploading a whole directory tree every night sends every file again, even if almost nothing changed.
+# sync_directory compares by content (MD5) instead:
+#   * files are hashed in a process pool. A manifest file (default: .blob_sync_manifest.json in the directory)
+#     remembers size, modification time and MD5 of every file, so unchanged files are not hashed again.
+#   * the container side is one listing of the prefix - a blob is up to date when its content_md5
+#     (or its 'md5' metadata, for blobs committed without one) equals the local hash.
+#   * content addressed: a changed file whose content already exists as another blob (renamed or duplicated
+#     files) is copied inside the storage account with copy_blobs instead of uploaded. Identical new files
+#     are uploaded once and copied from there.
+#   * uploads run concurrently; files above large_file_size go through upload_large_file (blocks, resumable).
+#     Uploaded blobs get their MD5 as content_md5 and as metadata, so the next run can compare them.
+#   * blobs under the prefix that have no local file (anymore) are left alone.
+#   * a failed upload is counted in 'failed' (with the copies that would have read from it) and the sync goes on.
+#     The manifest is saved before the first upload, so the next run only uploads what is still missing.
+#   * dry_run=True only reports what would happen: files and bytes to upload / copy, bytes saved and the time taken.
+# Where processes can only be spawned (Windows, macOS) a child process would run this whole script again,
+# so there the hashing uses threads - hashlib releases the GIL on large buffers, so they still hash in parallel.
+
+import base64
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from azure.storage.blob import ContentSettings
+
+
+def _file_md5(path):
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(8 * 1024 * 1024), b""):
+            md5.update(chunk)
+    return base64.b64encode(md5.digest()).decode()
+
+
+def _hash_files(paths, max_workers):
+    if 'fork' in multiprocessing.get_all_start_methods():
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('fork'))
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    with executor:
+        return dict(zip(paths, executor.map(_file_md5, paths, chunksize=16)))
+
+
+def _upload_synced_file(container_client, blob_name, path, md5, large_file_size):
+    blob_client = container_client.get_blob_client(blob_name)
+    settings = {'content_settings': ContentSettings(content_md5=base64.b64decode(md5)), 'metadata': {'md5': md5}}
+    if os.path.getsize(path) > large_file_size:
+        upload_large_file(blob_client, path, **settings)
+    else:
+        with open(path, "rb") as f:
+            blob_client.upload_blob(f, overwrite=True, **settings)
+        notify_blob_changed(container_client.container_name, blob_name)
+    return blob_name
+
+
+@instrumented("sync_directory")
+def sync_directory(local_dir, container_name, prefix="", manifest_path=None, dry_run=False, max_workers=8,
+                   hash_workers=None, large_file_size=64 * 1024 * 1024):
+    start = time.time()
+    manifest_path = manifest_path or os.path.join(local_dir, ".blob_sync_manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    # 1. walk the tree, hash only what the manifest can't vouch for
+    files = {}  # blob name -> (path, size, relative path)
+    to_hash = []
+    for root, _, names in os.walk(local_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.abspath(path) == os.path.abspath(manifest_path):
+                continue
+            relative = os.path.relpath(path, local_dir).replace(os.sep, "/")
+            stat = os.stat(path)
+            files[prefix + relative] = (path, stat.st_size, relative)
+            known = manifest.get(relative)
+            if not known or known['size'] != stat.st_size or known['mtime_ns'] != stat.st_mtime_ns:
+                manifest[relative] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'md5': None}
+                to_hash.append(path)
+    hash_start = time.time()
+    for path, md5 in _hash_files(to_hash, hash_workers).items():
+        manifest[os.path.relpath(path, local_dir).replace(os.sep, "/")]['md5'] = md5
+    hash_seconds = time.time() - hash_start
+    relatives = {relative for _, _, relative in files.values()}
+    manifest = {relative: entry for relative, entry in manifest.items() if relative in relatives}
+    # saved before any upload - the hashes are worth keeping even after a dry run or a failed upload
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+    # 2. what the container has under the prefix, by name and by content
+    local_md5 = {blob_name: manifest[relative]['md5'] for blob_name, (_, _, relative) in files.items()}
+    container_client = blob_service_client.get_container_client(container_name)
+    remote = {}
+    remote_by_md5 = {}
+    for blob in container_client.list_blobs(name_starts_with=prefix or None, include=['metadata']):
+        content_md5 = blob.content_settings.content_md5
+        md5 = base64.b64encode(bytes(content_md5)).decode() if content_md5 else (blob.metadata or {}).get('md5')
+        remote[blob.name] = md5
+        # a blob this sync overwrites can't be the source of a copy
+        if md5 and local_md5.get(blob.name, md5) == md5:
+            remote_by_md5.setdefault(md5, blob.name)
+
+    # 3. plan: skip, copy inside the account, or upload
+    plan = {'unchanged': [], 'upload': [], 'copy': []}  # copy entries are (source blob, destination blob)
+    uploading_md5 = {}
+    for blob_name, md5 in sorted(local_md5.items()):
+        if remote.get(blob_name) == md5:
+            plan['unchanged'].append(blob_name)
+        elif md5 in remote_by_md5:
+            plan['copy'].append((remote_by_md5[md5], blob_name))
+        elif md5 in uploading_md5:
+            plan['copy'].append((uploading_md5[md5], blob_name))
+        else:
+            uploading_md5[md5] = blob_name
+            plan['upload'].append(blob_name)
+
+    total_bytes = sum(size for _, size, _ in files.values())
+    upload_bytes = sum(files[blob_name][1] for blob_name in plan['upload'])
+    result = {
+        'files': len(files),
+        'hashed': len(to_hash),
+        'unchanged': len(plan['unchanged']),
+        'uploaded': len(plan['upload']),
+        'copied': len(plan['copy']),
+        'failed': 0,
+        'total_bytes': total_bytes,
+        'uploaded_bytes': upload_bytes,
+        'bytes_saved': total_bytes - upload_bytes,
+        'hash_seconds': round(hash_seconds, 3),
+        'dry_run': dry_run,
+    }
+
+    if not dry_run:
+        # 4. uploads first - the copies of new duplicates read from the blobs uploaded here
+        def upload(blob_name):
+            path, _, relative = files[blob_name]
+            try:
+                return _upload_synced_file(container_client, blob_name, path, manifest[relative]['md5'], large_file_size)
+            except (HttpResponseError, OSError) as e:
+                # the next run finds the blob still missing (or different) and uploads it again
+                print(f"Error uploading '{path}'. {e}")
+                return None
+
+        uploaded = {blob_name for blob_name in map_bounded(upload, plan['upload'], max_workers) if blob_name}
+        not_uploaded = set(plan['upload']) - uploaded
+        copies = [(source, destination) for source, destination in plan['copy'] if source not in not_uploaded]
+        result['uploaded'] = len(uploaded)
+        result['copied'] = len(copies)
+        result['failed'] = len(not_uploaded) + len(plan['copy']) - len(copies)
+        if copies:
+            copied = copy_blobs([(container_name, source, container_name, destination, files[destination][1])
+                                 for source, destination in copies], max_workers=max_workers)
+            result['copied'] = copied['success']
+            result['failed'] += copied['failed'] + copied['aborted']
+
+    result['elapsed_seconds'] = round(time.time() - start, 3)
+    return result
+
+
+print(sync_directory("local_directory_path", "your_container_name", prefix="nightly/", dry_run=True))
+print(sync_directory("local_directory_path", "your_container_name", prefix="nightly/"))
+
+# --------------------------------------------------------------------------------
+# Managing snapshots of many blobs (create, list, prune)
+# --------------------------------------------------------------------------------
+
+# create_snapshot() above snapshots one blob, and nothing ever removes the snapshots again -
+# they pile up, make listings slower and cost money. For a whole prefix:
+#   * create_snapshots snapshots every blob under the prefix concurrently (the listing is consumed as we go).
+#   * list_blob_snapshots is one streaming listing with include=['snapshots']. The service returns the
+#     snapshots of a blob (oldest first) right before the blob itself, so we only hold one blob's snapshots at a time.
+#   * prune_snapshots applies the retention rules to every blob: keep_last=N keeps the N newest snapshots,
+#     max_age keeps the ones younger than that (a timedelta). With both, a snapshot is kept if either rule keeps it.
+#     The rest is deleted with bulk_delete_blobs (batches of 256), while the listing is still running.
+#   * bytes_reclaimed adds up the size of the deleted snapshots - that is an upper bound, because the account
+#     is only billed for the blocks in which a snapshot differs from its base blob.
+
+from datetime import timezone
+
+
+def _snapshot_time(snapshot):
+    # '2023-08-06T10:20:30.1234567Z' - seconds are enough for retention rules
+    return datetime.strptime(snapshot[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+
+
+@instrumented("create_snapshots")
+def create_snapshots(container_name, prefix=None, metadata=None, max_workers=16):
+    container_client = blob_service_client.get_container_client(container_name)
+    names = (blob.name for blob in container_client.list_blobs(name_starts_with=prefix))
+
+    def snapshot(blob_name):
+        return blob_name, container_client.get_blob_client(blob_name).create_snapshot(metadata=metadata)['snapshot']
+
+    created = dict(map_bounded(snapshot, names, max_workers))
+    print(f"Created {len(created)} snapshots under '{prefix or ''}'.")
+    return created  # blob name -> snapshot timestamp
+
+
+def list_blob_snapshots(container_name, prefix=None):
+    # yields (blob name, [(snapshot, size), ...] oldest first) for every blob that has snapshots
+    container_client = blob_service_client.get_container_client(container_name)
+    current_name = None
+    snapshots = []
+    for blob in container_client.list_blobs(name_starts_with=prefix, include=['snapshots']):
+        if blob.name != current_name:
+            if snapshots:
+                yield current_name, snapshots
+            current_name, snapshots = blob.name, []
+        if blob.snapshot:
+            snapshots.append((blob.snapshot, blob.size))
+    if snapshots:
+        yield current_name, snapshots
+
+
+def expired_snapshots(snapshots, keep_last=None, max_age=None, now=None):
+    # snapshots oldest first - returns the ones neither rule keeps
+    if keep_last is None and max_age is None:
+        return []
+    now = now or datetime.now(timezone.utc)
+    kept_by_count = len(snapshots) - keep_last if keep_last is not None else len(snapshots)
+    return [
+        (snapshot, size) for index, (snapshot, size) in enumerate(snapshots)
+        if index < kept_by_count and (max_age is None or now - _snapshot_time(snapshot) > max_age)
+    ]
+
+
+@instrumented("prune_snapshots")
+def prune_snapshots(container_name, prefix=None, keep_last=None, max_age=None, dry_run=False, max_workers=8):
+    start = time.time()
+    result = {'blobs': 0, 'snapshots': 0, 'expired': 0, 'deleted': 0, 'failed': 0, 'bytes_reclaimed': 0}
+
+    def expired():
+        for blob_name, snapshots in list_blob_snapshots(container_name, prefix):
+            result['blobs'] += 1
+            result['snapshots'] += len(snapshots)
+            for snapshot, size in expired_snapshots(snapshots, keep_last, max_age):
+                result['expired'] += 1
+                # extra keys like 'size' are ignored by delete_blobs, but come back to on_done
+                yield {'name': blob_name, 'snapshot': snapshot, 'size': size}
+
+    def deleted(blob, status):
+        # on_done runs on the worker threads, the counters are shared
+        with counters_lock:
+            if status in (202, 404):
+                result['deleted'] += 1
+                result['bytes_reclaimed'] += blob['size'] if status == 202 else 0
+            else:
+                result['failed'] += 1
+
+    counters_lock = threading.Lock()
+    if dry_run:
+        result['bytes_reclaimed'] = sum(blob['size'] for blob in expired())
+    else:
+        bulk_delete_blobs(container_name, blobs=expired(), max_workers=max_workers, on_done=deleted)
+
+    result['elapsed_seconds'] = round(time.time() - start, 3)
+    result['dry_run'] = dry_run
+    return result
+
+
+create_snapshots("your_container_name", prefix="reports/")
+
+# keep the 7 newest snapshots of every blob, and anything younger than 30 days
+print(prune_snapshots("your_container_name", prefix="reports/", keep_last=7, max_age=timedelta(days=30), dry_run=True))
+print(prune_snapshots("your_container_name", prefix="reports/", keep_last=7, max_age=timedelta(days=30)))
+
 # --------------------------------------------------------------------------------
 # Close the Connection
 # --------------------------------------------------------------------------------
 
-blob_service_client.close()
+# Clients from client_factory are shared by all the helpers above, so we don't close and rebuild them
+# in between - we close everything once, at the end. factory_stats() shows how many clients were reused
+# and how many HTTP connections were opened vs. reused from the pool.
+print(factory_stats())
+close_all_clients()
 
 # After calling the close method, you shouldn't use the client for further operations unless you instantiate it again.
 
@@ -364,7 +1755,11 @@ with BlobServiceClient.from_connection_string(connect_str) as client:
 
 from azure.storage.blob import BlobServiceClient
 
-account_name = 'YOUR_STORAGE_ACCOUNT_NAME'
-account_key = 'YOUR_STORAGE_ACCOUNT_KEY'
+# account name & key are read from config.ini ([blob_key] section)
+account_name = load_config()['blob_key']['account_name']
+account_key = load_config()['blob_key']['account_key']
 
 blob_service_client = BlobServiceClient(account_url=f"https://{account_name}.blob.core.windows.net", credential=account_key)
+
+# same client, but cached and on the shared connection pool
+blob_service_client = get_blob_service_client(account_name=account_name, account_key=account_key)
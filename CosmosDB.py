@@ -1,6 +1,6 @@
 # Author: Ashish Porwal
 # Date Created: 06/Aug/2023
-# Date Modified: 06/Aug/2023
+# Date Modified: 17/Oct/2026
 
 # Refer here - https://learn.microsoft.com/en-us/azure/cosmos-db/nosql/how-to-python-get-started?tabs=env-virtual%2Cazure-cli%2Cwindows
 
@@ -11,16 +11,22 @@
 # Cosmos DB Account > Database (or Cosmos DB Database) > Container > Items (or Documents)
 
 
-from azure.cosmos import CosmosClient
+from client_factory import load_config, get_cosmos_client, factory_stats, close_all_clients
+from instrumentation import instrumented
 
-url = "YOUR_COSMOS_DB_URL"
-key = "YOUR_COSMOS_DB_KEY"
+# url and key are read from config.ini ([cosmos] section)
+url = load_config()['cosmos']['url']
+key = load_config()['cosmos']['key']
 
 # --------------------------------------------------------------------------------
 # Create a new instance of the CosmosClient
 # --------------------------------------------------------------------------------
 
-client = CosmosClient(url, credential=key)
+# CosmosClient(url, credential=key) would work too, but get_cosmos_client keeps one client per account
+# on a shared HTTP connection pool, so the sections below can ask for it again without new connections.
+# With [instrumentation] enabled=true in config.ini its requests are measured as well (instrumentation.py),
+# and the bigger helpers below are timed as a whole with @instrumented.
+client = get_cosmos_client(url, key)
 
 # --------------------------------------------------------------------------------
 # List all databases
@@ -122,24 +128,727 @@ print(created_item)
 upserted_item = container_client.upsert_item(body=new_item)
 print(upserted_item)
 
+# --------------------------------------------------------------------------------
+# Caching query results
+# --------------------------------------------------------------------------------
+
+# Queries like "SELECT * FROM c WHERE c.someProperty = 'someValue'" have the value written into the text,
+# so every value is a different query and each run pays the full RU charge again.
+#   * parameterize_query turns the literals into parameters (@lit0, @lit1, ... - names the caller's parameters
+#     don't use), so the same query shape with the same values always produces the same cache key.
+#     Quoted property names (c["a=b"]) are left exactly as they are.
+#   * CosmosQueryCache keeps results keyed by (container, normalized query, parameters, partition key),
+#     with a ttl per entry and least-recently-used eviction once more than max_items items are cached.
+#     A container is identified by its account and link (dbs/<database>/colls/<container>), so containers
+#     with the same name in other databases or accounts don't share entries.
+#   * Every call returns its own copies of the items - changing them doesn't change what's cached.
+#   * Writes through the cache (create_item / upsert_item / delete_item) drop the cached queries of that
+#     partition key and all cross-partition queries of the container.
+#   * stats['ru_saved'] adds up the RU charge a cache hit did not have to pay.
+
+import copy
+import json
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+_QUERY_TOKEN = re.compile(
+    r"""(?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*")"""
+    r"""|(?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)"""
+    r"""|(?P<word>[@$\w]+)"""
+    r"""|(?P<operator>!=|<>|<=|>=|=|<|>|,)"""
+    r"""|(?P<space>\s+)"""
+    r"""|(?P<other>.)""",
+    re.S
+)
+_COMPARISON_OPERATORS = {'!=', '<>', '<=', '>=', '=', '<', '>'}
+_STRING_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f'}
+
+
+def _string_value(literal):
+    quote, body = literal[0], literal[1:-1]
+    if quote == "'":
+        body = body.replace("''", "'")  # 'It''s'
+    return re.sub(r"\\(.)", lambda escape: _STRING_ESCAPES.get(escape.group(1), escape.group(1)), body)
+
+
+def parameterize_query(query, parameters=None):
+    # The query is read token by token, so quoted text is never changed: c["a=b"] stays a property name,
+    # and 'It''s' is one string. Strings, and numbers compared with an operator, become parameters;
+    # outside quotes the spacing is normalized, so "c.a=1" and "c.a = 1" give the same text.
+    parameters = list(parameters or [])
+    tokens = [(match.lastgroup, match.group()) for match in _QUERY_TOKEN.finditer(query)]
+    taken = {parameter['name'] for parameter in parameters}
+    taken.update(text for kind, text in tokens if kind == 'word' and text.startswith('@'))
+    counter = 0
+
+    def add_parameter(value):
+        nonlocal counter
+        while f"@lit{counter}" in taken:
+            counter += 1
+        name = f"@lit{counter}"
+        taken.add(name)
+        parameters.append({'name': name, 'value': value})
+        return name
+
+    parts = []
+    space = False
+    previous = None  # last token that is not whitespace
+    for kind, text in tokens:
+        if kind == 'space':
+            space = True
+            continue
+        if kind == 'string' and previous != '[':
+            text = add_parameter(_string_value(text))
+        elif kind == 'number' and previous in _COMPARISON_OPERATORS:
+            text = add_parameter(float(text) if any(c in text for c in '.eE') else int(text))
+        if kind == 'operator':
+            space = True
+        if space and parts:
+            parts.append(' ')
+        parts.append(text)
+        space = kind == 'operator'
+        previous = text if kind in ('operator', 'other') else kind
+    return ''.join(parts), parameters
+
+
+def _freeze(value):
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _container_key(container):
+    # account + container link; objects without a link (stand-ins) are told apart by identity
+    link = getattr(container, 'container_link', None)
+    if link is None:
+        return id(container)
+    return getattr(getattr(container, 'client_connection', None), 'url_connection', None), link
+
+
+class CosmosQueryCache:
+    def __init__(self, ttl=300, max_items=100000):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.entries = OrderedDict()  # key -> (items, request_charge, expires_at)
+        self.items_cached = 0
+        self.partition_key_paths = {}
+        self.lock = threading.Lock()
+        self.stats = Counter({'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0,
+                              'ru_spent': 0.0, 'ru_saved': 0.0})
+
+    def query_items(self, container, query, parameters=None, partition_key=None, ttl=None, max_item_count=None):
+        query, parameters = parameterize_query(query, parameters)
+        key = (_container_key(container), query, _freeze(sorted(parameters, key=lambda p: p['name'])), _freeze(partition_key))
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[2] > time.time():
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                self.stats['ru_saved'] += entry[1]
+                return copy.deepcopy(entry[0])
+
+        options = {'partition_key': partition_key} if partition_key is not None else {'enable_cross_partition_query': True}
+        items = []
+        # the charge of every page comes with its response - the client's last_response_headers are shared
+        # with other threads using the same client
+        charges = []
+        for page in container.query_items(query=query, parameters=parameters or None, max_item_count=max_item_count,
+                                          response_hook=lambda headers, _: charges.append(
+                                              float(headers.get('x-ms-request-charge', 0))),
+                                          **options).by_page():
+            items.extend(page)
+        request_charge = sum(charges)
+
+        with self.lock:
+            self.stats['misses'] += 1
+            self.stats['ru_spent'] += request_charge
+            if len(items) <= self.max_items:
+                self._remove(key)
+                self.entries[key] = (items, request_charge, time.time() + (ttl if ttl is not None else self.ttl))
+                self.items_cached += len(items)
+                while self.items_cached > self.max_items:
+                    self._remove(next(iter(self.entries)))
+                    self.stats['evictions'] += 1
+        return copy.deepcopy(items)
+
+    def _remove(self, key):
+        # caller holds the lock
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.items_cached -= len(entry[0])
+
+    def invalidate(self, container, partition_key=None, everything=False):
+        # drops cross-partition queries of the container, and the queries of this partition key
+        frozen = _freeze(partition_key)
+        container_key = _container_key(container)
+        with self.lock:
+            stale = [key for key in self.entries
+                     if key[0] == container_key and (everything or key[3] in (frozen, 'null'))]
+            for key in stale:
+                self._remove(key)
+            self.stats['invalidations'] += len(stale)
+
+    def _partition_key_of(self, container, body):
+        container_key = _container_key(container)
+        if container_key not in self.partition_key_paths:
+            path = getattr(container, 'partition_key_path', None)
+            if path is None:
+                paths = container.read()['partitionKey']['paths']
+                path = paths[0] if len(paths) == 1 else None
+            self.partition_key_paths[container_key] = path
+        path = self.partition_key_paths[container_key]
+        if path is None:
+            return None
+        value = body
+        for part in path.strip('/').split('/'):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+
+    def _invalidate_for(self, container, body):
+        partition_key = self._partition_key_of(container, body)
+        # unknown partition key (e.g. hierarchical keys) - drop everything of the container to be safe
+        self.invalidate(container, partition_key, everything=partition_key is None)
+
+    def create_item(self, container, body, **kwargs):
+        result = container.create_item(body=body, **kwargs)
+        self._invalidate_for(container, body)
+        return result
+
+    def upsert_item(self, container, body, **kwargs):
+        result = container.upsert_item(body=body, **kwargs)
+        self._invalidate_for(container, body)
+        return result
+
+    def delete_item(self, container, item, partition_key, **kwargs):
+        result = container.delete_item(item=item, partition_key=partition_key, **kwargs)
+        self.invalidate(container, partition_key)
+        return result
+
+
+query_cache = CosmosQueryCache(ttl=300)
+
+# first call goes to Cosmos DB, the second one (same query, same value) is served from memory
+items = query_cache.query_items(container_client, "SELECT * FROM c WHERE c.someProperty = 'someValue'")
+items = query_cache.query_items(container_client, "SELECT * FROM c WHERE c.someProperty = 'someValue'")
+
+# writing through the cache drops the cached queries this item could show up in
+query_cache.upsert_item(container_client, new_item)
+print(dict(query_cache.stats))
+
+# --------------------------------------------------------------------------------
+# Reading only the fields we need (projections)
+# --------------------------------------------------------------------------------
+
+# SELECT * sends every field of every document over the network, charges RUs for all of it
+# and builds a full dict per document in Python. When a job only needs a few fields, ask for just those:
+#   * projection_query(['id', 'somePath', 'address.city']) builds
+#     SELECT c["id"] AS f0, c["somePath"] AS f1, c["address"]["city"] AS f2 FROM c
+#     (columns are named by position - a field can be called value, select, ... which are no valid aliases)
+#   * query_records returns compact records (named tuples) instead of dicts. The spec is either a list of
+#     field paths, or a typing.NamedTuple class whose field names are the (top level) document fields.
+#     A path becomes the record field 'address_city' / 'ts' (for '_ts'); paths that end up with the same
+#     record field are rejected, the same path twice is one field. Fields a document does not have come back as None.
+#   * for slim copies with copy_container_documents, write the SELECT list by hand:
+#     query="SELECT c.id, c.somePath, c.name FROM c" keeps the field names in the destination.
+#   * compare_projection runs the same filter as SELECT * and as a projection and reports items, RU,
+#     payload bytes and the Python memory the results take.
+
+import keyword
+import tracemalloc
+from collections import namedtuple
+from typing import NamedTuple
+
+_record_types = {}
+
+
+def _field_name(path):
+    # 'address.city' -> 'address_city', '_ts' -> 'ts' (named tuple fields can't start with '_')
+    return re.sub(r'\W', '_', path).lstrip('_')
+
+
+def projection_query(fields, where_clause=None):
+    columns = ', '.join('c' + ''.join(f'[{json.dumps(part)}]' for part in path.split('.')) + f' AS f{index}'
+                        for index, path in enumerate(fields))
+    query = f"SELECT {columns} FROM c"
+    return f"{query} WHERE {where_clause}" if where_clause else query
+
+
+def _record_spec(spec):
+    # returns (record class, field paths) - record field i is column f{i} of projection_query(paths)
+    if isinstance(spec, type) and hasattr(spec, '_fields'):
+        return spec, list(spec._fields)
+    paths = tuple(dict.fromkeys(spec))
+    if paths not in _record_types:
+        names = {}
+        for path in paths:
+            name = _field_name(path)
+            if not name.isidentifier() or keyword.iskeyword(name):
+                raise ValueError(f"Field {path!r} can't be a record field ({name!r} is not a valid name)")
+            if name in names:
+                raise ValueError(f"Fields {names[name]!r} and {path!r} would both be the record field {name!r}")
+            names[name] = path
+        _record_types[paths] = namedtuple('Record', list(names))
+    return _record_types[paths], list(paths)
+
+
+def _to_record(record_class, item):
+    return record_class._make(item.get(f'f{index}') for index in range(len(record_class._fields)))
+
+
+def query_records(container, spec, where_clause=None, parameters=None, partition_key=None,
+                  max_item_count=None, response_hook=None):
+    record_class, paths = _record_spec(spec)
+    scope = {'partition_key': partition_key} if partition_key is not None else {'enable_cross_partition_query': True}
+    items = container.query_items(query=projection_query(paths, where_clause), parameters=parameters,
+                                  max_item_count=max_item_count, response_hook=response_hook, **scope)
+    for item in items:
+        yield _to_record(record_class, item)
+
+
+def _measure_query(container, query, parameters, convert):
+    charges = []
+    tracemalloc.start()
+    start = time.time()
+    items = container.query_items(query=query, parameters=parameters, enable_cross_partition_query=True,
+                                  response_hook=lambda headers, _: charges.append(float(headers.get('x-ms-request-charge', 0))))
+    payload_bytes = 0
+    results = []
+    for item in items:
+        payload_bytes += len(json.dumps(item))  # about what came over the wire for this item
+        results.append(convert(item))
+    seconds = time.time() - start
+    # the raw dicts are gone by now, so this is what keeping the results costs
+    python_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {'items': len(results), 'ru': round(sum(charges), 2), 'payload_bytes': payload_bytes,
+            'python_bytes': python_bytes, 'seconds': round(seconds, 3)}
+
+
+def compare_projection(container, spec, where_clause=None, parameters=None):
+    record_class, paths = _record_spec(spec)
+    full_query = f"SELECT * FROM c WHERE {where_clause}" if where_clause else "SELECT * FROM c"
+    full = _measure_query(container, full_query, parameters, lambda item: item)
+    projected = _measure_query(container, projection_query(paths, where_clause), parameters,
+                               lambda item: _to_record(record_class, item))
+    return {'select_star': full, 'projection': projected,
+            'ru_saved': round(full['ru'] - projected['ru'], 2),
+            'payload_bytes_saved': full['payload_bytes'] - projected['payload_bytes']}
+
+
+# a field list...
+for record in query_records(container_client, ['id', 'someProperty'], "c.someProperty = @value",
+                            parameters=[{'name': '@value', 'value': 'someValue'}]):
+    print(record.id, record.someProperty)
+
+
+# ...or a typed record spec
+class ItemSummary(NamedTuple):
+    id: str
+    someProperty: str
+
+
+summaries = list(query_records(container_client, ItemSummary))
+print(compare_projection(container_client, ItemSummary, "c.someProperty = 'someValue'"))
+
+# --------------------------------------------------------------------------------
+# Bulk loading a JSONL / CSV file into a container
+# --------------------------------------------------------------------------------
+
+# For daily feeds with millions of records, one create_item / upsert_item call at a time is far too slow.
+# ingest_file reads the file as a stream (window records at a time, so memory stays bounded),
+# and writes through the async client (azure.cosmos.aio, needs pip install aiohttp):
+#   * every record must have an 'id' and a value at the partition key path (see "Insert data" above) -
+#     records without them, or lines that are not valid JSON, go to the dead-letter file with the reason.
+#   * the records of a window are grouped by partition key and upserted as transactional batches
+#     (up to 100 operations of one partition key). If a batch fails, its records are upserted one by one,
+#     so only the bad records end up in the dead-letter file.
+#   * at most `concurrency` requests are running at the same time.
+#   * every report_every seconds it prints records/s and RU/s.
+#   * with checkpoint_path, the line up to which everything is written (or dead-lettered) is saved after every
+#     window. A rerun after a crash skips those lines and appends to the dead-letter file - at most one window
+#     is upserted again, which is harmless.
+
+import asyncio
+import csv
+import os
+from collections import defaultdict
+from azure.cosmos import exceptions
+from client_factory import get_async_cosmos_client
+
+BATCH_OPERATION_LIMIT = 100
+
+
+def partition_key_value(doc, partition_key_path):
+    value = doc
+    for part in partition_key_path.strip('/').split('/'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def read_records(path, file_format=None):
+    # yields (line_number, record, error) - record is None when the line could not be parsed
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, row, None
+            return
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line), None
+            except ValueError as e:
+                yield line_number, None, f"invalid JSON: {e}"
+
+
+@instrumented("ingest_file")
+async def ingest_file(container, path, partition_key_path, file_format=None, concurrency=32, window=10000,
+                      dead_letter_path=None, report_every=10, checkpoint_path=None):
+    start = time.time()
+    stats = Counter({'read': 0, 'written': 0, 'rejected': 0, 'skipped': 0, 'ru_charged': 0.0})
+    last_report = [start]
+    semaphore = asyncio.Semaphore(concurrency)
+    done_line = 0
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            done_line = json.load(f)['line']
+    dead_letter = open(dead_letter_path or path + '.rejected.jsonl', 'a' if done_line else 'w', encoding='utf-8')
+
+    def save_checkpoint(line_number):
+        if not checkpoint_path:
+            return
+        dead_letter.flush()
+        tmp_path = checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'line': line_number}, f)
+        os.replace(tmp_path, checkpoint_path)
+
+    def reject(line_number, record, error):
+        stats['rejected'] += 1
+        dead_letter.write(json.dumps({'line': line_number, 'error': error, 'record': record}, default=str) + '\n')
+
+    def charge(headers, _):
+        stats['ru_charged'] += float(headers.get('x-ms-request-charge', 0))
+
+    def report():
+        now = time.time()
+        if now - last_report[0] >= report_every:
+            last_report[0] = now
+            elapsed = now - start
+            print(f"{stats['written']} written, {stats['rejected']} rejected - "
+                  f"{round(stats['written'] / elapsed, 1)} records/s, {round(stats['ru_charged'] / elapsed, 1)} RU/s")
+
+    async def upsert_one(line_number, record):
+        try:
+            async with semaphore:
+                await container.upsert_item(body=record, response_hook=charge)
+            stats['written'] += 1
+        except exceptions.CosmosHttpResponseError as e:
+            reject(line_number, record, f"{e.status_code}: {e.message}")
+
+    async def write_chunk(partition_key, chunk):
+        try:
+            async with semaphore:
+                await container.execute_item_batch(
+                    batch_operations=[("upsert", (record,)) for _, record in chunk],
+                    partition_key=partition_key,
+                    response_hook=charge
+                )
+            stats['written'] += len(chunk)
+        except (exceptions.CosmosBatchOperationError, exceptions.CosmosHttpResponseError):
+            # one bad record fails the whole batch - find it by writing them one by one
+            await asyncio.gather(*(upsert_one(line_number, record) for line_number, record in chunk))
+        report()
+
+    async def flush(records):
+        groups = defaultdict(list)
+        for line_number, record, partition_key in records:
+            groups[json.dumps(partition_key)].append((line_number, record))
+        await asyncio.gather(*(
+            write_chunk(json.loads(key), chunk[i:i + BATCH_OPERATION_LIMIT])
+            for key, chunk in groups.items()
+            for i in range(0, len(chunk), BATCH_OPERATION_LIMIT)
+        ))
+
+    try:
+        pending = []
+        line_number = done_line
+        for line_number, record, error in read_records(path, file_format):
+            if line_number <= done_line:
+                stats['skipped'] += 1
+                continue
+            stats['read'] += 1
+            if error is None and not (isinstance(record, dict) and isinstance(record.get('id'), str) and record['id']):
+                error = "missing 'id'"
+            if error is None and partition_key_value(record, partition_key_path) is None:
+                error = f"missing partition key '{partition_key_path}'"
+            if error:
+                reject(line_number, record, error)
+                continue
+            pending.append((line_number, record, partition_key_value(record, partition_key_path)))
+            if len(pending) >= window:
+                await flush(pending)
+                pending = []
+                save_checkpoint(line_number)
+        if pending:
+            await flush(pending)
+        save_checkpoint(line_number)
+    finally:
+        dead_letter.close()
+
+    elapsed = time.time() - start
+    return {**stats, 'elapsed_seconds': round(elapsed, 3),
+            'records_per_second': round(stats['written'] / max(elapsed, 0.001), 1),
+            'ru_per_second': round(stats['ru_charged'] / max(elapsed, 0.001), 1)}
+
+
+async def ingest_daily_feed():
+    async with get_async_cosmos_client(url, key) as async_client:
+        container = async_client.get_database_client(database_name).get_container_client(container_name)
+        print(await ingest_file(container, "daily_feed.jsonl", "/partitionKeyProperty",
+                                dead_letter_path="daily_feed.rejected.jsonl"))
+
+asyncio.run(ingest_daily_feed())
+
+# --------------------------------------------------------------------------------
+# Large cross-partition queries - one query per feed range, in parallel
+# --------------------------------------------------------------------------------
+
+# With enable_cross_partition_query=True we read all results from one iterator, one page after another.
+# A container is split into feed ranges (physical partitions), and the same query can be run on every
+# feed range at the same time through the async client. fan_out_query merges the results into one stream:
+#   * every range has a bounded buffer (buffer_size items) - a range that is ahead simply waits.
+#   * with ORDER BY in the query every range returns its part sorted, and we merge them (heap merge),
+#     so the whole stream is sorted too. All ranges have to be read at the same time for that.
+#     Without ORDER BY, at most max_concurrency ranges are read at once and items come as they arrive.
+#   * range_stats gets one entry per range (pages, items, RU, page latency) - a range with much more
+#     RU or latency than the others is a hot partition.
+#   * Only for plain scans (SELECT ... WHERE ... ORDER BY) - TOP, OFFSET/LIMIT, DISTINCT, GROUP BY and
+#     aggregates would be applied per range, not to the merged result.
+
+import heapq
+
+_ORDER_BY = re.compile(r'\bORDER\s+BY\s+(.+?)(?:\s+OFFSET\b|\s+LIMIT\b|$)', re.IGNORECASE | re.DOTALL)
+_TYPE_ORDER = {type(None): 1, bool: 2, int: 3, float: 3, str: 4}  # undefined < null < bool < number < string
+_RANGE_DONE = object()
+
+
+def _order_by_fields(query):
+    match = _ORDER_BY.search(query)
+    if not match:
+        return []
+    fields = []
+    for part in match.group(1).split(','):
+        tokens = part.split()
+        path = tokens[0].split('.')[1:]  # "c.address.city" -> ['address', 'city']
+        fields.append((path, len(tokens) > 1 and tokens[1].upper() == 'DESC'))
+    return fields
+
+
+class _OrderKey:
+    __slots__ = ('values', 'fields')
+
+    def __init__(self, item, fields):
+        self.fields = fields
+        self.values = [self._sortable(item, path) for path, _ in fields]
+
+    @staticmethod
+    def _sortable(item, path):
+        value = item
+        for part in path:
+            if not isinstance(value, dict) or part not in value:
+                return (0, 0)  # undefined sorts first
+            value = value[part]
+        if type(value) not in _TYPE_ORDER or value is None:
+            return (_TYPE_ORDER.get(type(value), 5), 0)
+        return (_TYPE_ORDER[type(value)], value)
+
+    def __lt__(self, other):
+        for mine, theirs, (_, descending) in zip(self.values, other.values, self.fields):
+            if mine != theirs:
+                return mine > theirs if descending else mine < theirs
+        return False
+
+
+async def fan_out_query(container, query, parameters=None, buffer_size=100, max_concurrency=16,
+                        page_size=None, range_stats=None):
+    feed_ranges = [feed_range async for feed_range in container.read_feed_ranges()]
+    fields = _order_by_fields(query)
+    range_stats = range_stats if range_stats is not None else []
+    limit = asyncio.Semaphore(len(feed_ranges) if fields else max_concurrency)
+
+    async def read_range(index, feed_range, queue):
+        stat = {'feed_range': index, 'pages': 0, 'items': 0, 'ru': 0.0, 'page_latencies': []}
+        range_stats.append(stat)
+
+        def charge(headers, _):
+            stat['ru'] += float(headers.get('x-ms-request-charge', 0))
+
+        try:
+            async with limit:
+                range_started = time.time()
+                pages = container.query_items(query=query, parameters=parameters, feed_range=feed_range,
+                                              max_item_count=page_size, response_hook=charge).by_page()
+                page_started = time.time()
+                async for page in pages:
+                    items = [item async for item in page]
+                    stat['page_latencies'].append(time.time() - page_started)
+                    stat['pages'] += 1
+                    stat['items'] += len(items)
+                    for item in items:
+                        await queue.put(item)
+                    page_started = time.time()  # time spent waiting on a full buffer is not latency
+                stat['elapsed_seconds'] = round(time.time() - range_started, 3)
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            latencies = sorted(stat.pop('page_latencies'))
+            stat['page_latency_p50'] = latencies[len(latencies) // 2] if latencies else None
+            stat['page_latency_max'] = latencies[-1] if latencies else None
+        await queue.put(_RANGE_DONE)
+
+    queues = [asyncio.Queue(maxsize=buffer_size) for _ in feed_ranges] if fields else \
+        [asyncio.Queue(maxsize=buffer_size)] * len(feed_ranges)
+    tasks = [asyncio.create_task(read_range(index, feed_range, queues[index]))
+             for index, feed_range in enumerate(feed_ranges)]
+    try:
+        if fields:
+            heap = []
+
+            async def take_next(index):
+                item = await queues[index].get()
+                if isinstance(item, Exception):
+                    raise item
+                if item is not _RANGE_DONE:
+                    heapq.heappush(heap, (_OrderKey(item, fields), index, item))
+
+            for index in range(len(feed_ranges)):
+                await take_next(index)
+            while heap:
+                _, index, item = heapq.heappop(heap)
+                yield item
+                await take_next(index)
+        else:
+            running = len(feed_ranges)
+            while running:
+                item = await queues[0].get()
+                if item is _RANGE_DONE:
+                    running -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def scan_container():
+    range_stats = []
+    async with get_async_cosmos_client(url, key) as async_client:
+        container = async_client.get_database_client(database_name).get_container_client(container_name)
+        count = 0
+        async for item in fan_out_query(container, "SELECT * FROM c WHERE c.someProperty = 'someValue' ORDER BY c._ts",
+                                        range_stats=range_stats):
+            count += 1
+    print(f"{count} items from {len(range_stats)} feed ranges")
+
+    # the ranges that cost the most RU - candidates for hot partitions
+    for stat in sorted(range_stats, key=lambda stat: stat['ru'], reverse=True)[:5]:
+        print(stat)
+
+asyncio.run(scan_container())
+
 # --------------------------------------------------------------------------------
 # Delete a particular query data
 # --------------------------------------------------------------------------------
 
-# Define a SQL query to find items based on some criteria
-query = "SELECT * FROM c WHERE c.propertyName = 'desiredValue'"
+# Deleting items one by one from a SELECT * query reads the full documents (more RUs)
+# and waits for every delete before sending the next one.
+# Cosmos DB only needs the id and the partition key value to delete an item, so we project just those two,
+# group the matches by partition key, and delete each group with transactional batches
+# (up to 100 operations, all in the same partition) or with plain deletes from a worker pool.
+# Items without a partition key value are stored in a partition of their own; they are deleted with
+# NonePartitionKeyValue (partition_key=None would mean the JSON value null, a different partition).
+
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from azure.cosmos import exceptions
+from azure.cosmos.partition_key import NonePartitionKeyValue
+
+
+def _delete_chunk(container, partition_key_value, item_ids, use_batches):
+    counts = {'deleted': 0, 'failed': 0, 'throttled': 0}
+    if use_batches:
+        try:
+            container.execute_item_batch(
+                batch_operations=[("delete", (item_id,)) for item_id in item_ids],
+                partition_key=partition_key_value
+            )
+            counts['deleted'] += len(item_ids)
+            return counts
+        except exceptions.CosmosBatchOperationError:
+            # a batch is all or nothing - one item that is already gone fails the whole batch,
+            # so we retry this chunk item by item below
+            pass
+        except exceptions.CosmosHttpResponseError as e:
+            counts['throttled' if e.status_code == 429 else 'failed'] += len(item_ids)
+            return counts
+
+    for item_id in item_ids:
+        try:
+            container.delete_item(item=item_id, partition_key=partition_key_value)
+            counts['deleted'] += 1
+        except exceptions.CosmosResourceNotFoundError:
+            counts['deleted'] += 1  # already deleted by someone else, nothing left to do
+        except exceptions.CosmosHttpResponseError as e:
+            # 429 here means the SDK already used up its own retries on throttling
+            counts['throttled' if e.status_code == 429 else 'failed'] += 1
+    return counts
+
 
-# Query for the items you wish to delete
-items_to_delete = container_client.query_items(query=query, enable_cross_partition_query=True)
+@instrumented("bulk_delete_by_query")
+def bulk_delete_by_query(container, where_clause, partition_key_property, parameters=None,
+                         use_batches=True, batch_size=100, max_workers=16):
+    start = time.time()
 
-# Iterate over the items and delete each one
-for item in items_to_delete:
-    partition_key_value = item['partitionKeyPropertyName']  # Adjust this to your actual partition key property name
-    item_id = item['id']
-    
-    container_client.delete_item(item=item_id, partition_key=partition_key_value)
+    # only project id and partition key - much cheaper than SELECT *
+    # (a column is left out of the result when the item has no such field, so f1 tells a missing value from null)
+    matches = container.query_items(query=projection_query(['id', partition_key_property], where_clause),
+                                    parameters=parameters, enable_cross_partition_query=True)
 
-print("Deletion completed!")
+    groups = defaultdict(list)
+    matched = 0
+    for item in matches:
+        groups[item['f1'] if 'f1' in item else NonePartitionKeyValue].append(item['f0'])
+        matched += 1
+
+    result = {'matched': matched, 'deleted': 0, 'failed': 0, 'throttled': 0, 'partitions': len(groups)}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_delete_chunk, container, partition_key_value, item_ids[i:i + batch_size], use_batches)
+            for partition_key_value, item_ids in groups.items()
+            for i in range(0, len(item_ids), batch_size)
+        ]
+        for future in as_completed(futures):
+            for key, value in future.result().items():
+                result[key] += value
+
+    result['elapsed_seconds'] = round(time.time() - start, 3)
+    result['deletes_per_second'] = round(result['deleted'] / max(result['elapsed_seconds'], 0.001), 1)
+    return result
+
+
+# partitionKeyPropertyName - adjust this to your actual partition key property name
+deletion_result = bulk_delete_by_query(container_client, "c.propertyName = 'desiredValue'", 'partitionKeyPropertyName')
+
+print(f"Deletion completed! {deletion_result}")
 
 
 # partitionKeyPropertyName in the code should be replaced with the actual name of your partition key property. 
@@ -159,8 +868,10 @@ container_properties = {
 }
 throughput = 400  # This is the RU setting. Adjust as needed.
 
-# Create the container with the specified throughput
-container_client = database_client.create_container_if_not_exists(container_properties, throughput=throughput)
+# Create the container with the specified throughput (the SDK takes the properties as keyword arguments)
+container_client = database_client.create_container_if_not_exists(id=container_properties['id'],
+                                                                  partition_key=container_properties['partition_key'],
+                                                                  offer_throughput=throughput)
 
 print("Container created!")
 
@@ -192,40 +903,732 @@ throughput?
 '''
 
 # --------------------------------------------------------------------------------
-# Copying data of one container to another
+# Staying inside the provisioned RU/s (client side rate limiting)
 # --------------------------------------------------------------------------------
 
-from azure.cosmos import CosmosClient
+# When we send more than the provisioned RU/s, Cosmos DB answers 429 (too many requests) with a
+# retry-after hint, and the SDK quietly waits and retries - so latency becomes unpredictable.
+# RUScheduler paces the requests on our side instead:
+#   * a token bucket filled with the container's provisioned RU/s (times headroom, to stay just under it).
+#     Before a request we take its estimated RU charge, afterwards we correct the bucket with the real charge
+#     from the x-ms-request-charge header. Estimates are a moving average per operation.
+#   * when the SDK reports it had to retry 429s (x-ms-throttle-retry-* headers) or a 429 reaches us,
+#     everybody pauses for the retry-after time and the rate is lowered, then raised slowly again.
+#   * priority='interactive' requests go first - 'background' ones (bulk jobs) wait while interactive ones are waiting.
+
+from azure.cosmos import exceptions
+
+
+class RUScheduler:
+    def __init__(self, ru_per_second, headroom=0.9, burst_seconds=1.0, default_estimate=10.0, max_retries=5):
+        self.target_rate = ru_per_second * headroom
+        self.rate = self.target_rate
+        self.capacity = self.target_rate * burst_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.default_estimate = default_estimate
+        self.max_retries = max_retries
+        self.estimates = {}
+        self.waiting = {'interactive': 0, 'background': 0}
+        self.condition = threading.Condition()
+        self.stats = Counter({'requests': 0, 'ru_charged': 0.0, 'throttled': 0, 'wait_seconds': 0.0})
+
+    @classmethod
+    def for_container(cls, container, default_ru_per_second=400, **kwargs):
+        try:
+            throughput = container.get_throughput()
+            ru_per_second = throughput.offer_throughput or throughput.auto_scale_max_throughput
+        except exceptions.CosmosHttpResponseError:
+            # no throughput on the container itself (e.g. shared database throughput)
+            ru_per_second = default_ru_per_second
+        return cls(ru_per_second or default_ru_per_second, **kwargs)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, ru, priority='background'):
+        started = time.monotonic()
+        with self.condition:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    self._refill()
+                    now = time.monotonic()
+                    wanted = min(ru, self.capacity)
+                    if now < self.paused_until:
+                        timeout = self.paused_until - now
+                    elif priority == 'background' and self.waiting['interactive']:
+                        timeout = 0.05  # let interactive requests go first
+                    elif self.tokens >= wanted:
+                        self.tokens -= ru  # can go below zero - a big request is paid off by waiting later
+                        return
+                    else:
+                        timeout = (wanted - self.tokens) / self.rate
+                    self.condition.wait(timeout)
+            finally:
+                self.waiting[priority] -= 1
+                self.stats['wait_seconds'] += time.monotonic() - started
+                self.condition.notify_all()
+
+    def _throttled(self, retry_after_seconds):
+        # caller holds the lock
+        self.stats['throttled'] += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + retry_after_seconds)
+        self.rate = max(self.target_rate * 0.1, self.rate * 0.8)
+        self.tokens = min(self.tokens, 0)
+
+    def record(self, operation, estimated_ru, headers):
+        charge = float((headers or {}).get('x-ms-request-charge', estimated_ru))
+        with self.condition:
+            self.tokens += estimated_ru - charge
+            self.estimates[operation] = 0.8 * self.estimates.get(operation, charge) + 0.2 * charge
+            self.stats['requests'] += 1
+            self.stats['ru_charged'] += charge
+            if int((headers or {}).get('x-ms-throttle-retry-count', 0) or 0):
+                # the SDK already hit 429s and retried them for us - slow down
+                self._throttled(float(headers.get('x-ms-throttle-retry-wait-time-ms', 0)) / 1000)
+            else:
+                self.rate = min(self.target_rate, self.rate + self.target_rate * 0.01)
+            self.condition.notify_all()
+
+    def _charge_hook(self, captured, response_hook):
+        # the charge of a request comes with its own response - last_response_headers is shared by every
+        # thread using the client. The caller's hook is still called.
+        def hook(headers, result):
+            captured.clear()
+            captured.update(headers)
+            if response_hook:
+                response_hook(headers, result)
+        return hook
+
+    def _retry_throttled(self, name, estimated_ru, error, attempt):
+        # a 429 the SDK gave up on: give the tokens back, pause everyone for the retry-after and slow down
+        if error.status_code != 429 or attempt == self.max_retries:
+            self.record(name, estimated_ru, {'x-ms-request-charge': 0})
+            return False
+        with self.condition:
+            self.tokens += estimated_ru
+            self._throttled(float((error.headers or {}).get('x-ms-retry-after-ms', 1000)) / 1000)
+        return True
+
+    def run(self, operation, *args, priority='background', response_hook=None, **kwargs):
+        # e.g. scheduler.run(container.upsert_item, body=item) or run(container.read_item, ..., priority='interactive')
+        name = operation.__name__
+        captured = {}
+        for attempt in range(self.max_retries + 1):
+            estimated_ru = self.estimates.get(name, self.default_estimate)
+            self.acquire(estimated_ru, priority)
+            captured.clear()
+            try:
+                result = operation(*args, response_hook=self._charge_hook(captured, response_hook), **kwargs)
+            except exceptions.CosmosHttpResponseError as e:
+                if not self._retry_throttled(name, estimated_ru, e, attempt):
+                    raise
+                continue
+            self.record(name, estimated_ru, captured)
+            return result
+
+    def query_items(self, container, query, priority='background', response_hook=None, **kwargs):
+        # paced page by page - every page is a separate request with its own RU charge. A throttled page
+        # is asked for again from the continuation of the page before it.
+        if 'partition_key' not in kwargs:
+            kwargs.setdefault('enable_cross_partition_query', True)
+        captured = {}
+        hook = self._charge_hook(captured, response_hook)
+        continuation = None
+        pages = container.query_items(query=query, response_hook=hook, **kwargs).by_page()
+        attempt = 0
+        while True:
+            estimated_ru = self.estimates.get('query_page', self.default_estimate)
+            self.acquire(estimated_ru, priority)
+            captured.clear()
+            try:
+                page = list(next(pages))
+            except StopIteration:
+                with self.condition:
+                    self.tokens += estimated_ru
+                return
+            except exceptions.CosmosHttpResponseError as e:
+                if not self._retry_throttled('query_page', estimated_ru, e, attempt):
+                    raise
+                attempt += 1
+                pages = container.query_items(query=query, response_hook=hook, **kwargs).by_page(continuation)
+                continue
+            attempt = 0
+            continuation = pages.continuation_token
+            self.record('query_page', estimated_ru, captured)
+            yield from page
+
+
+ru_scheduler = RUScheduler.for_container(container_client)
+
+# bulk work goes in the background...
+ru_scheduler.run(container_client.upsert_item, body=new_item)
+for item in ru_scheduler.query_items(container_client, "SELECT * FROM c"):
+    pass
+
+# ...while a user waiting for an answer gets served first
+item = ru_scheduler.run(container_client.read_item, item='someUniqueId', partition_key='partitionKeyValue',
+                        priority='interactive')
+print(dict(ru_scheduler.stats))
+
+# --------------------------------------------------------------------------------
+# Copying data of one container to another
+# --------------------------------------------------------------------------------
 
-url = "YOUR_COSMOS_DB_ENDPOINT_URL"
-key = "YOUR_COSMOS_DB_KEY"
 database_name = "YOUR_DATABASE_NAME"
 
-# Initialize Cosmos client and get database
-client = CosmosClient(url, credential=key)
+# Get the (cached) Cosmos client and the database
+client = get_cosmos_client()
 database = client.get_database_client(database_name)
 
 # Source and destination containers
 source_container = database.get_container_client("source_container_name")
 destination_container = database.get_container_client("destination_container_name")
 
-# Query all documents in the source container
-documents = list(source_container.query_items(
-    query="SELECT * FROM c",
-    enable_cross_partition_query=True
-))
+# Wrapping query_items in list(...) pulls the whole source container into memory,
+# and upserting the documents one after another means one round trip at a time.
+# For big containers we walk the source page by page instead, keep a bounded window
+# of upserts running against the destination, and save a checkpoint
+# (continuation token + number of documents copied) after every page,
+# so a crashed copy can be started again and continue from the last finished page.
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def load_copy_checkpoint(checkpoint_path):
+    # returns (continuation_token, copied, done) - a missing file means start from scratch
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return None, 0, False
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+    return checkpoint.get('continuation_token'), checkpoint.get('copied', 0), checkpoint.get('done', False)
+
+
+def save_copy_checkpoint(checkpoint_path, continuation_token, copied, done=False):
+    # write to a temp file and swap it in, so a crash in the middle never leaves a half written checkpoint
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'continuation_token': continuation_token, 'copied': copied, 'done': done}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+@instrumented("copy_container_documents")
+def copy_container_documents(source_container, destination_container, query="SELECT * FROM c",
+                             page_size=1000, max_in_flight=32, checkpoint_path=None):
+    continuation_token, copied, done = load_copy_checkpoint(checkpoint_path)
+    if done:
+        print(f"Copy already completed ({copied} documents), nothing to do.")
+        return copied
+
+    # max_item_count is the page size - only one page of documents is held in memory at a time
+    pages = source_container.query_items(
+        query=query,
+        enable_cross_partition_query=True,
+        max_item_count=page_size
+    ).by_page(continuation_token)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for page in pages:
+            in_flight = set()
+            page_count = 0
+            for doc in page:
+                # never keep more than max_in_flight upserts running at once
+                if len(in_flight) >= max_in_flight:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        future.result()  # re-raises a failed upsert
+                in_flight.add(executor.submit(destination_container.upsert_item, doc))
+                page_count += 1
+
+            # the whole page has to land before its continuation token is saved,
+            # otherwise a restart could skip documents that were never written
+            for future in wait(in_flight).done:
+                future.result()
+
+            copied += page_count
+            if checkpoint_path:
+                save_copy_checkpoint(checkpoint_path, pages.continuation_token, copied)
+            print(f"Copied {copied} documents so far...")
+
+    if checkpoint_path:
+        save_copy_checkpoint(checkpoint_path, None, copied, done=True)
+    print(f"Copy completed! {copied} documents copied.")
+    return copied
+
+# Upserts are idempotent, so if we crash in the middle of a page the rerun simply writes that page again.
+copy_container_documents(source_container, destination_container, checkpoint_path="copy_checkpoint.json")
+
+# tests/test_copy_container.py runs this copy (and the resume from a checkpoint) against the in-memory
+# clients of fakes.py, benchmark.py measures it.
+
+# --------------------------------------------------------------------------------
+# Keeping a copy up to date with the change feed
+# --------------------------------------------------------------------------------
+
+# copy_container_documents reads the whole source again on every run, even if only a few documents changed.
+# The change feed gives us only the documents created or modified since a continuation token, per feed range.
+# sync_container_changes keeps one continuation per feed range in a local lease file (ChangeFeedLeaseStore):
+#   * feed ranges are read in turns, one page each. The changed documents of a page are grouped by partition key
+#     and written to the destination as transactional batches from a worker pool, while the other ranges are read.
+#   * a range's continuation is saved only after its page has landed, and its next page is written only after
+#     that - so an older version of a document can never overwrite a newer one, and a crash just repeats a page.
+#   * follow=False catches up once and returns, follow=True keeps tailing the feed (poll_interval between rounds).
+#   * lag_seconds per range is how old the newest change we applied is while a range still has changes
+#     (0 once it is caught up) - together with applied/s this shows if the sync keeps up with the writers.
+#   * the change feed has no deletes - with soft_delete_field set, documents where that field is true
+#     are deleted in the destination instead of written.
+#   * several workers can share one lease file (on a shared disk): each range is leased by one owner for
+#     lease_seconds, renewed with every page and every round. Each worker takes at most its fair share of the
+#     ranges and gives back the ones above it when more workers show up; the ranges of a worker that stopped
+#     are taken over once its leases expire (right away after a clean stop).
+#   * the continuation comes from the last response headers of the source client, which every request of that
+#     client overwrites - so read the source through its own client (get_cosmos_client(dedicated=True),
+#     which still shares the connection pool).
+
+
+import socket
+import uuid
+from contextlib import contextmanager
 
-# Insert each document into the destination container
-for doc in documents:
-    destination_container.upsert_item(doc)
+
+class ChangeFeedLeaseStore:
+    def __init__(self, path, owner=None, lease_seconds=60):
+        self.path = path
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.feed_ranges = None
+        self.leases = {}
+        self.workers = {}
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                saved = json.load(f)
+            self.feed_ranges = saved['feed_ranges']
+            self.leases = saved['leases']
+            self.workers = saved.get('workers', {})
+
+    @contextmanager
+    def locked(self):
+        # several workers (processes) share the file - every read-modify-write holds a lock file
+        lock_path = self.path + '.lock'
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > 30:
+                        os.remove(lock_path)  # left behind by a worker that crashed while holding it
+                except FileNotFoundError:
+                    pass
+                time.sleep(0.01)
+        try:
+            self.load()
+            yield
+        finally:
+            os.close(fd)
+            os.remove(lock_path)
+
+    def init_feed_ranges(self, read_feed_ranges):
+        # the first worker decides the feed ranges, everyone after it uses the saved ones
+        with self.locked():
+            if self.feed_ranges is None:
+                self.feed_ranges = list(read_feed_ranges())
+                self.save()
+        return self.feed_ranges
+
+    def acquire(self, range_keys):
+        # takes free (or expired) leases up to a fair share of the live workers, gives back the ones above it.
+        # Called every round, it also renews the leases we keep - returns the range keys we own.
+        with self.locked():
+            now = time.time()
+            self.workers = {owner: expires for owner, expires in self.workers.items() if expires > now}
+            self.workers[self.owner] = now + self.lease_seconds
+            share = -(-len(range_keys) // len(self.workers))
+            owned = [key for key in range_keys if self._owns(key, now)]
+            for key in owned[share:]:
+                self.leases[key].update(owner=None, expires=0)
+            owned = owned[:share]
+            for key in range_keys:
+                if len(owned) >= share:
+                    break
+                lease = self.leases.setdefault(key, {'continuation': None, 'applied': 0})
+                if key not in owned and (not lease.get('owner') or lease.get('expires', 0) <= now):
+                    owned.append(key)
+            for key in owned:
+                self.leases[key].update(owner=self.owner, expires=now + self.lease_seconds)
+            self.save()
+        return [key for key in range_keys if key in owned]
+
+    def _owns(self, range_key, now):
+        lease = self.leases.get(range_key, {})
+        return lease.get('owner') == self.owner and lease.get('expires', 0) > now
+
+    def continuation(self, range_key):
+        return self.leases.get(range_key, {}).get('continuation')
+
+    def update(self, range_key, continuation, applied):
+        # False if the lease expired and another worker took the range - it continues from our last saved page
+        with self.locked():
+            now = time.time()
+            lease = self.leases.setdefault(range_key, {'continuation': None, 'applied': 0})
+            if lease.get('owner') not in (None, self.owner) and lease.get('expires', 0) > now:
+                return False
+            lease['continuation'] = continuation
+            lease['applied'] += applied
+            lease['updated'] = now
+            lease.update(owner=self.owner, expires=now + self.lease_seconds)
+            self.save()
+        return True
+
+    def release(self):
+        # on a clean stop the other workers can take our ranges right away instead of waiting for them to expire
+        with self.locked():
+            for lease in self.leases.values():
+                if lease.get('owner') == self.owner:
+                    lease.update(owner=None, expires=0)
+            self.workers.pop(self.owner, None)
+            self.save()
+
+    def save(self):
+        # same temp file + swap as save_copy_checkpoint
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'feed_ranges': self.feed_ranges, 'leases': self.leases, 'workers': self.workers}, f)
+        os.replace(tmp_path, self.path)
+
+
+def _apply_changes(container, partition_key, docs, soft_delete_field):
+    operations = [("delete", (doc['id'],)) if soft_delete_field and doc.get(soft_delete_field) else ("upsert", (doc,))
+                  for doc in docs]
+    try:
+        container.execute_item_batch(batch_operations=operations, partition_key=partition_key)
+    except (exceptions.CosmosBatchOperationError, exceptions.CosmosHttpResponseError):
+        # e.g. deleting a document the destination never had fails the whole batch - apply them one by one
+        for operation, (argument,) in operations:
+            if operation == "upsert":
+                container.upsert_item(argument)
+                continue
+            try:
+                container.delete_item(argument, partition_key=partition_key)
+            except exceptions.CosmosResourceNotFoundError:
+                pass
+    return sum(1 for operation, _ in operations if operation == "delete")
+
+
+@instrumented("sync_container_changes")
+def sync_container_changes(source_container, destination_container, partition_key_path, lease_path,
+                           page_size=1000, max_workers=16, follow=False, poll_interval=5,
+                           soft_delete_field=None, report_every=30, owner=None, lease_seconds=60):
+    leases = ChangeFeedLeaseStore(lease_path, owner=owner, lease_seconds=lease_seconds)
+    # keep the feed ranges of the first run - the continuation tokens follow partition splits by themselves
+    leases.init_feed_ranges(source_container.read_feed_ranges)
+    range_keys = [json.dumps(feed_range, sort_keys=True) for feed_range in leases.feed_ranges]
+
+    stats = {'applied': 0, 'deleted': 0, 'pages': 0, 'rounds': 0,
+             'ranges': {index: {'applied': 0, 'lag_seconds': None} for index in range(len(range_keys))}}
+    started = last_report = time.time()
+
+    def finish(index, pending):
+        futures, continuation, docs = pending
+        stats['deleted'] += sum(future.result() for future in futures)  # re-raises a failed batch
+        if not leases.update(range_keys[index], continuation, len(docs)):
+            readers.pop(index, None)  # another worker took the range over
+            return
+        stats['applied'] += len(docs)
+        stats['ranges'][index]['applied'] += len(docs)
+        stats['ranges'][index]['lag_seconds'] = round(max(0, time.time() - max(doc.get('_ts', 0) for doc in docs)), 1)
+
+    readers = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                stats['rounds'] += 1
+                owned = set(leases.acquire(range_keys))
+                for index, feed_range in enumerate(leases.feed_ranges):
+                    if range_keys[index] not in owned:
+                        continue
+                    continuation = leases.continuation(range_keys[index])
+                    if continuation:
+                        # the continuation already knows its feed range (and where it stopped)
+                        paged = source_container.query_items_change_feed(continuation=continuation, max_item_count=page_size)
+                    else:
+                        paged = source_container.query_items_change_feed(feed_range=feed_range, start_time="Beginning",
+                                                                         max_item_count=page_size)
+                    readers[index] = paged.by_page()
+
+                in_flight = {}
+                while readers:
+                    for index in list(readers):
+                        # a range's next page waits for its previous one, other ranges keep writing meanwhile
+                        if index in in_flight:
+                            finish(index, in_flight.pop(index))
+                        if index not in readers:
+                            continue
+                        pages = readers[index]
+                        page = next(pages, None)
+                        docs = list(page) if page is not None else []
+                        if not docs:
+                            del readers[index]
+                            stats['ranges'][index]['lag_seconds'] = 0
+                            continue
+
+                        by_partition_key = defaultdict(list)
+                        for doc in docs:
+                            by_partition_key[partition_key_value(doc, partition_key_path)].append(doc)
+                        futures = [executor.submit(_apply_changes, destination_container, partition_key,
+                                                   group[start:start + BATCH_OPERATION_LIMIT], soft_delete_field)
+                                   for partition_key, group in by_partition_key.items()
+                                   for start in range(0, len(group), BATCH_OPERATION_LIMIT)]
+                        in_flight[index] = (futures, pages.continuation_token, docs)
+                        stats['pages'] += 1
+
+                    if time.time() - last_report >= report_every:
+                        last_report = time.time()
+                        lags = [r['lag_seconds'] for r in stats['ranges'].values() if r['lag_seconds'] is not None]
+                        print(f"{stats['applied']} changes applied, "
+                              f"{stats['applied'] / (last_report - started):.0f}/s, max lag {max(lags, default=0)}s")
+
+                if not follow:
+                    break
+                time.sleep(poll_interval)
+    finally:
+        leases.release()
+
+    stats['elapsed_seconds'] = round(time.time() - started, 3)
+    stats['applied_per_second'] = round(stats['applied'] / stats['elapsed_seconds'], 1) if stats['elapsed_seconds'] else None
+    return stats
+
+# the first run copies everything (start from the beginning of the feed), every later run only the changes
+change_feed_client = get_cosmos_client(url, key, dedicated=True)
+change_feed_source = change_feed_client.get_database_client(database_name).get_container_client("source_container_name")
+print(sync_container_changes(change_feed_source, destination_container, "/somePath", "change_feed_leases.json"))
+
+# or keep the destination following the source (stop with Ctrl+C, the leases are already saved)
+# sync_container_changes(change_feed_source, destination_container, "/somePath", "change_feed_leases.json", follow=True)
+
+# --------------------------------------------------------------------------------
+# Loading JSON / JSONL blobs from a storage container into a Cosmos container
+# --------------------------------------------------------------------------------
+
+# Instead of download_blob + upsert_item by hand, one file and one item at a time, load_blobs_into_container
+# runs three stages at the same time, connected by bounded queues:
+#   1. the blob listing of the prefix, streamed into the blob queue.
+#   2. download_workers threads download blobs chunk by chunk and parse documents as the chunks arrive -
+#      .jsonl/.ndjson line by line, .json as one document or an array of documents - so a blob is never held whole.
+#   3. writer_workers threads upsert the documents through an RUScheduler, so the writers never go above
+#      the container's RU/s budget.
+# When the writers are held back by the RU budget, the document queue fills up, the parsers block on it,
+# the downloads stop reading, and the listing waits - memory stays bounded, the RU budget sets the pace.
+# Every report_every seconds it prints per stage throughput and the depth of both queues.
+
+import codecs
+import queue
+from client_factory import get_blob_service_client
+
+_STAGE_DONE = object()
+
+
+def _json_documents(chunks, blob_name):
+    # chunks of bytes -> documents, without joining the chunks into one string
+    # (utf-8-sig: files saved by Windows tools often start with a byte order mark, which is dropped)
+    text = codecs.getincrementaldecoder('utf-8-sig')()
+    if blob_name.endswith(('.jsonl', '.ndjson')):
+        yield from _json_lines(chunks, text)
+        return
+
+    decoder = json.JSONDecoder()
+    buffer = ''       # text from the first document not parsed yet
+    pieces = []       # decoded chunks not added to buffer yet
+    waiting = 0       # length of pieces
+    parse_at = 0      # parse again once buffer + pieces are this long
+    for chunk in chunks:
+        piece = text.decode(chunk)
+        pieces.append(piece)
+        waiting += len(piece)
+        if len(buffer) + waiting < parse_at:
+            continue  # a document bigger than a chunk - don't parse it again from its start for every chunk
+        buffer += ''.join(pieces)
+        pieces, waiting = [], 0
+        documents, position = _decode_documents(decoder, buffer)
+        yield from documents
+        # the consumed prefix is dropped; an unfinished document is tried again once the text has doubled,
+        # so a document of n characters is parsed O(log n) times instead of once per chunk
+        buffer = buffer[position:]
+        parse_at = 2 * len(buffer)
+    buffer += ''.join(pieces) + text.decode(b'', final=True)
+    documents, position = _decode_documents(decoder, buffer)
+    yield from documents
+    if position < len(buffer):
+        raise ValueError("incomplete JSON at the end of the blob")
+
+
+def _decode_documents(decoder, buffer):
+    # the complete documents in buffer, and the position of the first one that is not complete yet
+    documents = []
+    position = 0
+    while True:
+        # skip the whitespace, the array brackets and the commas between documents
+        while position < len(buffer) and buffer[position] in ' \t\r\n[],':
+            position += 1
+        if position == len(buffer):
+            return documents, position
+        try:
+            document, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            return documents, position  # the document continues in the next chunks
+        documents.append(document)
+
+
+def _json_lines(chunks, text):
+    # one document per line; a line longer than a chunk is collected in pieces and joined once
+    pieces = []
+    for chunk in chunks:
+        *lines, rest = text.decode(chunk).split('\n')
+        if lines:
+            lines[0] = ''.join(pieces) + lines[0]
+            pieces = []
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        pieces.append(rest)
+    line = ''.join(pieces) + text.decode(b'', final=True)
+    if line.strip():
+        yield json.loads(line)
+
+
+@instrumented("load_blobs_into_container")
+def load_blobs_into_container(blob_container_name, destination_container, prefix=None, scheduler=None,
+                              download_workers=8, writer_workers=16, queue_size=10000, report_every=10):
+    blob_container = get_blob_service_client().get_container_client(blob_container_name)
+    scheduler = scheduler or RUScheduler.for_container(destination_container)
+    blob_queue = queue.Queue(maxsize=download_workers * 2)
+    document_queue = queue.Queue(maxsize=queue_size)
+    stats = Counter()
+    errors = []
+    lock = threading.Lock()
+    start = time.time()
+    ru_before = scheduler.stats['ru_charged']  # the scheduler may be shared with other work
+
+    def count(**counts):
+        with lock:
+            stats.update(counts)
+
+    def list_blobs():
+        try:
+            for blob in blob_container.list_blobs(name_starts_with=prefix):
+                if blob.name.endswith(('.json', '.jsonl', '.ndjson')):
+                    blob_queue.put(blob.name)
+                    count(blobs_listed=1)
+        except Exception as e:
+            errors.append(f"listing: {e}")
+        finally:
+            for _ in range(download_workers):
+                blob_queue.put(_STAGE_DONE)
+
+    def download_and_parse():
+        while True:
+            blob_name = blob_queue.get()
+            if blob_name is _STAGE_DONE:
+                return
+            try:
+                chunks = blob_container.download_blob(blob_name).chunks()
+                for document in _json_documents(counted(chunks), blob_name):
+                    if not isinstance(document, dict) or 'id' not in document:
+                        count(documents_rejected=1)
+                        continue
+                    document_queue.put(document)  # blocks while the writers are behind
+                    count(documents_parsed=1)
+                count(blobs_done=1)
+            except Exception as e:
+                # a broken blob is reported, the documents already queued from it are still written
+                count(blobs_failed=1)
+                errors.append(f"{blob_name}: {e}")
+
+    def counted(chunks):
+        for chunk in chunks:
+            count(bytes_downloaded=len(chunk))
+            yield chunk
+
+    def write():
+        while True:
+            document = document_queue.get()
+            if document is _STAGE_DONE:
+                return
+            try:
+                scheduler.run(destination_container.upsert_item, body=document)
+                count(documents_written=1)
+            except Exception as e:
+                # a writer that stopped here would leave the parsers blocked on a full queue
+                count(documents_failed=1)
+                errors.append(f"{document['id']}: {e}")
+
+    lister = threading.Thread(target=list_blobs, daemon=True)
+    lister.start()
+    with ThreadPoolExecutor(max_workers=download_workers + writer_workers) as executor:
+        downloads = [executor.submit(download_and_parse) for _ in range(download_workers)]
+        writers = [executor.submit(write) for _ in range(writer_workers)]
+
+        # once all downloads are done, every writer gets a _STAGE_DONE after the last document
+        stage = downloads
+        last_report = time.time()
+        while True:
+            if not wait(stage, timeout=report_every).not_done:
+                if stage is writers:
+                    break
+                for _ in writers:
+                    document_queue.put(_STAGE_DONE)
+                stage = writers
+            if time.time() - last_report >= report_every:
+                last_report = time.time()
+                elapsed = last_report - start
+                print(f"blobs {stats['blobs_done']}/{stats['blobs_listed']} "
+                      f"({stats['bytes_downloaded'] / (1024 * 1024) / elapsed:.1f} MB/s), "
+                      f"parsed {stats['documents_parsed'] / elapsed:.0f}/s, "
+                      f"written {stats['documents_written'] / elapsed:.0f}/s, "
+                      f"{(scheduler.stats['ru_charged'] - ru_before) / elapsed:.0f} RU/s, "
+                      f"queued blobs {blob_queue.qsize()}, queued documents {document_queue.qsize()}")
+        for future in downloads + writers:
+            future.result()
+    lister.join()
+
+    elapsed = time.time() - start
+    result = dict(stats)
+    result.update({
+        'elapsed_seconds': round(elapsed, 3),
+        'documents_per_second': round(stats['documents_written'] / max(elapsed, 0.001), 1),
+        'mb_per_second': round(stats['bytes_downloaded'] / (1024 * 1024) / max(elapsed, 0.001), 2),
+        'ru_charged': round(scheduler.stats['ru_charged'] - ru_before, 2),
+        'errors': errors[:100],
+    })
+    return result
+
+
+print(load_blobs_into_container("your_blob_container_name", destination_container, prefix="exports/2023/"))
 
 # --------------------------------------------------------------------------------
 # Delete Containers
 # --------------------------------------------------------------------------------
 
-# Initialize Cosmos client and get a reference to the database
-client = CosmosClient(url, credential=key)
+# Get the (cached) Cosmos client and a reference to the database
+client = get_cosmos_client()
 database = client.get_database_client(database_name)
 
 # Delete the container
-database.delete_container(container_name)
\ No newline at end of file
+database.delete_container(container_name)
+
+# --------------------------------------------------------------------------------
+# Close the client
+# --------------------------------------------------------------------------------
+
+# how often the cached client was reused and how many HTTP connections were opened vs. reused
+print(factory_stats())
+close_all_clients()
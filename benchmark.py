@@ -0,0 +1,242 @@
+# Date Created: 17/Oct/2026
+# Date Modified: 17/Oct/2026
+
+'''
+Benchmarks of the blob and Cosmos helpers
+--------------------------------------------------------------------------------
+
+    python benchmark.py           # both suites
+    python benchmark.py blob      # or just one of them
+    python benchmark.py cosmos
+
+Settings are in the [benchmark] section of config.ini:
+
+    * blob_connection_string - Azurite, the local storage emulator (UseDevelopmentStorage=true), or any account.
+    * cosmos_url / cosmos_key - the Cosmos DB emulator (its well known key), or any account.
+    * with [fakes] enabled=true, client_factory hands out the in-memory clients of fakes.py instead -
+      no network at all, so a run shows the cost of our own code (plus the latency set in [fakes]).
+
+For every blob size the blob suite uploads `count` blobs, lists them, downloads them, copies them with copy_blobs
+and deletes them - one by one (delete) and with bulk_delete_blobs (batch_delete). For every document size the
+Cosmos suite measures upsert, query (per page), copy_container_documents and delete.
+
+    * latency p50/p95/p99, ops/s and MB/s of every operation, and the RU charged for Cosmos.
+    * every run is appended as one JSON line to results_path, so a change can be compared with the runs before it.
+    * the containers are created for the run and deleted afterwards.
+--------------------------------------------------------------------------------
+'''
+
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from azure.cosmos import CosmosClient, PartitionKey
+
+from client_factory import load_config, get_blob_service_client, get_cosmos_client, get_transport, close_all_clients
+from instrumentation import latency_stats
+from script_helpers import load_helpers
+
+
+def _timed(fn, *args, **kwargs):
+    started = time.time()
+    fn(*args, **kwargs)
+    return time.time() - started
+
+
+def _timed_call(fn, *args, **kwargs):
+    # returns (latency, RU charge) of a Cosmos call
+    charges = []
+    started = time.time()
+    fn(*args, response_hook=lambda headers, _: charges.append(float(headers.get('x-ms-request-charge', 0))), **kwargs)
+    return time.time() - started, sum(charges)
+
+
+def _benchmark_result(latencies, elapsed, total_bytes=None, charges=None):
+    result = {
+        'latency_seconds': latency_stats(latencies),
+        'elapsed_seconds': round(elapsed, 3),
+        'ops_per_second': round(len(latencies) / max(elapsed, 0.001), 1),
+        'mb_per_second': round(total_bytes / (1024 * 1024) / max(elapsed, 0.001), 2) if total_bytes else None,
+    }
+    if charges is not None:
+        result['ru'] = round(sum(charges), 2)
+        result['ru_per_op'] = round(sum(charges) / len(charges), 2) if charges else None
+    return result
+
+
+def _append_run(run, results_path):
+    if results_path:
+        with open(results_path, 'a') as f:
+            f.write(json.dumps(run) + '\n')
+    return run
+
+
+# --------------------------------------------------------------------------------
+# Blob storage
+# --------------------------------------------------------------------------------
+
+def _benchmark_blob_size(blob, size, count, max_workers):
+    # blob - the helpers of BlobServiceClient.py, working on the benchmarked account
+    service = blob.blob_service_client
+    src_container_name = f"bench-{uuid.uuid4().hex[:12]}"
+    dest_container_name = f"bench-{uuid.uuid4().hex[:12]}"
+    src_container = service.create_container(src_container_name)
+    dest_container = service.create_container(dest_container_name)
+    names = [f"blob-{i:06d}" for i in range(count)]
+    data = os.urandom(size)
+    result = {}
+    try:
+        start = time.time()
+        latencies = list(blob.map_bounded(lambda name: _timed(src_container.upload_blob, name, data, overwrite=True),
+                                          names, max_workers))
+        result['upload'] = _benchmark_result(latencies, time.time() - start, size * count)
+
+        # one latency per listing page
+        start = time.time()
+        latencies = []
+        page_started = time.time()
+        for page in src_container.list_blobs(results_per_page=max(1, count // 10)).by_page():
+            list(page)
+            latencies.append(time.time() - page_started)
+            page_started = time.time()
+        result['list'] = _benchmark_result(latencies, time.time() - start)
+
+        start = time.time()
+        latencies = list(blob.map_bounded(lambda name: _timed(lambda: src_container.download_blob(name).readall()),
+                                          names, max_workers))
+        result['download'] = _benchmark_result(latencies, time.time() - start, size * count)
+
+        copied = []
+        copied_summary = blob.copy_blobs(
+            [(src_container_name, name, dest_container_name, name, size) for name in names],
+            max_workers=max_workers,
+            on_done=lambda copy, status, latency, description: status == 'success' and copied.append(copy[3]))
+        result['copy'] = {
+            'latency_seconds': copied_summary['latency_seconds'],
+            'elapsed_seconds': copied_summary['elapsed_seconds'],
+            'ops_per_second': copied_summary['copies_per_second'],
+            'mb_per_second': round(size * len(copied) / (1024 * 1024) / max(copied_summary['elapsed_seconds'], 0.001), 2),
+            'failed': copied_summary['failed'] + copied_summary['aborted'],
+        }
+
+        start = time.time()
+        latencies = list(blob.map_bounded(lambda name: _timed(dest_container.delete_blob, name), copied, max_workers))
+        result['delete'] = _benchmark_result(latencies, time.time() - start)
+
+        deleted = blob.bulk_delete_blobs(src_container_name, prefix="blob-", max_workers=max_workers)
+        result['batch_delete'] = {'elapsed_seconds': deleted['elapsed_seconds'],
+                                  'ops_per_second': deleted['deletes_per_second'], 'statuses': deleted['statuses']}
+    finally:
+        service.delete_container(src_container_name)
+        service.delete_container(dest_container_name)
+    return result
+
+
+def run_blob_benchmark(connection_string, sizes, count, max_workers=8, results_path=None):
+    service = get_blob_service_client(connection_string)
+    blob = load_helpers("BlobServiceClient.py", blob_service_client=service)
+    run = {'suite': 'blob', 'started': datetime.now(timezone.utc).isoformat(), 'target': service.url,
+           'count': count, 'max_workers': max_workers, 'sizes': {}}
+    for size in sizes:
+        run['sizes'][str(size)] = _benchmark_blob_size(blob, size, count, max_workers)
+    return _append_run(run, results_path)
+
+
+# --------------------------------------------------------------------------------
+# Cosmos DB
+# --------------------------------------------------------------------------------
+
+def _benchmark_document_size(cosmos, source, destination, size, count, max_workers):
+    # cosmos - the helpers of CosmosDB.py
+    documents = [{'id': str(i), 'pk': f"pk{i % 10}", 'payload': 'x' * size} for i in range(count)]
+    total_bytes = sum(len(json.dumps(doc)) for doc in documents)
+    result = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        start = time.time()
+        measured = list(executor.map(lambda doc: _timed_call(source.upsert_item, doc), documents))
+        result['upsert'] = _benchmark_result([latency for latency, _ in measured], time.time() - start, total_bytes,
+                                             [charge for _, charge in measured])
+
+        # one measurement per result page
+        start = time.time()
+        latencies = []
+        charges = []
+        pages = source.query_items(query="SELECT * FROM c", enable_cross_partition_query=True,
+                                   max_item_count=max(1, count // 10),
+                                   response_hook=lambda headers, _: charges.append(float(headers.get('x-ms-request-charge', 0))))
+        page_started = time.time()
+        for page in pages.by_page():
+            list(page)
+            latencies.append(time.time() - page_started)
+            page_started = time.time()
+        result['query'] = _benchmark_result(latencies, time.time() - start, total_bytes, charges)
+
+        start = time.time()
+        cosmos.copy_container_documents(source, destination, page_size=max(1, count // 10), max_in_flight=max_workers)
+        elapsed = time.time() - start
+        result['copy'] = {'elapsed_seconds': round(elapsed, 3), 'ops_per_second': round(count / max(elapsed, 0.001), 1),
+                          'mb_per_second': round(total_bytes / (1024 * 1024) / max(elapsed, 0.001), 2)}
+
+        start = time.time()
+        measured = list(executor.map(
+            lambda doc: _timed_call(source.delete_item, doc['id'], partition_key=doc['pk']), documents))
+        result['delete'] = _benchmark_result([latency for latency, _ in measured], time.time() - start,
+                                             charges=[charge for _, charge in measured])
+    return result
+
+
+def _benchmark_cosmos_client(cosmos_url, cosmos_key):
+    config = load_config()
+    if config.getboolean('fakes', 'enabled', fallback=False):
+        return get_cosmos_client()  # the fake account of fakes.py
+    # the emulator uses a self-signed certificate, so this client skips the certificate check
+    return CosmosClient(cosmos_url, credential=cosmos_key, connection_verify=False, transport=get_transport(config))
+
+
+def run_cosmos_benchmark(cosmos_url, cosmos_key, document_sizes, count, max_workers=16, results_path=None):
+    cosmos = load_helpers("CosmosDB.py")
+    run = {'suite': 'cosmos', 'started': datetime.now(timezone.utc).isoformat(), 'target': cosmos_url,
+           'count': count, 'max_workers': max_workers, 'sizes': {}}
+    benchmark_client = _benchmark_cosmos_client(cosmos_url, cosmos_key)
+    benchmark_database = benchmark_client.create_database_if_not_exists(id="benchmark")
+    for size in document_sizes:
+        names = [f"bench-{uuid.uuid4().hex[:12]}" for _ in range(2)]
+        source, destination = [benchmark_database.create_container(id=name, partition_key=PartitionKey(path='/pk'))
+                               for name in names]
+        try:
+            run['sizes'][str(size)] = _benchmark_document_size(cosmos, source, destination, size, count, max_workers)
+        finally:
+            for name in names:
+                benchmark_database.delete_container(name)
+    return _append_run(run, results_path)
+
+
+def _print_run(run):
+    for size, operations in run['sizes'].items():
+        for operation, measured in operations.items():
+            print(run['suite'], size, operation, (measured.get('latency_seconds') or {}).get('p95'),
+                  measured['ops_per_second'], measured.get('ru', ''))
+
+
+if __name__ == "__main__":
+    suites = sys.argv[1:] or ['blob', 'cosmos']
+    settings = load_config()['benchmark']
+    count = int(settings['count'])
+    max_workers = int(settings['max_workers'])
+    try:
+        if 'blob' in suites:
+            _print_run(run_blob_benchmark(
+                settings['blob_connection_string'],
+                sizes=[int(size) for size in settings['blob_sizes'].split(',')],
+                count=count, max_workers=max_workers, results_path=settings['results_path']))
+        if 'cosmos' in suites:
+            _print_run(run_cosmos_benchmark(
+                settings['cosmos_url'], settings['cosmos_key'],
+                document_sizes=[int(size) for size in settings['document_sizes'].split(',')],
+                count=count, max_workers=max_workers, results_path=settings['results_path']))
+    finally:
+        close_all_clients()
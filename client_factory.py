@@ -0,0 +1,257 @@
+# Date Created: 17/Oct/2026
+# Date Modified: 17/Oct/2026
+
+# Install library - pip install azure-storage-blob azure-cosmos requests
+
+'''
+Shared client factory for BlobServiceClient.py and CosmosDB.py
+--------------------------------------------------------------------------------
+
+Building a new client for every helper call means a new connection pool,
+and every new connection pays a TCP + TLS handshake again.
+
+    * Connection settings are read from config.ini (same folder as this file).
+    * One client is created per account and then reused - the sync clients are thread-safe,
+      so the same client can be shared by all threads of a thread pool.
+    * All clients share one HTTP transport (a requests session), whose connection pool size
+      and keep-alive come from the [http_pool] section of config.ini.
+    * factory_stats() shows client cache hits/misses and how many connections were opened and reused.
+    * close_all_clients() closes everything once, at the very end of the program.
+    * With [instrumentation] enabled=true the shared transport also records request metrics
+      (see instrumentation.py), and close_all_clients() exports them.
+    * With [fakes] enabled=true the factory hands out the in-memory clients of fakes.py instead
+      (the async ones too), so the helpers can be load tested without an account or a network.
+--------------------------------------------------------------------------------
+'''
+
+import configparser
+import os
+import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobServiceClient
+from azure.cosmos import CosmosClient
+
+import fakes
+import instrumentation
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.ini")
+
+_lock = threading.Lock()
+_instrumentation_lock = threading.Lock()  # get_transport holds _lock while it turns instrumentation on
+_clients = {}
+_transport = None
+_adapter = None
+_stats = {'client_hits': 0, 'client_misses': 0}
+
+
+def load_config(path=CONFIG_PATH):
+    config = configparser.ConfigParser()
+    config.read(path)
+    return config
+
+
+class _PooledAdapter(HTTPAdapter):
+    # HTTPAdapter that opens its connections with our socket options (TCP keep-alive)
+    def __init__(self, socket_options, **kwargs):
+        self.socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def get_transport(config=None):
+    # one requests session (and so one connection pool) for every client we hand out
+    global _transport, _adapter
+    with _lock:
+        if _transport is None:
+            config = config or load_config()
+            pool = config['http_pool'] if config.has_section('http_pool') else {}
+            keep_alive = str(pool.get('keep_alive', 'true')).lower() == 'true'
+
+            socket_options = list(HTTPConnection.default_socket_options)
+            if keep_alive:
+                # TCP keep-alive, so idle pooled connections are not silently dropped by load balancers
+                socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+
+            _adapter = _PooledAdapter(
+                socket_options,
+                pool_connections=int(pool.get('pool_connections', 10)),  # number of hosts kept in the pool
+                pool_maxsize=int(pool.get('pool_maxsize', 64)),          # connections kept per host
+            )
+
+            session = requests.Session()
+            session.mount('https://', _adapter)
+            session.mount('http://', _adapter)
+            if not keep_alive:
+                session.headers['Connection'] = 'close'
+
+            # session_owner=False - closing one client must not close the session the others are using
+            transport_class = RequestsTransport
+            if _start_instrumentation(config):
+                transport_class = instrumentation.InstrumentedTransport
+            _transport = transport_class(
+                session=session,
+                session_owner=False,
+                connection_timeout=int(pool.get('connection_timeout', 20)),
+                read_timeout=int(pool.get('read_timeout', 60)),
+            )
+        return _transport
+
+
+def _start_instrumentation(config):
+    # turns instrumentation on (once) when config.ini asks for it - the fakes have no transport,
+    # but their helpers are still timed by @instrumented
+    if not config.getboolean('instrumentation', 'enabled', fallback=False):
+        return False
+    with _instrumentation_lock:
+        if not instrumentation.enabled:
+            instrumentation.enable(_instrumentation_sink(config['instrumentation']))
+    return True
+
+
+def _instrumentation_sink(settings):
+    sink = settings.get('sink', 'memory')
+    if sink == 'prometheus':
+        return instrumentation.PrometheusSink(settings.get('path', 'metrics.prom'))
+    if sink == 'jsonl':
+        return instrumentation.JsonLinesSink(settings.get('path', 'metrics.jsonl'))
+    return instrumentation.InMemorySink()
+
+
+def _cached_client(cache_key, create):
+    with _lock:
+        client = _clients.get(cache_key)
+        if client is not None:
+            _stats['client_hits'] += 1
+            return client
+        _stats['client_misses'] += 1
+    client = create()
+    with _lock:
+        # if another thread created the same client in the meantime, keep the first one
+        return _clients.setdefault(cache_key, client)
+
+
+def _fake_behaviour(settings):
+    ru_per_second = settings.get('ru_per_second')
+    return fakes.FakeBehaviour(
+        latency=settings.getfloat('latency_ms', 0) / 1000,
+        jitter=settings.getfloat('jitter_ms', 0) / 1000,
+        throttle_rate=settings.getfloat('throttle_rate', 0),
+        retry_after=settings.getfloat('retry_after_ms', 100) / 1000,
+        sdk_retries=settings.getint('sdk_retries', 0),
+        ru_per_second=float(ru_per_second) if ru_per_second else None,
+        seed=settings.getint('seed', 0),
+    )
+
+
+def _fake_blob_service_client(settings, account_name=None):
+    client = fakes.FakeBlobServiceClient(account_name or 'fakeaccount', behaviour=_fake_behaviour(settings),
+                                         auto_create=settings.getboolean('auto_create', False))
+    client.seed_blobs([path.strip() for path in settings.get('seed_blobs', '').split(',') if path.strip()])
+    return client
+
+
+def get_blob_service_client(connection_string=None, account_name=None, account_key=None):
+    # without arguments: [connection_string] from config.ini, or [blob_key] if there is no connection string
+    config = load_config()
+    if config.getboolean('fakes', 'enabled', fallback=False):
+        _start_instrumentation(config)
+        return _cached_client(('blob', 'fake'), lambda: _fake_blob_service_client(config['fakes'], account_name))
+    if connection_string is None and account_name is None:
+        connection_string = config.get('connection_string', 'your_conn_string', fallback=None)
+        if not connection_string:
+            account_name = config['blob_key']['account_name']
+            account_key = config['blob_key']['account_key']
+
+    transport = get_transport(config)
+    if connection_string:
+        return _cached_client(
+            ('blob', connection_string),
+            lambda: BlobServiceClient.from_connection_string(connection_string, transport=transport)
+        )
+    account_url = f"https://{account_name}.blob.core.windows.net"
+    return _cached_client(
+        ('blob', account_url),
+        lambda: BlobServiceClient(account_url=account_url, credential=account_key, transport=transport)
+    )
+
+
+def get_cosmos_client(url=None, key=None, dedicated=False):
+    # without arguments: url and key from the [cosmos] section of config.ini
+    # dedicated=True - a client of its own (not shared with the other helpers), still on the shared pool,
+    # for readers that depend on the last response headers of their client (the change feed continuation)
+    config = load_config()
+    if config.getboolean('fakes', 'enabled', fallback=False):
+        # the fake has one account, and its change feed continuations don't come from shared headers
+        _start_instrumentation(config)
+        return _cached_client(('cosmos', 'fake'), lambda: fakes.FakeCosmosClient(
+            behaviour=_fake_behaviour(config['fakes']),
+            auto_create=config.getboolean('fakes', 'auto_create', fallback=False),
+            partition_key_path=config.get('fakes', 'partition_key_path', fallback='/id')))
+    url = url or config['cosmos']['url']
+    key = key or config['cosmos']['key']
+    transport = get_transport(config)
+    if dedicated:
+        return _cached_client(('cosmos', url, object()), lambda: CosmosClient(url, credential=key, transport=transport))
+    return _cached_client(('cosmos', url), lambda: CosmosClient(url, credential=key, transport=transport))
+
+
+def get_async_blob_service_client(connection_string=None):
+    # a new azure.storage.blob.aio client - async clients belong to their event loop, so they are not cached,
+    # close it with "async with". With fakes it is the async face of the fake account.
+    config = load_config()
+    connection_string = connection_string or config.get('connection_string', 'your_conn_string', fallback=None)
+    if config.getboolean('fakes', 'enabled', fallback=False):
+        return fakes.FakeAsync(get_blob_service_client(connection_string))
+    from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+    return AsyncBlobServiceClient.from_connection_string(connection_string)
+
+
+def get_async_cosmos_client(url=None, key=None):
+    # a new azure.cosmos.aio client, not cached either (see get_async_blob_service_client)
+    config = load_config()
+    if config.getboolean('fakes', 'enabled', fallback=False):
+        return fakes.FakeAsync(get_cosmos_client())
+    from azure.cosmos.aio import CosmosClient as AsyncCosmosClient
+    return AsyncCosmosClient(url or config['cosmos']['url'], credential=key or config['cosmos']['key'])
+
+
+def factory_stats():
+    stats = dict(_stats)
+    stats['clients'] = len(_clients)
+    stats.update({'hosts': 0, 'connections_opened': 0, 'requests_sent': 0, 'idle_connections': 0})
+    if _adapter is not None:
+        pools = _adapter.poolmanager.pools
+        for pool_key in pools.keys():
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            stats['hosts'] += 1
+            stats['connections_opened'] += pool.num_connections
+            stats['requests_sent'] += pool.num_requests
+            # the pool queue is padded with None placeholders, only real connections count
+            stats['idle_connections'] += sum(1 for connection in list(pool.pool.queue) if connection is not None)
+    # every request that did not need a new connection reused a pooled one (no new handshake)
+    stats['connections_reused'] = stats['requests_sent'] - stats['connections_opened']
+    return stats
+
+
+def close_all_clients():
+    global _transport, _adapter
+    with _lock:
+        for client in _clients.values():
+            # same as leaving a "with client:" block - works for blob and cosmos clients
+            client.__exit__(None, None, None)
+        _clients.clear()
+        if _transport is not None:
+            instrumentation.export_metrics()
+            _transport.session.close()
+            _transport = None
+            _adapter = None
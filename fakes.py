@@ -0,0 +1,1215 @@
+# Date Created: 17/Oct/2026
+# Date Modified: 17/Oct/2026
+
+'''
+In-memory stand-ins for BlobServiceClient and CosmosClient
+--------------------------------------------------------------------------------
+
+Every helper in BlobServiceClient.py and CosmosDB.py needs a live account. With [fakes] enabled=true
+in config.ini, client_factory hands out these fakes instead, so the helpers run offline, in one process:
+
+    * FakeBlobServiceClient - containers (list / create / delete) and blobs (upload, staged blocks,
+      download with chunks(), list with metadata / tags / snapshots, copy from URL, snapshots,
+      metadata and tags with etag conditions, single and batch deletes).
+    * FakeCosmosClient - databases, containers and items (create / upsert / read / delete, transactional
+      batches, feed ranges and the change feed) and queries. The query support is a small subset of the
+      Cosmos SQL: SELECT * / SELECT VALUE COUNT(1) / a list of paths with AS aliases, FROM c,
+      WHERE with comparisons, AND, OR and parentheses, and ORDER BY. Anything else raises NotImplementedError.
+    * FakeAsync(fake) - the same account through the async API (azure.storage.blob.aio / azure.cosmos.aio),
+      as client_factory's get_async_blob_service_client / get_async_cosmos_client return it.
+
+Like the SDK, get_database_client / get_container_client only build a handle, a missing database or container
+fails on its first request. With auto_create=True ([fakes] auto_create in config.ini) it is created then instead,
+so the scripts run against the names they use (YOUR_DATABASE_NAME, ...) without creating them first, and
+[fakes] seed_blobs lists the example blobs they read without uploading. The steps that read local files
+(your_file_path, ...) still need those files, and the closing examples that build SDK clients directly
+(BlobServiceClient.from_connection_string) still need a real connection string.
+
+FakeBehaviour decides how the fake service behaves - shared by all containers of a client:
+
+    * latency (+ random jitter) is slept on every request, so concurrency shows up like on a real network.
+    * throttle_rate - share of requests answered with 429 (Cosmos) / 503 server busy (storage),
+      with retry_after seconds as the retry-after hint.
+    * ru_per_second - a provisioned throughput for the Cosmos fake; requests beyond it are throttled too.
+    * sdk_retries - how many throttled attempts are retried inside the fake first (sleeping retry_after),
+      like the SDK retry policies do. Cosmos responses then carry x-ms-throttle-retry-count / -wait-time-ms.
+    * RU charges grow with the document size (read_ru_per_kb / write_ru_per_kb, query_ru per page).
+    * a fixed seed makes the random parts (jitter, throttling) repeat from run to run.
+--------------------------------------------------------------------------------
+'''
+
+import asyncio
+import base64
+import copy
+import functools
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from urllib.parse import quote, unquote, urlparse, parse_qs
+
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.core.paging import ItemPaged
+from azure.cosmos import exceptions as cosmos_exceptions
+from azure.cosmos.partition_key import NonePartitionKeyValue
+from azure.storage.blob import (BlobAnalyticsLogging, BlobBlock, BlobProperties, ContainerProperties, ContentSettings,
+                                Metrics, RetentionPolicy, StaticWebsite, UserDelegationKey)
+
+SINGLE_PUT_LIMIT = 64 * 1024 * 1024  # larger uploads are staged in blocks by the SDK, and get no content_md5
+BATCH_DELETE_LIMIT = 256
+BATCH_OPERATION_LIMIT = 100
+
+
+class FakeBehaviour:
+    def __init__(self, latency=0.0, jitter=0.0, throttle_rate=0.0, retry_after=0.1, sdk_retries=0,
+                 ru_per_second=None, read_ru_per_kb=1.0, write_ru_per_kb=5.0, query_ru=2.5, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.sdk_retries = sdk_retries
+        self.ru_per_second = ru_per_second
+        self.read_ru_per_kb = read_ru_per_kb
+        self.write_ru_per_kb = write_ru_per_kb
+        self.query_ru = query_ru
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = ru_per_second or 0
+        self.updated = time.monotonic()
+        self.stats = Counter()
+
+    def _throttle_wait(self, ru):
+        # seconds to wait before retrying, or None if the request may go through
+        with self.lock:
+            if self.throttle_rate and self.random.random() < self.throttle_rate:
+                return self.retry_after
+            if self.ru_per_second and ru:
+                now = time.monotonic()
+                self.tokens = min(self.ru_per_second, self.tokens + (now - self.updated) * self.ru_per_second)
+                self.updated = now
+                if self.tokens < min(ru, self.ru_per_second):
+                    return max(self.retry_after, (min(ru, self.ru_per_second) - self.tokens) / self.ru_per_second)
+                self.tokens -= ru
+            return None
+
+    def request(self, ru=0.0):
+        # one request: latency, then throttling - returns (retries, waited seconds) or raises _Throttled
+        retries = 0
+        waited = 0.0
+        while True:
+            with self.lock:
+                delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+                self.stats['requests'] += 1
+            if delay:
+                time.sleep(delay)
+            wait_seconds = self._throttle_wait(ru)
+            if wait_seconds is None:
+                with self.lock:
+                    self.stats['ru'] += ru
+                return retries, waited
+            with self.lock:
+                self.stats['throttled'] += 1
+            if retries >= self.sdk_retries:
+                raise _Throttled(wait_seconds)
+            retries += 1
+            waited += wait_seconds
+            time.sleep(wait_seconds)
+
+
+class _Throttled(Exception):
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+def _status_error(status_code, message, headers=None):
+    # what the storage SDK raises for statuses it has no special exception for
+    error = HttpResponseError(message=message)
+    error.status_code = status_code
+    error.headers = headers or {}
+    return error
+
+
+def _read_data(data):
+    if hasattr(data, 'read'):
+        data = data.read()
+    elif not isinstance(data, (bytes, bytearray, memoryview, str)):
+        data = b''.join(data)  # iterable of chunks
+    return data.encode('utf-8') if isinstance(data, str) else bytes(data)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+# --------------------------------------------------------------------------------
+# Blob storage
+# --------------------------------------------------------------------------------
+
+class _StoredBlob:
+    __slots__ = ('data', 'metadata', 'tags', 'content_settings', 'etag', 'last_modified', 'copy')
+
+    def __init__(self, data, metadata=None, tags=None, content_settings=None, copy_source=None):
+        self.data = data
+        self.metadata = dict(metadata or {})
+        self.tags = dict(tags or {})
+        self.content_settings = dict(content_settings or {})
+        self.etag = f'"0x{uuid.uuid4().hex[:15].upper()}"'
+        self.last_modified = _now()
+        self.copy = {'id': str(uuid.uuid4()), 'source': copy_source, 'status': 'success'} if copy_source else None
+
+
+class FakeBlobServiceClient:
+    def __init__(self, account_name="fakeaccount", behaviour=None, auto_create=False):
+        self.account_name = account_name
+        self.url = f"https://{account_name}.blob.core.windows.net/"
+        self.behaviour = behaviour or FakeBehaviour()
+        self.auto_create = auto_create  # a container that is used before it was created is created then
+        self.lock = threading.RLock()
+        # name -> {'properties': ..., 'blobs': {name: _StoredBlob}, 'snapshots': {...}, 'blocks': {...}, 'deleted': {...}}
+        self.containers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def close(self):
+        pass
+
+    def seed_blobs(self, paths, data=b'seeded by fakes.py'):
+        # "container/blob name" paths that should exist from the start (the blobs a script reads without uploading)
+        with self.lock:
+            for path in paths:
+                container_name, _, blob_name = path.partition('/')
+                container = self.containers.get(container_name) or self._new_container(container_name)
+                container['blobs'][blob_name] = _StoredBlob(data, content_settings={
+                    'content_md5': bytearray(hashlib.md5(data).digest())})
+
+    def _request(self):
+        try:
+            self.behaviour.request()
+        except _Throttled as e:
+            raise _status_error(503, "The server is busy.", {'Retry-After': str(e.retry_after)})
+
+    def _container(self, name):
+        with self.lock:
+            container = self.containers.get(name)
+            if container is None and self.auto_create:
+                container = self._new_container(name)
+        if container is None:
+            raise ResourceNotFoundError(message=f"The specified container does not exist: {name}")
+        return container
+
+    def _new_container(self, name, metadata=None):
+        properties = ContainerProperties()
+        properties.name = name
+        properties.metadata = dict(metadata or {})
+        properties.last_modified = _now()
+        properties.etag = f'"0x{uuid.uuid4().hex[:15].upper()}"'
+        self.containers[name] = {'properties': properties, 'blobs': {}, 'snapshots': {}, 'blocks': {}, 'deleted': {}}
+        return self.containers[name]
+
+    def list_containers(self, name_starts_with=None, include_metadata=False, **kwargs):
+        self._request()
+        with self.lock:
+            return [container['properties'] for name, container in sorted(self.containers.items())
+                    if name.startswith(name_starts_with or '')]
+
+    def create_container(self, name, metadata=None, **kwargs):
+        self._request()
+        with self.lock:
+            if name in self.containers:
+                raise ResourceExistsError(message=f"The specified container already exists: {name}")
+            self._new_container(name, metadata)
+        return self.get_container_client(name)
+
+    def delete_container(self, container, **kwargs):
+        self._request()
+        name = getattr(container, 'name', container)
+        with self.lock:
+            if name not in self.containers:
+                raise ResourceNotFoundError(message=f"The specified container does not exist: {name}")
+            del self.containers[name]
+
+    def get_container_client(self, container):
+        return FakeContainerClient(self, getattr(container, 'name', container))
+
+    def get_blob_client(self, container, blob, snapshot=None):
+        return FakeBlobClient(self, getattr(container, 'name', container), getattr(blob, 'name', blob), snapshot)
+
+    def get_account_information(self, **kwargs):
+        self._request()
+        return {'sku_name': 'Standard_LRS', 'account_kind': 'StorageV2'}
+
+    def get_service_properties(self, **kwargs):
+        self._request()
+        return {'analytics_logging': BlobAnalyticsLogging(), 'hour_metrics': Metrics(), 'minute_metrics': Metrics(),
+                'cors': [], 'target_version': None, 'delete_retention_policy': RetentionPolicy(enabled=True, days=7),
+                'static_website': StaticWebsite()}
+
+    def get_user_delegation_key(self, key_start_time, key_expiry_time, **kwargs):
+        # the fake doesn't check credentials - the real service hands these out to Microsoft Entra ID clients only
+        self._request()
+        key = UserDelegationKey()
+        key.signed_oid = key.signed_tid = str(uuid.UUID(int=0))
+        key.signed_start = key_start_time.strftime('%Y-%m-%dT%H:%M:%SZ')
+        key.signed_expiry = key_expiry_time.strftime('%Y-%m-%dT%H:%M:%SZ')
+        key.signed_service = 'b'
+        key.signed_version = '2021-08-06'
+        key.value = base64.b64encode(hashlib.sha256(self.account_name.encode()).digest()).decode()
+        return key
+
+    def _resolve_url(self, url):
+        # our own blob URLs -> (container, blob, snapshot)
+        parsed = urlparse(url)
+        if not url.startswith(self.url):
+            raise _status_error(404, f"CannotVerifyCopySource: {url}")
+        container, _, blob = parsed.path.lstrip('/').partition('/')
+        return container, unquote(blob), parse_qs(parsed.query).get('snapshot', [None])[0]
+
+    def _properties(self, container_name, blob_name, stored, snapshot=None):
+        properties = BlobProperties()
+        properties.name = blob_name
+        properties.container = container_name
+        properties.snapshot = snapshot
+        properties.blob_type = 'BlockBlob'
+        properties.size = len(stored.data)
+        properties.etag = stored.etag
+        properties.last_modified = stored.last_modified
+        properties.creation_time = stored.last_modified
+        properties.metadata = dict(stored.metadata)
+        properties.tags = dict(stored.tags) or None
+        properties.tag_count = len(stored.tags) or None
+        properties.content_settings = ContentSettings(**stored.content_settings)
+        if stored.copy:
+            properties.copy.id = stored.copy['id']
+            properties.copy.source = stored.copy['source']
+            properties.copy.status = stored.copy['status']
+        return properties
+
+
+class FakeContainerClient:
+    def __init__(self, service, container_name):
+        self.service = service
+        self.container_name = container_name
+        self.url = f"{service.url}{container_name}"
+
+    def get_blob_client(self, blob, snapshot=None):
+        return FakeBlobClient(self.service, self.container_name, getattr(blob, 'name', blob), snapshot)
+
+    def exists(self, **kwargs):
+        self.service._request()
+        return self.container_name in self.service.containers
+
+    def create_container(self, **kwargs):
+        return self.service.create_container(self.container_name, **kwargs)
+
+    def delete_container(self, **kwargs):
+        self.service.delete_container(self.container_name)
+
+    def upload_blob(self, name, data, **kwargs):
+        blob_client = self.get_blob_client(name)
+        blob_client.upload_blob(data, **kwargs)
+        return blob_client
+
+    def download_blob(self, blob, offset=None, length=None, **kwargs):
+        return self.get_blob_client(blob).download_blob(offset=offset, length=length)
+
+    def delete_blob(self, blob, delete_snapshots=None, **kwargs):
+        self.get_blob_client(blob).delete_blob(delete_snapshots=delete_snapshots)
+
+    def list_blobs(self, name_starts_with=None, include=None, results_per_page=None, **kwargs):
+        include = [include] if isinstance(include, str) else (include or [])
+        service = self.service
+        page_size = results_per_page or 5000
+
+        def get_next(marker):
+            service._request()
+            with service.lock:
+                container = service._container(self.container_name)
+                names = sorted(name for name in container['blobs'] if name.startswith(name_starts_with or '')
+                               and (marker is None or name >= marker))
+                page, next_marker = names[:page_size], (names[page_size] if len(names) > page_size else None)
+                listed = []
+                for name in page:
+                    if 'snapshots' in include:
+                        # snapshots come oldest first, right before their base blob
+                        for snapshot, stored in sorted(container['snapshots'].get(name, {}).items()):
+                            listed.append(service._properties(self.container_name, name, stored, snapshot))
+                    listed.append(service._properties(self.container_name, name, container['blobs'][name]))
+            if 'metadata' not in include:
+                for properties in listed:
+                    properties.metadata = {}
+            if 'tags' not in include:
+                for properties in listed:
+                    properties.tags = None
+            return next_marker, listed
+
+        return ItemPaged(get_next, lambda response: (response[0], iter(response[1])))
+
+    def delete_blobs(self, *blobs, delete_snapshots=None, raise_on_any_failure=True, **kwargs):
+        if len(blobs) > BATCH_DELETE_LIMIT:
+            raise ValueError(f"The batch can't contain more than {BATCH_DELETE_LIMIT} sub-requests.")
+        # one HTTP request for the whole batch, but every sub-request can be throttled on its own
+        self.service._request()
+        responses = []
+        for blob in blobs:
+            name = blob.get('name') if isinstance(blob, dict) else getattr(blob, 'name', blob)
+            snapshot = blob.get('snapshot') if isinstance(blob, dict) else None
+            etag = blob.get('etag') if isinstance(blob, dict) else None
+            if self.service.behaviour.throttle_rate and self.service.behaviour._throttle_wait(0) is not None:
+                responses.append(SimpleNamespace(status_code=503, reason='Server Busy'))
+                continue
+            try:
+                FakeBlobClient(self.service, self.container_name, name, snapshot)._delete(
+                    delete_snapshots or (blob.get('delete_snapshots') if isinstance(blob, dict) else None), etag)
+                responses.append(SimpleNamespace(status_code=202, reason='Accepted'))
+            except ResourceNotFoundError:
+                responses.append(SimpleNamespace(status_code=404, reason='Not Found'))
+            except HttpResponseError as e:
+                responses.append(SimpleNamespace(status_code=e.status_code, reason=str(e)))
+        if raise_on_any_failure and any(response.status_code != 202 for response in responses):
+            raise _status_error(400, "There is a partial failure in the batch operation.")
+        return iter(responses)
+
+
+class FakeStorageStreamDownloader:
+    def __init__(self, name, container, data, properties, chunk_size=4 * 1024 * 1024):
+        self.name = name
+        self.container = container
+        self.properties = properties
+        self.size = len(data)
+        self._data = data
+        self._chunk_size = chunk_size
+
+    def readall(self):
+        return self._data
+
+    def content_as_bytes(self, max_concurrency=1):
+        return self._data
+
+    def content_as_text(self, max_concurrency=1, encoding='UTF-8'):
+        return self._data.decode(encoding)
+
+    def readinto(self, stream):
+        stream.write(self._data)
+        return self.size
+
+    def chunks(self):
+        for start in range(0, self.size, self._chunk_size):
+            yield self._data[start:start + self._chunk_size]
+
+
+class FakeBlobClient:
+    def __init__(self, service, container_name, blob_name, snapshot=None):
+        self.service = service
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.snapshot = snapshot
+        self.url = f"{service.url}{container_name}/{quote(blob_name)}" + (f"?snapshot={snapshot}" if snapshot else "")
+
+    def _stored(self, container):
+        if self.snapshot:
+            stored = container['snapshots'].get(self.blob_name, {}).get(self.snapshot)
+        else:
+            stored = container['blobs'].get(self.blob_name)
+        if stored is None:
+            raise ResourceNotFoundError(message=f"The specified blob does not exist: {self.blob_name}")
+        return stored
+
+    def _check_condition(self, stored, etag, match_condition):
+        if etag is None:
+            return
+        if match_condition == MatchConditions.IfNotModified and stored.etag != etag:
+            raise ResourceModifiedError(message="The condition specified using HTTP conditional header(s) is not met.")
+        if match_condition == MatchConditions.IfModified and stored.etag == etag:
+            raise _status_error(304, "Not Modified")
+
+    def _write(self, stored):
+        container = self.service._container(self.container_name)
+        container['blobs'][self.blob_name] = stored
+        container['blocks'].pop(self.blob_name, None)
+        return {'etag': stored.etag, 'last_modified': stored.last_modified}
+
+    def exists(self, **kwargs):
+        self.service._request()
+        with self.service.lock:
+            try:
+                self._stored(self.service._container(self.container_name))
+                return True
+            except ResourceNotFoundError:
+                return False
+
+    def upload_blob(self, data, overwrite=False, metadata=None, content_settings=None, tags=None, **kwargs):
+        data = _read_data(data)
+        self.service._request()
+        settings = dict(content_settings or {})
+        if not settings.get('content_md5') and len(data) <= SINGLE_PUT_LIMIT:
+            settings['content_md5'] = bytearray(hashlib.md5(data).digest())  # the service does this for Put Blob
+        with self.service.lock:
+            container = self.service._container(self.container_name)
+            if not overwrite and self.blob_name in container['blobs']:
+                raise ResourceExistsError(message="The specified blob already exists.")
+            return self._write(_StoredBlob(data, metadata, tags, settings))
+
+    def download_blob(self, offset=None, length=None, **kwargs):
+        self.service._request()
+        with self.service.lock:
+            stored = self._stored(self.service._container(self.container_name))
+            properties = self.service._properties(self.container_name, self.blob_name, stored, self.snapshot)
+        start = offset or 0
+        end = start + length if length is not None else len(stored.data)
+        return FakeStorageStreamDownloader(self.blob_name, self.container_name, stored.data[start:end], properties)
+
+    def get_blob_properties(self, etag=None, match_condition=None, **kwargs):
+        self.service._request()
+        with self.service.lock:
+            stored = self._stored(self.service._container(self.container_name))
+            self._check_condition(stored, etag, match_condition)
+            return self.service._properties(self.container_name, self.blob_name, stored, self.snapshot)
+
+    def set_blob_metadata(self, metadata=None, etag=None, match_condition=None, **kwargs):
+        self.service._request()
+        with self.service.lock:
+            stored = self._stored(self.service._container(self.container_name))
+            self._check_condition(stored, etag, match_condition)
+            updated = _StoredBlob(stored.data, metadata, stored.tags, stored.content_settings)
+            updated.copy = stored.copy
+            return self._write(updated)
+
+    def set_blob_tags(self, tags=None, **kwargs):
+        self.service._request()
+        with self.service.lock:
+            self._stored(self.service._container(self.container_name)).tags = dict(tags or {})
+
+    def get_blob_tags(self, **kwargs):
+        self.service._request()
+        with self.service.lock:
+            return dict(self._stored(self.service._container(self.container_name)).tags)
+
+    def create_snapshot(self, metadata=None, **kwargs):
+        self.service._request()
+        with self.service.lock:
+            container = self.service._container(self.container_name)
+            stored = self._stored(container)
+            snapshots = container['snapshots'].setdefault(self.blob_name, {})
+            snapshot = _now().strftime('%Y-%m-%dT%H:%M:%S.%f0Z')
+            while snapshot in snapshots:
+                time.sleep(0.000001)
+                snapshot = _now().strftime('%Y-%m-%dT%H:%M:%S.%f0Z')
+            snapshots[snapshot] = _StoredBlob(stored.data, metadata if metadata is not None else stored.metadata,
+                                              stored.tags, stored.content_settings)
+            return {'snapshot': snapshot, 'etag': stored.etag, 'last_modified': stored.last_modified}
+
+    def _delete(self, delete_snapshots, etag=None):
+        with self.service.lock:
+            container = self.service._container(self.container_name)
+            stored = self._stored(container)
+            self._check_condition(stored, etag, MatchConditions.IfNotModified)
+            if self.snapshot:
+                del container['snapshots'][self.blob_name][self.snapshot]
+                return
+            has_snapshots = bool(container['snapshots'].get(self.blob_name))
+            if has_snapshots and not delete_snapshots:
+                raise _status_error(409, "SnapshotsPresent: This operation is not permitted because the blob has snapshots.")
+            if delete_snapshots in ('include', 'only'):
+                container['snapshots'].pop(self.blob_name, None)
+            if delete_snapshots != 'only':
+                # soft delete is always on in the fake - the last deleted version can be undeleted
+                container['deleted'][self.blob_name] = container['blobs'].pop(self.blob_name)
+
+    def delete_blob(self, delete_snapshots=None, etag=None, match_condition=None, **kwargs):
+        self.service._request()
+        self._delete(delete_snapshots, etag)
+
+    def undelete_blob(self, **kwargs):
+        self.service._request()
+        with self.service.lock:
+            container = self.service._container(self.container_name)
+            if self.blob_name in container['blobs']:
+                return
+            if self.blob_name not in container['deleted']:
+                raise ResourceNotFoundError(message=f"The specified blob does not exist: {self.blob_name}")
+            container['blobs'][self.blob_name] = container['deleted'].pop(self.blob_name)
+
+    def _copy_from(self, source_url, overwrite=True):
+        container_name, blob_name, snapshot = self.service._resolve_url(source_url)
+        with self.service.lock:
+            source = FakeBlobClient(self.service, container_name, blob_name, snapshot)._stored(
+                self.service._container(container_name))
+            if not overwrite and self.blob_name in self.service._container(self.container_name)['blobs']:
+                raise ResourceExistsError(message="The specified blob already exists.")
+            copied = _StoredBlob(source.data, source.metadata, source.tags, source.content_settings, source_url)
+            self._write(copied)
+            return copied
+
+    def start_copy_from_url(self, source_url, **kwargs):
+        # the fake service copies right away, so the copy is already 'success' when it is started
+        self.service._request()
+        copied = self._copy_from(source_url)
+        return {'copy_id': copied.copy['id'], 'copy_status': 'success', 'etag': copied.etag,
+                'last_modified': copied.last_modified}
+
+    def upload_blob_from_url(self, source_url, overwrite=False, **kwargs):
+        self.service._request()
+        copied = self._copy_from(source_url, overwrite)
+        copied.copy = None  # Put Blob From URL is not a copy operation
+        return {'etag': copied.etag, 'last_modified': copied.last_modified}
+
+    def abort_copy(self, copy_id, **kwargs):
+        raise _status_error(409, "NoPendingCopyOperation: There is currently no pending copy operation.")
+
+    def stage_block(self, block_id, data, length=None, **kwargs):
+        data = _read_data(data)
+        self.service._request()
+        with self.service.lock:
+            container = self.service._container(self.container_name)
+            container['blocks'].setdefault(self.blob_name, {})[block_id] = data
+
+    def get_block_list(self, block_list_type="committed", **kwargs):
+        self.service._request()
+        with self.service.lock:
+            container = self.service._container(self.container_name)
+            uncommitted = []
+            for block_id, data in container['blocks'].get(self.blob_name, {}).items():
+                block = BlobBlock(block_id)
+                block.size = len(data)
+                uncommitted.append(block)
+            # committed block lists are not kept, a committed blob counts as one block
+            stored = container['blobs'].get(self.blob_name)
+            committed = [] if stored is None else [BlobBlock('committed')]
+            return (committed if block_list_type in ('committed', 'all') else [],
+                    uncommitted if block_list_type in ('uncommitted', 'all') else [])
+
+    def commit_block_list(self, block_list, content_settings=None, metadata=None, tags=None, **kwargs):
+        self.service._request()
+        with self.service.lock:
+            container = self.service._container(self.container_name)
+            staged = container['blocks'].get(self.blob_name, {})
+            ids = [getattr(block, 'id', block) for block in block_list]
+            missing = [block_id for block_id in ids if block_id not in staged]
+            if missing:
+                raise _status_error(400, f"InvalidBlockList: {len(missing)} blocks were never staged.")
+            data = b''.join(staged[block_id] for block_id in ids)
+            return self._write(_StoredBlob(data, metadata, tags, content_settings))
+
+
+# --------------------------------------------------------------------------------
+# Cosmos DB
+# --------------------------------------------------------------------------------
+
+_TOKEN = re.compile(r'''\s*(?:(?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")|(?P<number>-?\d+(?:\.\d+)?)|'''
+                    r'''(?P<param>@\w+)|(?P<op><=|>=|!=|<>|=|<|>)|(?P<punct>[\[\].,()*])|(?P<word>\w+))''')
+_TYPE_ORDER = {type(None): 1, bool: 2, int: 3, float: 3, str: 4}
+_UNDEFINED = object()
+
+
+def _tokenize(query):
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+        if not match or match.end() == position:
+            raise NotImplementedError(f"Fake Cosmos query can't parse: {query[position:]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'string':
+            value = json.loads('"' + value[1:-1].replace('"', '\\"').replace("\\'", "'") + '"') \
+                if value[0] == "'" else json.loads(value)
+        elif kind == 'number':
+            value = float(value) if '.' in value else int(value)
+        elif kind == 'word' and tokens and tokens[-1] == ('punct', '.'):
+            kind = 'name'  # c.value, c.order - a property, not a keyword
+        elif kind == 'word':
+            kind, value = ('keyword', value.upper()) if value.upper() in (
+                'SELECT', 'VALUE', 'FROM', 'WHERE', 'AND', 'OR', 'ORDER', 'BY', 'ASC', 'DESC', 'AS',
+                'TRUE', 'FALSE', 'NULL', 'COUNT') else ('name', value)
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class _QueryParser:
+    # SELECT [VALUE COUNT(1) | * | path [AS alias], ...] FROM c [WHERE condition] [ORDER BY path [ASC|DESC], ...]
+    def __init__(self, query, parameters):
+        self.tokens = _tokenize(query)
+        self.position = 0
+        self.parameters = {parameter['name']: parameter['value'] for parameter in parameters or []}
+
+    def peek(self, *expected):
+        token = self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+        return token if not expected or token[1] in expected or token[0] in expected else None
+
+    def take(self, *expected):
+        token = self.peek(*expected)
+        if token is None or token == (None, None):
+            found = self.tokens[self.position] if self.position < len(self.tokens) else 'end of query'
+            raise NotImplementedError(f"Fake Cosmos query expected {expected}, found {found}")
+        self.position += 1
+        return token
+
+    def parse(self):
+        self.take('SELECT')
+        if self.peek('VALUE'):
+            self.take('VALUE')
+            self.take('COUNT')
+            self.take('(')
+            self.take('number')
+            self.take(')')
+            select = 'count'
+        elif self.peek('*'):
+            self.take('*')
+            select = '*'
+        else:
+            select = [self.select_item()]
+            while self.peek(','):
+                self.take(',')
+                select.append(self.select_item())
+        self.take('FROM')
+        self.alias = self.take('name')[1]
+        condition = None
+        order_by = []
+        if self.peek('WHERE'):
+            self.take('WHERE')
+            condition = self.condition()
+        if self.peek('ORDER'):
+            self.take('ORDER')
+            self.take('BY')
+            while True:
+                path = self.path()
+                descending = bool(self.peek('DESC')) and self.take('DESC') is not None
+                if not descending and self.peek('ASC'):
+                    self.take('ASC')
+                order_by.append((path, descending))
+                if not self.peek(','):
+                    break
+                self.take(',')
+        if self.position != len(self.tokens):
+            raise NotImplementedError(f"Fake Cosmos query doesn't support {self.tokens[self.position:]}")
+        return select, condition, order_by
+
+    def path(self):
+        self.take('name')  # the collection alias ("c")
+        parts = []
+        while self.peek('.', '['):
+            if self.take('.', '[')[1] == '.':
+                parts.append(self.take('name')[1])
+            else:
+                parts.append(self.take('string')[1])
+                self.take(']')
+        return parts
+
+    def select_item(self):
+        path = self.path()
+        alias = self.take('name')[1] if self.peek('AS') and self.take('AS') else (path[-1] if path else None)
+        return path, alias
+
+    def condition(self):
+        left = self.conjunction()
+        while self.peek('OR'):
+            self.take('OR')
+            right = self.conjunction()
+            left = (lambda a, b: lambda doc: a(doc) or b(doc))(left, right)
+        return left
+
+    def conjunction(self):
+        left = self.comparison()
+        while self.peek('AND'):
+            self.take('AND')
+            right = self.comparison()
+            left = (lambda a, b: lambda doc: a(doc) and b(doc))(left, right)
+        return left
+
+    def comparison(self):
+        if self.peek('('):
+            self.take('(')
+            inner = self.condition()
+            self.take(')')
+            return inner
+        left = self.operand()
+        operator = self.take('op')[1]
+        right = self.operand()
+        return lambda doc: _compare(left(doc), operator, right(doc))
+
+    def operand(self):
+        kind, value = self.peek()
+        if kind == 'name':
+            path = self.path()
+            return lambda doc: _get_path(doc, path)
+        self.take()
+        if kind == 'param':
+            if value not in self.parameters:
+                raise ValueError(f"Parameter {value} is not defined")
+            constant = self.parameters[value]
+        elif kind in ('string', 'number'):
+            constant = value
+        elif value in ('TRUE', 'FALSE', 'NULL'):
+            constant = {'TRUE': True, 'FALSE': False, 'NULL': None}[value]
+        else:
+            raise NotImplementedError(f"Fake Cosmos query doesn't support {value!r} here")
+        return lambda doc: constant
+
+
+def _get_path(doc, path):
+    value = doc
+    for part in path:
+        if not isinstance(value, dict) or part not in value:
+            return _UNDEFINED
+        value = value[part]
+    return value
+
+
+def _compare(left, operator, right):
+    if left is _UNDEFINED or right is _UNDEFINED:
+        return False
+    if operator in ('=', '!=', '<>'):
+        equal = type(left) is type(right) and left == right or (
+            isinstance(left, (int, float)) and isinstance(right, (int, float))
+            and not isinstance(left, bool) and not isinstance(right, bool) and left == right)
+        return equal if operator == '=' else not equal
+    same_kind = (isinstance(left, str) and isinstance(right, str)) or (
+        isinstance(left, (int, float)) and isinstance(right, (int, float)))
+    if not same_kind:
+        return False  # Cosmos compares values of different types as undefined
+    return {'<': left < right, '>': left > right, '<=': left <= right, '>=': left >= right}[operator]
+
+
+def _sort_value(value):
+    if value is _UNDEFINED:
+        return (0, 0)
+    rank = _TYPE_ORDER.get(type(value), 5)
+    return (rank, value if rank in (2, 3, 4) else 0)
+
+
+class _ReverseKey:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class _LazyProxy:
+    # what get_container_client returns - like the SDK proxies nothing is checked when it is built,
+    # every attribute is looked up on the container (created then with auto_create, or 404) when used
+    def __init__(self, resolve, **attributes):
+        self._resolve = resolve
+        self.__dict__.update(attributes)
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+
+class FakeCosmosClient:
+    def __init__(self, url="https://fakeaccount.documents.azure.com:443/", credential=None, behaviour=None,
+                 auto_create=False, partition_key_path='/id', **kwargs):
+        self.url = url
+        self.behaviour = behaviour or FakeBehaviour()
+        self.auto_create = auto_create  # databases / containers used before they were created are created then,
+        self.partition_key_path = partition_key_path  # containers with this partition key path
+        self.lock = threading.RLock()
+        self.databases = {}  # name -> {container name: FakeContainer}
+        self.client_connection = SimpleNamespace(last_response_headers={}, url_connection=url)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def close(self):
+        pass
+
+    def _database(self, name):
+        with self.lock:
+            containers = self.databases.get(name)
+            if containers is None and self.auto_create:
+                containers = self.databases[name] = {}
+        if containers is None:
+            raise cosmos_exceptions.CosmosResourceNotFoundError(status_code=404, message=f"Database {name} not found")
+        return containers
+
+    def create_database(self, id, **kwargs):
+        with self.lock:
+            if id in self.databases:
+                raise cosmos_exceptions.CosmosResourceExistsError(status_code=409, message=f"Database {id} exists")
+            self.databases[id] = {}
+        return FakeDatabase(self, id)
+
+    def create_database_if_not_exists(self, id, **kwargs):
+        with self.lock:
+            self.databases.setdefault(id, {})
+        return FakeDatabase(self, id)
+
+    def get_database_client(self, database):
+        return FakeDatabase(self, getattr(database, 'id', database))
+
+    def list_databases(self, **kwargs):
+        with self.lock:
+            return [{'id': name} for name in self.databases]
+
+    def delete_database(self, database, **kwargs):
+        name = getattr(database, 'id', database)
+        with self.lock:
+            self._database(name)
+            del self.databases[name]
+
+
+class FakeDatabase:
+    # a handle like the SDK's DatabaseProxy - the containers are kept by the client
+    def __init__(self, client, id):
+        self.client = client
+        self.id = id
+        self.database_link = f"dbs/{id}"
+
+    def _container(self, name):
+        with self.client.lock:
+            containers = self.client._database(self.id)
+            container = containers.get(name)
+            if container is None and self.client.auto_create:
+                container = containers[name] = FakeContainer(self.client, self.database_link, name,
+                                                             self.client.partition_key_path)
+        if container is None:
+            raise cosmos_exceptions.CosmosResourceNotFoundError(status_code=404, message=f"Container {name} not found")
+        return container
+
+    def create_container(self, id, partition_key=None, partition_key_path=None, offer_throughput=None, **kwargs):
+        # partition_key is a PartitionKey (or {'paths': [...]}), partition_key_path a plain path
+        path = partition_key_path or (partition_key['paths'][0] if partition_key else '/id')
+        with self.client.lock:
+            containers = self.client._database(self.id)
+            if id in containers:
+                raise cosmos_exceptions.CosmosResourceExistsError(status_code=409, message=f"Container {id} exists")
+            containers[id] = FakeContainer(self.client, self.database_link, id, path, offer_throughput or 400)
+            return containers[id]
+
+    def create_container_if_not_exists(self, id, **kwargs):
+        with self.client.lock:
+            return self.client._database(self.id).get(id) or self.create_container(id, **kwargs)
+
+    def get_container_client(self, container):
+        name = getattr(container, 'id', container)
+        return _LazyProxy(lambda: self._container(name), id=name, container_link=f"{self.database_link}/colls/{name}",
+                          client_connection=self.client.client_connection)
+
+    def list_containers(self, **kwargs):
+        with self.client.lock:
+            return [{'id': name} for name in self.client._database(self.id)]
+
+    def delete_container(self, container, **kwargs):
+        name = getattr(container, 'id', container)
+        with self.client.lock:
+            containers = self.client._database(self.id)
+            if name not in containers:
+                raise cosmos_exceptions.CosmosResourceNotFoundError(status_code=404, message=f"Container {name} not found")
+            del containers[name]
+
+
+class FakeContainer:
+    def __init__(self, client, database_link, id, partition_key_path='/id', throughput=400, feed_range_count=4):
+        self.client = client
+        self.id = id
+        self.container_link = f"{database_link}/colls/{id}"
+        self.partition_key_path = partition_key_path
+        self.throughput = throughput
+        self.feed_range_count = feed_range_count
+        self.items = {}  # (partition key value, id) -> document
+        self.lsn = 0
+        self.client_connection = client.client_connection  # shared by all containers of a client, like in the SDK
+
+    # -- plumbing --
+
+    def _partition_key_of(self, doc):
+        # documents without a value at the partition key path are in the "undefined" partition, not in null's
+        value = _get_path(doc, self.partition_key_path.strip('/').split('/'))
+        return NonePartitionKeyValue if value is _UNDEFINED else value
+
+    def _feed_range_of(self, partition_key):
+        digest = hashlib.md5(json.dumps(partition_key, default=repr).encode()).digest()
+        return digest[0] % self.feed_range_count
+
+    def _charge(self, documents, per_kb):
+        size = sum(len(json.dumps(doc)) for doc in documents) if documents else 0
+        return round(max(1.0, size / 1024) * per_kb, 2)
+
+    def _request(self, ru, response_hook=None, result=None):
+        behaviour = self.client.behaviour
+        try:
+            retries, waited = behaviour.request(ru)
+        except _Throttled as e:
+            headers = {'x-ms-retry-after-ms': str(int(e.retry_after * 1000)), 'x-ms-request-charge': '0'}
+            self.client_connection.last_response_headers = headers
+            error = cosmos_exceptions.CosmosHttpResponseError(status_code=429, message="Request rate is large.")
+            error.headers = headers
+            raise error
+        headers = {'x-ms-request-charge': str(ru), 'x-ms-activity-id': str(uuid.uuid4())}
+        if retries:
+            headers.update({'x-ms-throttle-retry-count': str(retries),
+                            'x-ms-throttle-retry-wait-time-ms': str(int(waited * 1000))})
+        self.client_connection.last_response_headers = headers
+        if response_hook:
+            response_hook(headers, result)
+        return headers
+
+    def _store(self, body):
+        if 'id' not in body:
+            raise cosmos_exceptions.CosmosHttpResponseError(status_code=400, message="The input content is invalid because the required properties - 'id; ' - are missing")
+        self.lsn += 1
+        stored = copy.deepcopy(body)
+        stored.update({'_ts': int(time.time()), '_etag': f'"{uuid.uuid4()}"', '_lsn': self.lsn,
+                       '_rid': base64.b64encode(uuid.uuid4().bytes[:8]).decode()})
+        self.items[(self._partition_key_of(body), body['id'])] = stored
+        return copy.deepcopy(stored)
+
+    def _not_found(self, item_id):
+        return cosmos_exceptions.CosmosResourceNotFoundError(status_code=404, message=f"Entity with the specified id does not exist: {item_id}")
+
+    # -- items --
+
+    def create_item(self, body, response_hook=None, **kwargs):
+        with self.client.lock:
+            if (self._partition_key_of(body), body.get('id')) in self.items:
+                raise cosmos_exceptions.CosmosResourceExistsError(status_code=409, message="Entity with the specified id already exists in the system.")
+        self._request(self._charge([body], self.client.behaviour.write_ru_per_kb), response_hook)
+        with self.client.lock:
+            return self._store(body)
+
+    def upsert_item(self, body, response_hook=None, **kwargs):
+        self._request(self._charge([body], self.client.behaviour.write_ru_per_kb), response_hook)
+        with self.client.lock:
+            return self._store(body)
+
+    def replace_item(self, item, body, response_hook=None, **kwargs):
+        with self.client.lock:
+            if (self._partition_key_of(body), getattr(item, 'get', lambda _: item)('id')) not in self.items:
+                raise self._not_found(body.get('id'))
+        return self.upsert_item(body, response_hook)
+
+    def read_item(self, item, partition_key, response_hook=None, **kwargs):
+        item_id = item['id'] if isinstance(item, dict) else item
+        with self.client.lock:
+            doc = self.items.get((partition_key, item_id))
+        if doc is None:
+            self._request(1.0)
+            raise self._not_found(item_id)
+        self._request(self._charge([doc], self.client.behaviour.read_ru_per_kb), response_hook, doc)
+        return copy.deepcopy(doc)
+
+    def delete_item(self, item, partition_key, response_hook=None, **kwargs):
+        item_id = item['id'] if isinstance(item, dict) else item
+        with self.client.lock:
+            doc = self.items.get((partition_key, item_id))
+        if doc is None:
+            self._request(1.0)
+            raise self._not_found(item_id)
+        self._request(self._charge([doc], self.client.behaviour.write_ru_per_kb), response_hook)
+        with self.client.lock:
+            self.items.pop((partition_key, item_id), None)
+
+    def execute_item_batch(self, batch_operations, partition_key, response_hook=None, **kwargs):
+        if len(batch_operations) > BATCH_OPERATION_LIMIT:
+            raise cosmos_exceptions.CosmosHttpResponseError(status_code=400, message=f"Batch request has more operations than what is supported ({BATCH_OPERATION_LIMIT}).")
+        documents = [args[0] for operation, args, *_ in batch_operations if isinstance(args[0], dict)]
+        self._request(self._charge(documents, self.client.behaviour.write_ru_per_kb) + len(batch_operations), response_hook)
+        with self.client.lock:
+            # all or nothing - apply to a copy, swap it in only if every operation worked
+            items = dict(self.items)
+            results = []
+            for index, (operation, args, *_) in enumerate(batch_operations):
+                argument = args[0]
+                item_id = argument['id'] if isinstance(argument, dict) else argument
+                key = (partition_key, item_id)
+                status = {'create': 201, 'upsert': 200, 'replace': 200, 'delete': 204, 'read': 200}.get(operation)
+                if status is None:
+                    raise NotImplementedError(f"Fake batch doesn't support '{operation}'")
+                if (operation == 'create' and key in items) or (operation in ('replace', 'delete', 'read') and key not in items):
+                    error_status = 409 if operation == 'create' else 404
+                    raise cosmos_exceptions.CosmosBatchOperationError(
+                        error_index=index, headers={}, status_code=error_status,
+                        message=f"There was an error in the transactional batch on index {index}. Error message: {error_status}",
+                        operation_responses=[{'statusCode': error_status if i == index else 424}
+                                             for i in range(len(batch_operations))])
+                if operation == 'delete':
+                    del items[key]
+                elif operation != 'read':
+                    self.lsn += 1
+                    items[key] = dict(copy.deepcopy(argument), _ts=int(time.time()), _etag=f'"{uuid.uuid4()}"', _lsn=self.lsn)
+                results.append({'statusCode': status, 'resourceBody': copy.deepcopy(items.get(key))})
+            self.items = items
+            return results
+
+    def read_all_items(self, max_item_count=None, **kwargs):
+        return self.query_items("SELECT * FROM c", enable_cross_partition_query=True, max_item_count=max_item_count, **kwargs)
+
+    def query_items(self, query, parameters=None, partition_key=None, enable_cross_partition_query=None,
+                    max_item_count=None, response_hook=None, feed_range=None, **kwargs):
+        select, condition, order_by = _QueryParser(query, parameters).parse()
+        page_size = max_item_count if max_item_count and max_item_count > 0 else 100
+        results = []
+
+        def evaluate():
+            with self.client.lock:
+                documents = [doc for (pk, _), doc in self.items.items()
+                             if (partition_key is None or pk == partition_key)
+                             and (feed_range is None or self._feed_range_of(pk) == feed_range['fake_range'])]
+            documents = [doc for doc in documents if condition is None or condition(doc)]
+            if order_by:
+                documents.sort(key=lambda doc: [_ReverseKey(_sort_value(_get_path(doc, path))) if descending
+                                                else _sort_value(_get_path(doc, path)) for path, descending in order_by])
+            if select == 'count':
+                return [len(documents)]
+            if select == '*':
+                return [copy.deepcopy(doc) for doc in documents]
+            return [{alias: copy.deepcopy(value) for (path, alias) in select
+                     for value in [_get_path(doc, path)] if value is not _UNDEFINED} for doc in documents]
+
+        def get_next(continuation):
+            if not results:
+                results.append(evaluate())  # evaluated on the first page, like a snapshot of the container
+            offset = int(continuation or 0)
+            page = results[0][offset:offset + page_size]
+            charge = self.client.behaviour.query_ru + (self._charge(page, self.client.behaviour.read_ru_per_kb) if page else 0)
+            self._request(charge, response_hook, page)
+            next_offset = offset + page_size
+            return (str(next_offset) if next_offset < len(results[0]) else None), page
+
+        return ItemPaged(get_next, lambda response: (response[0], iter(response[1])))
+
+    # -- feed ranges and change feed --
+
+    def read_feed_ranges(self, **kwargs):
+        return [{'fake_range': index} for index in range(self.feed_range_count)]
+
+    def query_items_change_feed(self, feed_range=None, continuation=None, start_time=None, max_item_count=None,
+                                partition_key=None, response_hook=None, **kwargs):
+        # continuation: JSON with the feed range and the last LSN read. Only "Beginning" or "now" (the default) as start_time.
+        if continuation:
+            state = json.loads(base64.b64decode(continuation))
+        else:
+            state = {'range': feed_range['fake_range'] if feed_range else None,
+                     'partition_key': partition_key,
+                     'lsn': 0 if start_time == "Beginning" else self.lsn}
+        page_size = max_item_count or 100
+
+        def get_next(token):
+            current = json.loads(base64.b64decode(token)) if token else state
+            with self.client.lock:
+                changed = sorted((doc for (pk, _), doc in self.items.items()
+                                  if doc['_lsn'] > current['lsn']
+                                  and (current['range'] is None or self._feed_range_of(pk) == current['range'])
+                                  and (current['partition_key'] is None or pk == current['partition_key'])),
+                                 key=lambda doc: doc['_lsn'])[:page_size]
+            self._request(self._charge(changed, self.client.behaviour.read_ru_per_kb), response_hook, changed)
+            if not changed:
+                raise StopIteration  # caught up - the continuation stays at the last page, like the SDK
+            following = dict(current, lsn=changed[-1]['_lsn'])
+            return base64.b64encode(json.dumps(following).encode()).decode(), [copy.deepcopy(doc) for doc in changed]
+
+        return ItemPaged(get_next, lambda response: (response[0], iter(response[1])))
+
+    def get_throughput(self, **kwargs):
+        return SimpleNamespace(offer_throughput=self.throughput, auto_scale_max_throughput=None)
+
+
+# --------------------------------------------------------------------------------
+# Async clients
+# --------------------------------------------------------------------------------
+
+class FakeAsync:
+    # the azure.storage.blob.aio / azure.cosmos.aio face of any fake above, sharing its data:
+    # the calls run in worker threads, so the latency of concurrent requests overlaps like on a network
+    _PAGED = {'list_containers', 'list_blobs', 'list_databases', 'query_items', 'read_all_items',
+              'query_items_change_feed', 'read_feed_ranges'}
+    _CHILDREN = {'get_database_client', 'get_container_client', 'get_blob_client'}
+    _CREATES = {'create_container', 'create_database', 'create_database_if_not_exists', 'create_container_if_not_exists'}
+
+    def __init__(self, wrapped):
+        self._wrapped = wrapped
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def close(self):
+        pass
+
+    def __getattr__(self, name):
+        attribute = getattr(self._wrapped, name)
+        if name in self._PAGED:
+            return lambda *args, **kwargs: _AsyncPaged(functools.partial(attribute, *args, **kwargs))
+        if name in self._CHILDREN:
+            return lambda *args, **kwargs: FakeAsync(attribute(*args, **kwargs))
+        if not callable(attribute):
+            return attribute
+
+        async def call(*args, **kwargs):
+            result = await asyncio.to_thread(attribute, *args, **kwargs)
+            return FakeAsync(result) if name in self._CREATES else result
+        return call
+
+
+class _AsyncPaged:
+    # AsyncItemPaged look-alike: iterate the items, or by_page() for pages (each an async iterator of items)
+    def __init__(self, list_items):
+        self._list_items = list_items
+
+    def __aiter__(self):
+        return self._items()
+
+    async def _items(self):
+        async for page in self.by_page():
+            async for item in page:
+                yield item
+
+    def by_page(self, continuation_token=None):
+        return _AsyncPages(self._list_items, continuation_token)
+
+
+class _AsyncPages:
+    def __init__(self, list_items, continuation_token):
+        self._list_items = list_items
+        self._pages = None
+        self.continuation_token = continuation_token
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        page = await asyncio.to_thread(self._next_page)
+        if page is None:
+            raise StopAsyncIteration
+        return _async_items(page)
+
+    def _next_page(self):
+        if self._pages is None:
+            result = self._list_items()
+            # ItemPaged results have pages, plain lists (list_databases, read_feed_ranges, ...) are one page
+            self._pages = result.by_page(self.continuation_token) if hasattr(result, 'by_page') else iter([result])
+        try:
+            page = list(next(self._pages))
+        except StopIteration:
+            return None
+        self.continuation_token = getattr(self._pages, 'continuation_token', None)
+        return page
+
+
+async def _async_items(items):
+    for item in items:
+        yield item
@@ -0,0 +1,272 @@
+# Date Created: 17/Oct/2026
+# Date Modified: 17/Oct/2026
+
+'''
+Request metrics for the blob and Cosmos helpers
+--------------------------------------------------------------------------------
+
+Both SDKs let us bring our own HTTP transport, and client_factory already gives every client the same one.
+When [instrumentation] enabled=true in config.ini, that transport is an InstrumentedTransport, which
+sees every HTTP attempt the SDKs make (including the ones their retry policies repeat) and records:
+
+    * latency (until the response headers arrive - a streamed download body is not included),
+    * bytes sent and received (Content-Length), the status code, and the RU charge of Cosmos requests,
+    * throttles (429, and 503 "server busy" from storage) and retries (an attempt that repeats the
+      failed attempt just before it on the same thread - the sync SDKs retry on the calling thread).
+
+The @instrumented("name") decorator records the same kind of event for a whole helper call
+(bulk_delete_blobs, copy_container_documents, ...), so slow helpers and slow requests can be told apart.
+
+Every event goes to all registered sinks:
+
+    * InMemorySink - latency histograms and counters per (service, operation), snapshot() returns them.
+    * PrometheusSink - an InMemorySink that export() writes in the Prometheus text format.
+    * JsonLinesSink - appends every event as one JSON line.
+
+When instrumentation is disabled, client_factory uses the plain transport and an @instrumented helper only
+checks the enabled flag before calling the function, so nothing is measured. The flag is read on every call,
+so helpers decorated before enable() ran (the scripts decorate them at import) are measured from then on.
+--------------------------------------------------------------------------------
+'''
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+from azure.core.pipeline.transport import RequestsTransport
+
+# upper bounds (seconds) of the latency histogram buckets, the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+THROTTLE_STATUSES = {429, 503}
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+sinks = []
+enabled = False
+
+
+def enable(*new_sinks):
+    global enabled
+    sinks.extend(new_sinks)
+    enabled = True
+
+
+def record(event):
+    for sink in sinks:
+        sink.record(event)
+
+
+def export_metrics():
+    # write out what the sinks hold (Prometheus file, flushed JSON lines)
+    for sink in sinks:
+        sink.export()
+
+
+def _request_operation(request):
+    # Cosmos signs requests with "type=master&ver=...&sig=..." (URL encoded), storage with SharedKey / Bearer / SAS
+    headers = {name.lower(): str(value).lower() for name, value in request.headers.items()}
+    url = urlparse(request.url)
+    if headers.get('authorization', '').startswith('type'):
+        # /dbs/{db}/colls/{container}/docs/{id} - the resource type is the last type segment of the path
+        segments = [segment for segment in url.path.split('/') if segment]
+        resource = (segments[-1] if len(segments) % 2 else segments[-2]) if segments else 'account'
+        if headers.get('x-ms-documentdb-isquery') == 'true':
+            action = 'query'
+        elif headers.get('a-im') == 'incremental feed':
+            action = 'change_feed'
+        elif headers.get('x-ms-cosmos-is-batch-request') == 'true':
+            action = 'batch'
+        elif headers.get('x-ms-documentdb-is-upsert') == 'true':
+            action = 'upsert'
+        else:
+            action = request.method
+        return 'cosmos', f"{action} {resource}"
+    query = parse_qs(url.query)
+    target = (query.get('comp') or query.get('restype') or ['blob'])[0]
+    return 'blob', f"{request.method} {target}"
+
+
+class InstrumentedTransport(RequestsTransport):
+    _last_failed = threading.local()
+
+    def send(self, request, **kwargs):
+        if not enabled:
+            return super().send(request, **kwargs)
+
+        service, operation = _request_operation(request)
+        attempt = (request.method, request.url)
+        retry = getattr(self._last_failed, 'attempt', None) == attempt
+        body = request.body if isinstance(request.body, (bytes, str)) else None
+        event = {
+            'service': service,
+            'operation': operation,
+            'bytes_sent': len(body) if body is not None else int(request.headers.get('Content-Length') or 0),
+            'retry': retry,
+        }
+        started = time.time()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception as e:
+            # connection errors are retried by the SDKs too
+            self._last_failed.attempt = attempt
+            event.update({'latency': time.time() - started, 'status': None, 'error': type(e).__name__})
+            record(event)
+            raise
+
+        status = response.status_code
+        self._last_failed.attempt = attempt if status in RETRYABLE_STATUSES else None
+        event.update({
+            'latency': time.time() - started,
+            'status': status,
+            'bytes_received': int(response.headers.get('Content-Length') or 0),
+            'throttled': status in THROTTLE_STATUSES,
+            'ru': float(response.headers.get('x-ms-request-charge') or 0),
+        })
+        record(event)
+        return response
+
+
+def instrumented(name, service='helper'):
+    # decorator for helper functions (sync or async) - the whole call is one event
+    def decorate(fn):
+        def finish(started, error):
+            record({'service': service, 'operation': name, 'latency': time.time() - started,
+                    'status': None, 'error': error})
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if not enabled:
+                    return await fn(*args, **kwargs)
+                started = time.time()
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as e:
+                    finish(started, type(e).__name__)
+                    raise
+                finish(started, None)
+                return result
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not enabled:
+                    return fn(*args, **kwargs)
+                started = time.time()
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    finish(started, type(e).__name__)
+                    raise
+                finish(started, None)
+                return result
+        return wrapper
+    return decorate
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))]
+
+
+def latency_stats(latencies):
+    # count / mean / p50 / p95 / p99 / max of a list of latencies (seconds) - for helper summaries and benchmarks
+    values = sorted(latencies)
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 4) if values else None,
+        'p50': _percentile(values, 50),
+        'p95': _percentile(values, 95),
+        'p99': _percentile(values, 99),
+        'max': values[-1] if values else None,
+    }
+
+
+class InMemorySink:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def record(self, event):
+        key = (event['service'], event['operation'])
+        latency = event['latency']
+        with self.lock:
+            metric = self.metrics.get(key)
+            if metric is None:
+                metric = self.metrics[key] = {
+                    'count': 0, 'latency_sum': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+                    'bytes_sent': 0, 'bytes_received': 0, 'errors': 0, 'retries': 0, 'throttles': 0, 'ru': 0.0,
+                }
+            metric['count'] += 1
+            metric['latency_sum'] += latency
+            bucket = 0
+            while bucket < len(LATENCY_BUCKETS) and latency > LATENCY_BUCKETS[bucket]:
+                bucket += 1
+            metric['buckets'][bucket] += 1
+            metric['bytes_sent'] += event.get('bytes_sent', 0)
+            metric['bytes_received'] += event.get('bytes_received', 0)
+            metric['errors'] += 1 if event.get('error') or (event.get('status') or 0) >= 400 else 0
+            metric['retries'] += 1 if event.get('retry') else 0
+            metric['throttles'] += 1 if event.get('throttled') else 0
+            metric['ru'] += event.get('ru', 0)
+
+    def snapshot(self):
+        with self.lock:
+            return {f"{service} {operation}": {**metric, 'buckets': list(metric['buckets'])}
+                    for (service, operation), metric in self.metrics.items()}
+
+    def export(self):
+        pass
+
+
+class PrometheusSink(InMemorySink):
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path
+
+    def export(self):
+        lines = []
+        with self.lock:
+            metrics = sorted(self.metrics.items())
+        lines.append("# TYPE azure_request_latency_seconds histogram")
+        for (service, operation), metric in metrics:
+            labels = f'service="{service}",operation="{operation}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), metric['buckets']):
+                cumulative += count
+                lines.append(f'azure_request_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"azure_request_latency_seconds_sum{{{labels}}} {metric['latency_sum']}")
+            lines.append(f"azure_request_latency_seconds_count{{{labels}}} {metric['count']}")
+        for name, field in (('azure_request_bytes_sent_total', 'bytes_sent'),
+                            ('azure_request_bytes_received_total', 'bytes_received'),
+                            ('azure_request_errors_total', 'errors'), ('azure_request_retries_total', 'retries'),
+                            ('azure_request_throttles_total', 'throttles'), ('azure_request_charge_ru_total', 'ru')):
+            lines.append(f"# TYPE {name} counter")
+            for (service, operation), metric in metrics:
+                lines.append(f'{name}{{service="{service}",operation="{operation}"}} {metric[field]}')
+        text = '\n'.join(lines) + '\n'
+        if self.path:
+            # temp file + swap, so a scraper (node_exporter textfile collector) never reads half a file
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+        return text
+
+
+class JsonLinesSink:
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.file = open(path, 'a')
+
+    def record(self, event):
+        line = json.dumps({'time': time.time(), **event})
+        with self.lock:
+            self.file.write(line + '\n')
+
+    def export(self):
+        with self.lock:
+            self.file.flush()
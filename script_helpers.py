@@ -0,0 +1,58 @@
+# Date Created: 17/Oct/2026
+# Date Modified: 17/Oct/2026
+
+'''
+Using the helpers of BlobServiceClient.py and CosmosDB.py from other code
+--------------------------------------------------------------------------------
+
+The two scripts are tutorials - every section defines its helpers and then calls them with example names,
+so importing a script runs all of its sections against the account in config.ini.
+load_helpers builds a module with only the definitions of a script: imports, functions, classes,
+constants and literal settings. benchmark.py and the tests call the helpers through it.
+
+    * module state the helpers use is passed in as keyword arguments, e.g.
+      load_helpers("BlobServiceClient.py", blob_service_client=get_blob_service_client(connection_string))
+    * the module is registered in sys.modules, so process pools can pickle its functions.
+--------------------------------------------------------------------------------
+'''
+
+import ast
+import os
+import sys
+import types
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_definitions = {}
+
+
+def _is_definition(node):
+    if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return True
+    if not isinstance(node, ast.Assign) or not all(isinstance(target, ast.Name) for target in node.targets):
+        return False
+    # constants (BATCH_OPERATION_LIMIT, _record_types, ...) and literal settings (blob_change_hooks = [], ...)
+    if all(target.id.isupper() or target.id.startswith('_') for target in node.targets):
+        return True
+    try:
+        ast.literal_eval(node.value)
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+def _compiled(script):
+    if script not in _definitions:
+        path = os.path.join(SCRIPTS_DIR, script)
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+        _definitions[script] = compile(ast.Module([node for node in tree.body if _is_definition(node)], []), path, 'exec')
+    return _definitions[script]
+
+
+def load_helpers(script, **module_state):
+    module = types.ModuleType(f"{os.path.splitext(script)[0]}_helpers")
+    sys.modules[module.__name__] = module
+    exec(_compiled(script), module.__dict__)
+    module.__dict__.update(module_state)
+    return module
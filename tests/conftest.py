@@ -0,0 +1,36 @@
+# BlobServiceClient.py and CosmosDB.py are tutorial scripts - importing them runs every demo section against
+# the account in config.ini. The tests load only their definitions with script_helpers.load_helpers, and give
+# the helpers the in-memory clients of fakes.py.
+# Run from the repository root: pip install pytest && python -m pytest tests
+
+import pytest
+
+import fakes
+from script_helpers import load_helpers
+
+
+@pytest.fixture
+def blob_service():
+    return fakes.FakeBlobServiceClient()
+
+
+@pytest.fixture
+def blob_script(blob_service):
+    return load_helpers("BlobServiceClient.py", blob_service_client=blob_service, blob_change_hooks=[],
+                       get_blob_service_client=lambda *args, **kwargs: blob_service)
+
+
+@pytest.fixture
+def cosmos_client():
+    return fakes.FakeCosmosClient()
+
+
+@pytest.fixture
+def cosmos_script(cosmos_client):
+    return load_helpers("CosmosDB.py", client=cosmos_client)
+
+
+@pytest.fixture
+def container(cosmos_client):
+    return cosmos_client.create_database_if_not_exists('db').create_container_if_not_exists(
+        'items', partition_key_path='/pk')
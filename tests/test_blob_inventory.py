@@ -0,0 +1,53 @@
+import pytest
+
+
+@pytest.fixture
+def blobs(blob_service):
+    container = blob_service.create_container('data')
+    for name in ('2025/a.csv', '2025/b.csv', '2026/c.csv', '2026/d.csv'):
+        container.upload_blob(name, b'x' * 100)
+    blob_service.create_container('other').upload_blob('z.csv', b'z')
+    return container
+
+
+@pytest.fixture
+def inventory(blob_script, tmp_path):
+    conn = blob_script.open_blob_inventory(str(tmp_path / 'inventory.db'))
+    yield conn
+    conn.close()
+
+
+def names(blob_script, inventory, **kwargs):
+    return [(container, name) for container, name, *_ in blob_script.query_blob_inventory(inventory, **kwargs)]
+
+
+def test_refresh_only_writes_the_changes(blob_script, blobs, inventory):
+    first = blob_script.refresh_blob_inventory(inventory, shard_prefixes=('2025/', '2026/', 'z'))
+    assert (first['listed'], first['added'], first['updated'], first['removed']) == (5, 5, 0, 0)
+
+    blobs.upload_blob('2025/a.csv', b'y' * 5000, overwrite=True)
+    blobs.delete_blob('2026/c.csv')
+    blobs.upload_blob('2026/e.csv', b'e')
+    second = blob_script.refresh_blob_inventory(inventory, shard_prefixes=('2025/', '2026/', 'z'))
+    assert (second['listed'], second['added'], second['updated'], second['removed']) == (5, 1, 1, 1)
+    assert names(blob_script, inventory, container='data') == [
+        ('data', '2025/a.csv'), ('data', '2025/b.csv'), ('data', '2026/d.csv'), ('data', '2026/e.csv')]
+    assert names(blob_script, inventory, min_size=1000) == [('data', '2025/a.csv')]
+
+
+def test_refreshing_one_shard_leaves_the_others_alone(blob_script, blobs, inventory):
+    blob_script.refresh_blob_inventory(inventory, ['data'])
+    blobs.delete_blob('2025/a.csv')
+    blobs.delete_blob('2026/c.csv')
+    summary = blob_script.refresh_blob_inventory(inventory, ['data'], shard_prefixes=('2026/',))
+    assert summary['removed'] == 1
+    assert names(blob_script, inventory, prefix='2025/') == [('data', '2025/a.csv'), ('data', '2025/b.csv')]
+    assert names(blob_script, inventory, prefix='2026/') == [('data', '2026/d.csv')]
+
+
+def test_deleted_containers_are_dropped(blob_script, blob_service, blobs, inventory):
+    blob_script.refresh_blob_inventory(inventory)
+    blob_service.delete_container('other')
+    summary = blob_script.refresh_blob_inventory(inventory)
+    assert summary['removed'] == 1
+    assert names(blob_script, inventory, container='other') == []
@@ -0,0 +1,68 @@
+import codecs
+import json
+
+import pytest
+
+from script_helpers import load_helpers
+
+BOM = codecs.BOM_UTF8
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.fixture
+def loader(blob_service, cosmos_client):
+    return load_helpers("CosmosDB.py", client=cosmos_client, get_blob_service_client=lambda *args, **kwargs: blob_service)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 1000])
+def test_json_array_with_byte_order_mark(cosmos_script, chunk_size):
+    data = BOM + json.dumps([{'id': '1', 'text': 'äö'}, {'id': '2'}]).encode()
+    assert list(cosmos_script._json_documents(chunked(data, chunk_size), 'a.json')) == [{'id': '1', 'text': 'äö'}, {'id': '2'}]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 1000])
+def test_json_lines_with_byte_order_mark(cosmos_script, chunk_size):
+    data = BOM + b'{"id": "1"}\r\n\n{"id": "2"}'
+    assert list(cosmos_script._json_documents(chunked(data, chunk_size), 'a.jsonl')) == [{'id': '1'}, {'id': '2'}]
+
+
+def test_incomplete_json_names_no_blob(cosmos_script):
+    with pytest.raises(ValueError) as error:
+        list(cosmos_script._json_documents([b'[{"id": "1"}, {"id": '], 'broken.json'))
+    assert str(error.value) == "incomplete JSON at the end of the blob"
+
+
+def test_load_blobs_into_container(loader, blob_service, container):
+    source = blob_service.create_container('exports')
+    source.upload_blob('2024/a.json', BOM + json.dumps([{'id': '1', 'pk': 'a'}, {'id': '2', 'pk': 'a'}]).encode())
+    source.upload_blob('2024/b.jsonl', b'{"id": "3", "pk": "b"}\n["not a document"]\n')
+    source.upload_blob('2024/broken.json', b'{"id": "4", "pk": ')
+    source.upload_blob('2024/notes.txt', b'skipped')
+
+    result = loader.load_blobs_into_container('exports', container, prefix='2024/', report_every=60)
+
+    assert sorted(item['id'] for item in container.read_all_items()) == ['1', '2', '3']
+    assert (result['blobs_listed'], result['blobs_done'], result['blobs_failed']) == (3, 2, 1)
+    assert result['documents_rejected'] == 1
+    assert result['errors'] == ["2024/broken.json: incomplete JSON at the end of the blob"]
+
+
+def test_large_document_is_not_parsed_again_for_every_chunk(cosmos_script, monkeypatch):
+    calls = []
+    raw_decode = json.JSONDecoder.raw_decode
+    monkeypatch.setattr(json.JSONDecoder, 'raw_decode',
+                        lambda self, s, idx=0: calls.append(idx) or raw_decode(self, s, idx))
+    big = {'id': 'big', 'payload': 'x' * 200000}
+    data = json.dumps([{'id': 'small'}, big, {'id': 'last'}]).encode()
+    documents = list(cosmos_script._json_documents(chunked(data, 1000), 'big.json'))
+    assert documents == [{'id': 'small'}, big, {'id': 'last'}]
+    assert len(calls) < 30  # about 200 chunks
+
+
+def test_long_json_line_spanning_many_chunks(cosmos_script):
+    lines = [{'id': '1', 'payload': 'y' * 5000}, {'id': '2'}]
+    data = '\n'.join(json.dumps(line) for line in lines).encode()
+    assert list(cosmos_script._json_documents(chunked(data, 64), 'a.ndjson')) == lines
@@ -0,0 +1,81 @@
+import pytest
+
+import fakes
+
+
+@pytest.fixture
+def blobs(blob_service):
+    container = blob_service.create_container('docs')
+    container.upload_blob('a.txt', b'first', metadata={'version': '1'})
+    return container
+
+
+@pytest.fixture
+def cache(blob_script):
+    cache = blob_script.BlobPropertiesCache(ttl=60)
+    blob_script.blob_change_hooks.append(cache.invalidate)
+    return cache
+
+
+def test_second_get_is_a_hit(cache, blobs):
+    assert cache.get('docs', 'a.txt').metadata == {'version': '1'}
+    assert cache.get('docs', 'a.txt').metadata == {'version': '1'}
+    assert (cache.stats['misses'], cache.stats['hits']) == (1, 1)
+
+
+def test_expired_entry_is_revalidated_with_the_etag(cache, blobs):
+    cache.get('docs', 'a.txt', ttl=0)
+    cache.get('docs', 'a.txt')
+    assert (cache.stats['misses'], cache.stats['revalidated']) == (1, 1)
+
+    cache.entries[('docs', 'a.txt', None)][2] = 0  # expired
+    blobs.get_blob_client('a.txt').set_blob_metadata({'version': '2'})
+    assert cache.get('docs', 'a.txt').metadata == {'version': '2'}
+    # answered by the conditional request
+    assert (cache.stats['misses'], cache.stats['revalidated'], cache.stats['modified']) == (1, 1, 1)
+
+
+def test_change_through_the_helpers_invalidates(blob_script, cache, blobs):
+    cache.get('docs', 'a.txt')
+    blob_script.notify_blob_changed('docs', 'a.txt')
+    assert cache.entries == {}
+    assert cache.stats['invalidations'] == 1
+
+
+def test_invalidation_during_a_fetch_drops_the_result(cache, blobs, monkeypatch):
+    # the blob changes (and is invalidated) after the service answered, before the answer is cached
+    get_blob_properties = fakes.FakeBlobClient.get_blob_properties
+
+    def changed_meanwhile(self, *args, **kwargs):
+        properties = get_blob_properties(self, *args, **kwargs)
+        self.set_blob_metadata({'version': '2'})
+        cache.invalidate('docs', 'a.txt')
+        return properties
+
+    monkeypatch.setattr(fakes.FakeBlobClient, 'get_blob_properties', changed_meanwhile)
+    assert cache.get('docs', 'a.txt').metadata == {'version': '1'}
+    assert cache.entries == {}
+    assert cache.stats['stale_fetches'] == 1
+
+    monkeypatch.setattr(fakes.FakeBlobClient, 'get_blob_properties', get_blob_properties)
+    assert cache.get('docs', 'a.txt').metadata == {'version': '2'}
+    assert cache.fetching == {} and cache.generations == {}
+
+
+def test_container_invalidation_during_a_fetch_drops_the_result(cache, blobs, monkeypatch):
+    get_blob_properties = fakes.FakeBlobClient.get_blob_properties
+
+    def container_dropped_meanwhile(self, *args, **kwargs):
+        properties = get_blob_properties(self, *args, **kwargs)
+        cache.invalidate('docs')
+        return properties
+
+    monkeypatch.setattr(fakes.FakeBlobClient, 'get_blob_properties', container_dropped_meanwhile)
+    cache.get('docs', 'a.txt')
+    assert cache.entries == {}
+
+
+def test_failed_fetch_leaves_no_generation_behind(cache, blobs):
+    with pytest.raises(Exception):
+        cache.get('docs', 'missing.txt')
+    assert cache.fetching == {} and cache.generations == {}
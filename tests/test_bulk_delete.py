@@ -0,0 +1,43 @@
+import pytest
+
+
+@pytest.fixture
+def documents(container):
+    for i in range(250):
+        container.upsert_item({'id': str(i), 'pk': f'p{i % 3}', 'value': i})
+    container.upsert_item({'id': 'no-pk', 'value': -1})
+    container.upsert_item({'id': 'null-pk', 'pk': None, 'value': -1})
+    return container
+
+
+def ids(container):
+    return sorted(item['id'] for item in container.read_all_items())
+
+
+@pytest.mark.parametrize('use_batches', [True, False])
+def test_deletes_matches_in_every_partition(cosmos_script, documents, use_batches):
+    result = cosmos_script.bulk_delete_by_query(documents, 'c.value >= 10', 'pk', use_batches=use_batches)
+    assert (result['matched'], result['deleted'], result['failed']) == (240, 240, 0)
+    assert result['partitions'] == 3
+    assert ids(documents) == sorted([str(i) for i in range(10)] + ['no-pk', 'null-pk'])
+
+
+@pytest.mark.parametrize('use_batches', [True, False])
+def test_missing_and_null_partition_keys_are_different_partitions(cosmos_script, documents, use_batches):
+    result = cosmos_script.bulk_delete_by_query(documents, 'c.value = -1', 'pk', use_batches=use_batches)
+    assert (result['matched'], result['deleted'], result['failed']) == (2, 2, 0)
+    assert result['partitions'] == 2
+    assert len(ids(documents)) == 250
+
+
+def test_parameters_are_passed_to_the_query(cosmos_script, documents):
+    result = cosmos_script.bulk_delete_by_query(documents, 'c.pk = @pk', 'pk', parameters=[{'name': '@pk', 'value': 'p1'}])
+    assert result['deleted'] == 83
+    assert not [item for item in documents.read_all_items() if item.get('pk') == 'p1']
+
+
+def test_batch_with_a_missing_item_falls_back_to_single_deletes(cosmos_script, documents):
+    documents.delete_item('3', partition_key='p0')
+    counts = cosmos_script._delete_chunk(documents, 'p0', ['0', '3', '6'], use_batches=True)
+    assert counts == {'deleted': 3, 'failed': 0, 'throttled': 0}
+    assert '0' not in ids(documents) and '6' not in ids(documents)
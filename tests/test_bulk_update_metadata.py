@@ -0,0 +1,72 @@
+from collections import Counter
+
+import pytest
+
+import fakes
+
+
+@pytest.fixture
+def blobs(blob_service):
+    container = blob_service.create_container('c')
+    for i in range(3):
+        container.upload_blob(f'in/{i}.csv', b'x', metadata={'source': 'upload'})
+    container.upload_blob('out/0.csv', b'x')
+    return container
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = Counter()
+    original = {name: getattr(fakes.FakeBlobClient, name) for name in ('set_blob_metadata', 'set_blob_tags')}
+
+    def counted(name):
+        def call(self, *args, **kwargs):
+            calls[name] += 1
+            return original[name](self, *args, **kwargs)
+        return call
+
+    for name in original:
+        monkeypatch.setattr(fakes.FakeBlobClient, name, counted(name))
+    return calls
+
+
+def test_nothing_to_update_is_refused(blob_script, blobs):
+    with pytest.raises(ValueError):
+        blob_script.bulk_update_metadata('c', prefix='in/')
+
+
+def test_tags_only_leave_the_metadata_alone(blob_script, blobs, calls):
+    result = blob_script.bulk_update_metadata('c', prefix='in/', tags={'stage': 'raw'})
+    assert result['updated'] == 3
+    assert (calls['set_blob_metadata'], calls['set_blob_tags']) == (0, 3)
+    blob = blobs.get_blob_client('in/0.csv')
+    assert blob.get_blob_tags() == {'stage': 'raw'}
+    assert blob.get_blob_properties().metadata == {'source': 'upload'}
+
+
+def test_metadata_only_leaves_the_tags_alone(blob_script, blobs, calls):
+    blobs.get_blob_client('in/0.csv').set_blob_tags({'stage': 'raw'})
+    calls.clear()
+    result = blob_script.bulk_update_metadata('c', prefix='in/', metadata={'ingest': '1'}, merge=True)
+    assert result['updated'] == 3
+    assert (calls['set_blob_metadata'], calls['set_blob_tags']) == (3, 0)
+    assert blobs.get_blob_client('in/0.csv').get_blob_tags() == {'stage': 'raw'}
+
+
+@pytest.mark.parametrize('tags', [
+    {f'key{i}': 'v' for i in range(11)},
+    {'k' * 129: 'v'},
+    {'key': 'v' * 257},
+    {'': 'v'},
+    {'key': 'a,b'},
+    {'ключ': 'v'},
+])
+def test_invalid_tags_are_refused_before_any_request(blob_script, blobs, calls, tags):
+    assert blob_script.validate_tags(tags)
+    with pytest.raises(ValueError):
+        blob_script.bulk_update_metadata('c', prefix='in/', tags=tags)
+    assert sum(calls.values()) == 0
+
+
+def test_valid_tags(blob_script):
+    assert blob_script.validate_tags({'k' * 128: 'v' * 256, 'path': 'a/b.c:d=e_f+g-h i', 'empty': ''}) == []
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def source(cosmos_client):
+    container = cosmos_client.create_database_if_not_exists('db').create_container_if_not_exists(
+        'source', partition_key_path='/pk')
+    for i in range(60):
+        container.upsert_item({'id': str(i), 'pk': f'p{i % 8}', 'value': i})
+    return container
+
+
+@pytest.fixture
+def destination(cosmos_client):
+    return cosmos_client.create_database_if_not_exists('db').create_container_if_not_exists(
+        'destination', partition_key_path='/pk')
+
+
+@pytest.fixture
+def lease_path(tmp_path):
+    return str(tmp_path / 'leases.json')
+
+
+def documents(container):
+    return {item['id']: item['value'] for item in container.read_all_items()}
+
+
+def test_second_run_resumes_from_the_saved_continuations(cosmos_script, source, destination, lease_path):
+    first = cosmos_script.sync_container_changes(source, destination, '/pk', lease_path, page_size=10)
+    assert first['applied'] == 60
+
+    source.upsert_item({'id': '3', 'pk': 'p3', 'value': 'changed'})
+    source.upsert_item({'id': 'new', 'pk': 'p0', 'value': 'new'})
+    second = cosmos_script.sync_container_changes(source, destination, '/pk', lease_path, page_size=10)
+    assert second['applied'] == 2
+    assert documents(destination) == documents(source)
+
+
+def test_crash_before_the_lease_is_saved_repeats_the_page(cosmos_script, source, destination, lease_path, monkeypatch):
+    update = cosmos_script.ChangeFeedLeaseStore.update
+    saved = []
+
+    def crash_on_the_third_page(self, *args, **kwargs):
+        if len(saved) == 2:
+            raise RuntimeError("killed")  # the page is written, its continuation is not saved
+        saved.append(args)
+        return update(self, *args, **kwargs)
+
+    monkeypatch.setattr(cosmos_script.ChangeFeedLeaseStore, 'update', crash_on_the_third_page)
+    with pytest.raises(RuntimeError):
+        cosmos_script.sync_container_changes(source, destination, '/pk', lease_path, page_size=10, max_workers=1)
+    written = len(documents(destination))
+    monkeypatch.setattr(cosmos_script.ChangeFeedLeaseStore, 'update', update)
+
+    rerun = cosmos_script.sync_container_changes(source, destination, '/pk', lease_path, page_size=10)
+    # everything not covered by the two saved pages comes again, including the page written before the crash
+    assert rerun['applied'] == 60 - sum(applied for _, _, applied in saved)
+    assert rerun['applied'] > 60 - written
+    assert documents(destination) == documents(source)
+
+
+def test_two_workers_share_the_ranges(cosmos_script, source, lease_path):
+    first = cosmos_script.ChangeFeedLeaseStore(lease_path, owner='first')
+    second = cosmos_script.ChangeFeedLeaseStore(lease_path, owner='second')
+    first.init_feed_ranges(source.read_feed_ranges)
+    range_keys = [str(index) for index in range(len(second.init_feed_ranges(source.read_feed_ranges)))]
+
+    assert first.acquire(range_keys) == range_keys  # alone - takes everything
+    assert second.acquire(range_keys) == []  # nothing is free yet
+    kept = first.acquire(range_keys)  # gives back what is above its share
+    taken = second.acquire(range_keys)
+    assert len(kept) == len(taken) == len(range_keys) // 2
+    assert set(kept) | set(taken) == set(range_keys) and not set(kept) & set(taken)
+
+    # the owner of a range is the only one who can move its continuation
+    assert not second.update(kept[0], 'stolen', 1)
+    assert first.update(kept[0], 'mine', 1)
+
+    first.release()
+    assert second.acquire(range_keys) == range_keys
+
+
+def test_expired_leases_are_taken_over(cosmos_script, source, lease_path):
+    crashed = cosmos_script.ChangeFeedLeaseStore(lease_path, owner='crashed', lease_seconds=0.05)
+    crashed.init_feed_ranges(source.read_feed_ranges)
+    assert crashed.acquire(['0', '1'])
+    survivor = cosmos_script.ChangeFeedLeaseStore(lease_path, owner='survivor')
+    assert survivor.acquire(['0', '1']) == []
+    time.sleep(0.1)
+    assert survivor.acquire(['0', '1']) == ['0', '1']
+
+
+def test_concurrent_workers_apply_every_change_once(cosmos_script, source, destination, lease_path):
+    results = []
+
+    def worker(name):
+        results.append(cosmos_script.sync_container_changes(source, destination, '/pk', lease_path, page_size=5,
+                                                            owner=name))
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ('a', 'b')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(result['applied'] for result in results) == 60
+    assert documents(destination) == documents(source)
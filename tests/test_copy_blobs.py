@@ -0,0 +1,71 @@
+from collections import Counter
+
+import pytest
+
+import fakes
+
+
+@pytest.fixture
+def source(blob_service):
+    container = blob_service.create_container('source')
+    blob_service.create_container('destination')
+    for i in range(4):
+        container.upload_blob(f'blob-{i}', b'x' * 100)
+    return container
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    # counts the requests copy_blobs makes; upload_blob_from_url is refused like for a source without SAS
+    calls = Counter()
+    original = {name: getattr(fakes.FakeBlobClient, name) for name in ('get_blob_properties', 'start_copy_from_url')}
+
+    def counted(name):
+        def call(self, *args, **kwargs):
+            calls[name] += 1
+            return original[name](self, *args, **kwargs)
+        return call
+
+    def refused(self, *args, **kwargs):
+        calls['upload_blob_from_url'] += 1
+        raise fakes._status_error(403, "CannotVerifyCopySource")
+
+    for name in original:
+        monkeypatch.setattr(fakes.FakeBlobClient, name, counted(name))
+    monkeypatch.setattr(fakes.FakeBlobClient, 'upload_blob_from_url', refused)
+    return calls
+
+
+def test_copy_blobs_copies_everything(blob_script, blob_service, source):
+    summary = blob_script.copy_blobs([('source', f'blob-{i}', 'destination', f'copy-{i}') for i in range(4)])
+    assert (summary['success'], summary['failed'], summary['aborted']) == (4, 0, 0)
+    copied = blob_service.get_container_client('destination').list_blobs()
+    assert sorted(blob['name'] for blob in copied) == [f'copy-{i}' for i in range(4)]
+
+
+def test_put_blob_from_url_is_off_by_default(blob_script, source, calls):
+    blob_script.copy_blobs([('source', f'blob-{i}', 'destination', f'copy-{i}') for i in range(4)])
+    assert calls['upload_blob_from_url'] == 0
+    assert calls['start_copy_from_url'] == 4
+
+
+def test_refused_source_container_is_remembered(blob_script, source, calls):
+    summary = blob_script.copy_blobs([('source', f'blob-{i}', 'destination', f'copy-{i}') for i in range(4)],
+                                     small_blob_threshold=1024, max_workers=1)
+    assert summary['success'] == 4
+    assert calls['upload_blob_from_url'] == 1
+    assert calls['get_blob_properties'] == 1
+    assert calls['start_copy_from_url'] == 4
+
+
+def test_duplicate_pending_copies_are_all_finished(blob_script, source, monkeypatch):
+    # copies that are still running after start_copy_from_url are checked again later
+    start_copy = fakes.FakeBlobClient.start_copy_from_url
+    monkeypatch.setattr(fakes.FakeBlobClient, 'start_copy_from_url',
+                        lambda self, *args, **kwargs: {**start_copy(self, *args, **kwargs), 'copy_status': 'pending'})
+    done = []
+    copy = ('source', 'blob-0', 'destination', 'copy-0')
+    summary = blob_script.copy_blobs([copy, copy, copy],
+                                     on_done=lambda copy, status, latency, description: done.append(status))
+    assert summary['success'] == 3
+    assert done == ['success'] * 3
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def source(cosmos_client):
+    container = cosmos_client.create_database_if_not_exists('db').create_container_if_not_exists(
+        'source', partition_key_path='/pk')
+    for i in range(95):
+        container.upsert_item({'id': str(i), 'pk': f'p{i % 4}', 'value': i})
+    return container
+
+
+@pytest.fixture
+def destination(cosmos_client):
+    return cosmos_client.create_database_if_not_exists('db').create_container_if_not_exists(
+        'destination', partition_key_path='/pk')
+
+
+class Destination:
+    # counts concurrent upserts, and fails every upsert after the first fail_after ones
+    def __init__(self, container, fail_after=None):
+        self.container = container
+        self.fail_after = fail_after
+        self.upserts = 0
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def upsert_item(self, body, **kwargs):
+        with self.lock:
+            if self.fail_after is not None and self.upserts >= self.fail_after:
+                raise RuntimeError("connection lost")
+            self.upserts += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.001)
+        try:
+            return self.container.upsert_item(body, **kwargs)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def ids(container):
+    return sorted(int(item['id']) for item in container.read_all_items())
+
+
+def test_copies_every_document(cosmos_script, source, destination):
+    assert cosmos_script.copy_container_documents(source, destination, page_size=10, max_in_flight=4) == 95
+    assert ids(destination) == list(range(95))
+
+
+def test_in_flight_upserts_are_bounded(cosmos_script, source, destination):
+    counted = Destination(destination)
+    cosmos_script.copy_container_documents(source, counted, page_size=50, max_in_flight=3)
+    assert counted.upserts == 95
+    assert counted.max_running <= 3
+
+
+def test_query_selects_what_is_copied(cosmos_script, source, destination):
+    copied = cosmos_script.copy_container_documents(source, destination, query="SELECT * FROM c WHERE c.value < 7",
+                                                    page_size=3)
+    assert copied == 7
+    assert ids(destination) == list(range(7))
+
+
+def test_resumes_from_the_checkpoint(cosmos_script, source, destination, tmp_path):
+    checkpoint_path = str(tmp_path / 'copy.json')
+    failing = Destination(destination, fail_after=25)
+    with pytest.raises(RuntimeError):
+        cosmos_script.copy_container_documents(source, failing, page_size=10, max_in_flight=1,
+                                               checkpoint_path=checkpoint_path)
+    # only whole pages are checkpointed
+    continuation_token, copied, done = cosmos_script.load_copy_checkpoint(checkpoint_path)
+    assert (copied, done) == (20, False)
+    assert continuation_token is not None
+
+    resumed = Destination(destination)
+    assert cosmos_script.copy_container_documents(source, resumed, page_size=10, max_in_flight=4,
+                                                  checkpoint_path=checkpoint_path) == 95
+    assert resumed.upserts == 75  # the half written page is written again, the pages before it are not
+    assert ids(destination) == list(range(95))
+    with open(checkpoint_path) as f:
+        assert json.load(f) == {'continuation_token': None, 'copied': 95, 'done': True}
+
+
+def test_completed_copy_does_nothing(cosmos_script, source, destination, tmp_path):
+    checkpoint_path = str(tmp_path / 'copy.json')
+    cosmos_script.save_copy_checkpoint(checkpoint_path, None, 95, done=True)
+    untouched = Destination(destination)
+    assert cosmos_script.copy_container_documents(source, untouched, checkpoint_path=checkpoint_path) == 95
+    assert untouched.upserts == 0
+
+
+def test_missing_checkpoint_starts_from_scratch(cosmos_script, tmp_path):
+    assert cosmos_script.load_copy_checkpoint(str(tmp_path / 'missing.json')) == (None, 0, False)
+    assert cosmos_script.load_copy_checkpoint(None) == (None, 0, False)
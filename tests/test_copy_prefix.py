@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import fakes
+
+
+@pytest.fixture
+def source(blob_service):
+    container = blob_service.create_container('source')
+    blob_service.create_container('archive')
+    for i in range(12):
+        container.upload_blob(f'2025/{i:02d}.log', b'x' * (i + 1))
+    container.upload_blob('2024/old.log', b'old')
+    return container
+
+
+def names(blob_service, container_name):
+    return sorted(blob['name'] for blob in blob_service.get_container_client(container_name).list_blobs())
+
+
+def test_copies_the_prefix(blob_script, blob_service, source):
+    stats = blob_script.copy_prefix('source', '2025/', 'archive', dest_prefix='logs/')
+    assert (stats['copied'], stats['failed'], stats['bytes']) == (12, 0, sum(range(1, 13)))
+    assert names(blob_service, 'archive') == [f'logs/{i:02d}.log' for i in range(12)]
+    assert len(names(blob_service, 'source')) == 13
+
+
+def test_move_deletes_the_sources(blob_script, blob_service, source):
+    stats = blob_script.copy_prefix('source', '2025/', 'archive', move=True)
+    assert stats['moved'] == 12
+    assert names(blob_service, 'source') == ['2024/old.log']
+    assert names(blob_service, 'archive') == [f'2025/{i:02d}.log' for i in range(12)]
+
+
+def test_changed_source_is_not_deleted(blob_script, blob_service, source, monkeypatch):
+    # the source is overwritten between the listing and the delete
+    verify_and_delete = blob_script._verify_and_delete_source
+
+    def changed_first(copy):
+        if copy[1] == '2025/03.log':
+            source.upload_blob(copy[1], b'new content', overwrite=True)
+        return verify_and_delete(copy)
+
+    monkeypatch.setattr(blob_script, '_verify_and_delete_source', changed_first)
+    stats = blob_script.copy_prefix('source', '2025/', 'archive', move=True, max_workers=1)
+    assert (stats['moved'], stats['failed']) == (11, 1)
+    assert names(blob_service, 'source') == ['2024/old.log', '2025/03.log']
+
+
+def test_rerun_skips_finished_blobs_and_retries_failed_ones(blob_script, blob_service, source, tmp_path, monkeypatch):
+    checkpoint_path = str(tmp_path / 'prefix.json')
+    start_copy = fakes.FakeBlobClient.start_copy_from_url
+
+    def refuse_05(self, source_url, **kwargs):
+        if self.blob_name == '2025/05.log':
+            raise fakes._status_error(500, "Internal Server Error")
+        return start_copy(self, source_url, **kwargs)
+
+    monkeypatch.setattr(fakes.FakeBlobClient, 'start_copy_from_url', refuse_05)
+    stats = blob_script.copy_prefix('source', '2025/', 'archive', checkpoint_path=checkpoint_path, checkpoint_every=1)
+    assert (stats['copied'], stats['failed']) == (11, 1)
+    with open(checkpoint_path) as f:
+        assert json.load(f) == {'after': '2025/11.log', 'failed': ['2025/05.log']}
+
+    monkeypatch.setattr(fakes.FakeBlobClient, 'start_copy_from_url', start_copy)
+    stats = blob_script.copy_prefix('source', '2025/', 'archive', checkpoint_path=checkpoint_path)
+    assert (stats['listed'], stats['skipped'], stats['copied']) == (1, 11, 1)
+    with open(checkpoint_path) as f:
+        assert json.load(f) == {'after': '2025/11.log', 'failed': []}
+    assert len(names(blob_service, 'archive')) == 12
@@ -0,0 +1,63 @@
+import pytest
+
+import fakes
+from script_helpers import load_helpers
+
+
+@pytest.fixture
+def expired(blob_service):
+    container = blob_service.create_container('logs')
+    for i in range(300):
+        container.upload_blob(f'expired/{i:03d}.log', b'x')
+    container.upload_blob('current.log', b'x')
+    return container
+
+
+def names(container):
+    return sorted(blob['name'] for blob in container.list_blobs())
+
+
+def test_deletes_a_prefix_in_batches(blob_script, expired, monkeypatch):
+    batch_sizes = []
+    delete_blobs = fakes.FakeContainerClient.delete_blobs
+
+    def counted(self, *blobs, **kwargs):
+        batch_sizes.append(len(blobs))
+        return delete_blobs(self, *blobs, **kwargs)
+
+    monkeypatch.setattr(fakes.FakeContainerClient, 'delete_blobs', counted)
+    result = blob_script.bulk_delete_blobs('logs', prefix='expired/')
+    assert (result['deleted'], result['not_found'], result['failed']) == (300, 0, 0)
+    assert sorted(batch_sizes) == [300 - blob_script.BATCH_DELETE_LIMIT, blob_script.BATCH_DELETE_LIMIT]
+    assert names(expired) == ['current.log']
+
+
+def test_missing_blobs_are_reported(blob_script, expired):
+    done = []
+    result = blob_script.bulk_delete_blobs('logs', blobs=['current.log', 'missing.log'],
+                                           on_done=lambda blob, status: done.append((blob, status)))
+    assert (result['deleted'], result['not_found']) == (1, 1)
+    assert sorted(done) == [('current.log', 202), ('missing.log', 404)]
+
+
+def test_deletes_invalidate_the_properties_cache(blob_script, expired):
+    cache = blob_script.BlobPropertiesCache()
+    blob_script.blob_change_hooks.append(cache.invalidate)
+    cache.get('logs', 'current.log')
+    blob_script.bulk_delete_blobs('logs', blobs=['current.log'])
+    assert cache.entries == {}
+
+
+def test_throttled_deletes_are_retried(monkeypatch):
+    behaviour = fakes.FakeBehaviour(seed=1)
+    throttled = fakes.FakeBlobServiceClient(behaviour=behaviour)
+    container = throttled.create_container('logs')
+    for i in range(50):
+        container.upload_blob(f'{i}.log', b'x')
+    behaviour.throttle_rate = 0.3  # whole batches and single sub-requests get 503 Server Busy
+    blob_script = load_helpers("BlobServiceClient.py", blob_service_client=throttled, blob_change_hooks=[])
+    monkeypatch.setattr(blob_script.time, 'sleep', lambda seconds: None)
+    result = blob_script.bulk_delete_blobs('logs', blobs=[f'{i}.log' for i in range(50)], retries=10)
+    assert result['deleted'] == 50
+    behaviour.throttle_rate = 0
+    assert names(container) == []
@@ -0,0 +1,63 @@
+import hashlib
+import os
+
+import pytest
+from azure.storage.blob import ContentSettings
+
+import fakes
+
+
+@pytest.fixture
+def data():
+    return os.urandom(10 * 1000 + 123)
+
+
+@pytest.fixture
+def blob_client(blob_service, data):
+    container = blob_service.create_container('downloads')
+    container.upload_blob('large.bin', data, content_settings=ContentSettings(content_md5=hashlib.md5(data).digest()))
+    return container.get_blob_client('large.bin')
+
+
+def test_last_range_is_partial(blob_script, blob_client, data, tmp_path, monkeypatch):
+    download_blob = fakes.FakeBlobClient.download_blob
+    requested = []
+
+    def recorded(self, offset=None, length=None, **kwargs):
+        requested.append((offset, length))
+        return download_blob(self, offset=offset, length=length, **kwargs)
+
+    monkeypatch.setattr(fakes.FakeBlobClient, 'download_blob', recorded)
+    destination = tmp_path / 'large.bin'
+    result = blob_script.download_blob_in_ranges(blob_client, str(destination), range_size=1000, max_workers=4,
+                                                 verify_md5=True)
+    assert (result['ranges'], result['retried_ranges'], result['md5_verified']) == (11, 0, True)
+    assert max(requested) == (10000, 123)
+    assert destination.read_bytes() == data
+
+
+def test_failed_range_is_retried_on_its_own(blob_script, blob_client, data, tmp_path, monkeypatch):
+    download_blob = fakes.FakeBlobClient.download_blob
+    requested = []
+
+    def last_range_fails_once(self, offset=None, length=None, **kwargs):
+        requested.append(offset)
+        if offset == 10000 and requested.count(offset) == 1:
+            raise fakes._status_error(500, "InternalError")
+        return download_blob(self, offset=offset, length=length, **kwargs)
+
+    monkeypatch.setattr(fakes.FakeBlobClient, 'download_blob', last_range_fails_once)
+    monkeypatch.setattr(blob_script.time, 'sleep', lambda seconds: None)
+    destination = tmp_path / 'large.bin'
+    result = blob_script.download_blob_in_ranges(blob_client, str(destination), range_size=1000)
+    assert result['retried_ranges'] == 1
+    assert len(requested) == 12
+    assert destination.read_bytes() == data
+
+
+def test_empty_blob(blob_script, blob_service, tmp_path):
+    blob_client = blob_service.create_container('empty').get_blob_client('empty.bin')
+    blob_client.upload_blob(b'')
+    destination = tmp_path / 'empty.bin'
+    assert blob_script.download_blob_in_ranges(blob_client, str(destination))['ranges'] == 0
+    assert destination.read_bytes() == b''
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+import fakes
+
+
+@pytest.fixture
+def documents(container):
+    for i in range(200):
+        container.upsert_item({'id': str(i), 'pk': f'p{i % 13}', 'value': (i * 37) % 200})
+    return fakes.FakeAsync(container)
+
+
+async def collect(items):
+    return [item async for item in items]
+
+
+def test_order_by_is_merged_across_feed_ranges(cosmos_script, documents):
+    range_stats = []
+    items = asyncio.run(collect(cosmos_script.fan_out_query(documents, "SELECT * FROM c ORDER BY c.value DESC",
+                                                            buffer_size=5, page_size=7, range_stats=range_stats)))
+    assert [item['value'] for item in items] == list(range(199, -1, -1))
+    assert len(range_stats) == 4
+    assert all(stat['items'] > 0 for stat in range_stats)
+    assert sum(stat['items'] for stat in range_stats) == 200
+
+
+def test_without_order_by_every_item_comes_once(cosmos_script, documents):
+    items = asyncio.run(collect(cosmos_script.fan_out_query(documents, "SELECT * FROM c", max_concurrency=2)))
+    assert sorted(int(item['id']) for item in items) == list(range(200))
+
+
+def test_stopping_early_cancels_the_range_readers(cosmos_script, documents):
+    async def first_items():
+        items = cosmos_script.fan_out_query(documents, "SELECT * FROM c ORDER BY c.value", buffer_size=2, page_size=5)
+        taken = [await items.__anext__() for _ in range(3)]
+        await items.aclose()
+        return taken, [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    taken, still_running = asyncio.run(first_items())
+    assert [item['value'] for item in taken] == [0, 1, 2]
+    assert still_running == []
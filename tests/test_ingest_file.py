@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import pytest
+
+import fakes
+
+
+def ingest(cosmos_script, container, path, **kwargs):
+    return asyncio.run(cosmos_script.ingest_file(fakes.FakeAsync(container), str(path), '/pk', **kwargs))
+
+
+def rejected(path):
+    with open(str(path) + '.rejected.jsonl') as f:
+        return [(line['line'], line['error']) for line in map(json.loads, f)]
+
+
+def test_bad_jsonl_lines_go_to_the_dead_letter_file(cosmos_script, container, tmp_path):
+    path = tmp_path / 'feed.jsonl'
+    path.write_text('{"id": "1", "pk": "a"}\n'
+                    '{"id": "2", "pk": \n'
+                    '\n'
+                    '{"pk": "a"}\n'
+                    '{"id": "3"}\n'
+                    '{"id": "4", "pk": "b"}\n')
+    result = ingest(cosmos_script, container, path)
+    assert (result['read'], result['written'], result['rejected']) == (5, 2, 3)
+    assert [(line, error.split(':')[0]) for line, error in rejected(path)] == [
+        (2, 'invalid JSON'), (4, "missing 'id'"), (5, "missing partition key '/pk'")]
+    assert sorted(item['id'] for item in container.read_all_items()) == ['1', '4']
+
+
+def test_short_csv_rows_are_rejected(cosmos_script, container, tmp_path):
+    path = tmp_path / 'feed.csv'
+    path.write_text('id,value,pk\n1,x,a\n2,y\n3,z,b\n')
+    result = ingest(cosmos_script, container, path)
+    assert (result['written'], result['rejected']) == (2, 1)
+    assert rejected(path) == [(3, "missing partition key '/pk'")]
+
+
+def test_rerun_resumes_after_the_last_window(cosmos_script, container, tmp_path, monkeypatch):
+    path = tmp_path / 'feed.jsonl'
+    path.write_text(''.join(json.dumps({'id': str(i), 'pk': 'a'}) + '\n' for i in range(50)) + 'not json\n')
+    checkpoint = str(tmp_path / 'feed.checkpoint')
+    execute_item_batch = fakes.FakeContainer.execute_item_batch
+    batches = []
+
+    def crash_on_the_third_window(self, *args, **kwargs):
+        batches.append(1)
+        if len(batches) == 3:
+            raise RuntimeError("killed")
+        return execute_item_batch(self, *args, **kwargs)
+
+    monkeypatch.setattr(fakes.FakeContainer, 'execute_item_batch', crash_on_the_third_window)
+    with pytest.raises(RuntimeError):
+        ingest(cosmos_script, container, path, window=10, checkpoint_path=checkpoint)
+    with open(checkpoint) as f:
+        assert json.load(f) == {'line': 20}
+
+    monkeypatch.setattr(fakes.FakeContainer, 'execute_item_batch', execute_item_batch)
+    result = ingest(cosmos_script, container, path, window=10, checkpoint_path=checkpoint)
+    assert (result['skipped'], result['read'], result['written'], result['rejected']) == (20, 31, 30, 1)
+    assert len(list(container.read_all_items())) == 50
+    assert [line for line, _ in rejected(path)] == [51]
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from azure.core.pipeline.transport import HttpRequest, RequestsTransport
+
+import instrumentation
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    # instrumentation is module state - every test starts disabled, with no sinks
+    monkeypatch.setattr(instrumentation, 'enabled', False)
+    monkeypatch.setattr(instrumentation, 'sinks', [])
+    return instrumentation.InMemorySink()
+
+
+def test_helper_decorated_before_enable_is_measured(sink):
+    @instrumentation.instrumented("double")
+    def helper(value):
+        return value * 2
+
+    assert helper(2) == 4
+    assert sink.snapshot() == {}
+
+    instrumentation.enable(sink)
+    assert helper(3) == 6
+    assert sink.snapshot()['helper double']['count'] == 1
+
+
+def test_async_helper_and_errors_are_recorded(sink):
+    @instrumentation.instrumented("fails", service='helper')
+    async def fails():
+        raise ValueError("boom")
+
+    instrumentation.enable(sink)
+    with pytest.raises(ValueError):
+        asyncio.run(fails())
+    metric = sink.snapshot()['helper fails']
+    assert (metric['count'], metric['errors']) == (1, 1)
+
+
+def send_all(monkeypatch, requests, *statuses):
+    # RequestsTransport.send answers with the next status, or raises it
+    statuses = list(statuses)
+
+    def send(transport, request, **kwargs):
+        status = statuses.pop(0)
+        if isinstance(status, Exception):
+            raise status
+        return SimpleNamespace(status_code=status, headers={'Content-Length': '0'})
+
+    monkeypatch.setattr(RequestsTransport, 'send', send)
+    transport = instrumentation.InstrumentedTransport()
+    for request in requests:
+        try:
+            transport.send(request)
+        except ConnectionError:
+            pass
+
+
+def test_repeated_failed_attempt_is_a_retry(sink, monkeypatch):
+    instrumentation.enable(sink)
+    blob = HttpRequest('GET', 'https://account.blob.core.windows.net/c/a.txt')
+    other = HttpRequest('GET', 'https://account.blob.core.windows.net/c/b.txt')
+    send_all(monkeypatch, [blob, blob, blob, other, other, blob], 503, ConnectionError(), 200, 500, 200, 200)
+    metric = sink.snapshot()['blob GET blob']
+    # the 2nd and 3rd attempt at a.txt and the 2nd at b.txt repeat a failure, the last a.txt follows a success
+    assert (metric['count'], metric['retries'], metric['throttles'], metric['errors']) == (6, 3, 1, 3)
+
+
+def test_failure_on_another_thread_is_not_a_retry(sink, monkeypatch):
+    instrumentation.enable(sink)
+    blob = HttpRequest('GET', 'https://account.blob.core.windows.net/c/a.txt')
+    send_all(monkeypatch, [blob], 503)
+    thread = threading.Thread(target=send_all, args=(monkeypatch, [blob], 200))
+    thread.start()
+    thread.join()
+    assert sink.snapshot()['blob GET blob']['retries'] == 0
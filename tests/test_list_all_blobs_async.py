@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+import fakes
+
+
+@pytest.fixture
+def account(blob_service):
+    for c in range(6):
+        container = blob_service.create_container(f'container-{c}')
+        for b in range(c * 7):
+            container.upload_blob(f'blob-{b:03d}', b'x')
+    return fakes.FakeAsync(blob_service)
+
+
+def test_every_blob_once_in_listing_order_per_container(blob_script, account):
+    async def collect():
+        return [(container, blob.name) async for container, blob in
+                blob_script.list_all_blobs_async(account, max_concurrency=3, queue_size=4)]
+
+    records = asyncio.run(collect())
+    assert len(records) == sum(c * 7 for c in range(6))
+    for c in range(6):
+        assert [name for container, name in records if container == f'container-{c}'] == \
+            [f'blob-{b:03d}' for b in range(c * 7)]
+
+
+def test_stopping_early_cancels_the_listers(blob_script, account):
+    async def first_records():
+        records = blob_script.list_all_blobs_async(account, max_concurrency=3, queue_size=2)
+        taken = [await records.__anext__() for _ in range(5)]
+        await records.aclose()
+        return taken, [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    taken, still_running = asyncio.run(first_records())
+    assert len(taken) == 5
+    assert still_running == []
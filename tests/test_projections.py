@@ -0,0 +1,66 @@
+import pytest
+
+
+@pytest.fixture
+def documents(container):
+    for i in range(10):
+        container.upsert_item({'id': str(i), 'pk': f'p{i % 3}', 'value': i, 'address': {'city': f'c{i}'}})
+    return container
+
+
+def test_projection_query_names_columns_by_position(cosmos_script):
+    query = cosmos_script.projection_query(['id', 'value', 'address.city'], 'c.value > 1')
+    assert query == 'SELECT c["id"] AS f0, c["value"] AS f1, c["address"]["city"] AS f2 FROM c WHERE c.value > 1'
+
+
+def test_query_records_maps_columns_back_to_fields(cosmos_script, documents):
+    records = sorted(cosmos_script.query_records(documents, ['id', 'value', 'address.city'], 'c.value < 3'))
+    assert [(record.id, record.value, record.address_city) for record in records] == \
+        [('0', 0, 'c0'), ('1', 1, 'c1'), ('2', 2, 'c2')]
+
+
+def test_query_records_missing_field_is_none(cosmos_script, documents):
+    records = list(cosmos_script.query_records(documents, ['id', 'missing'], 'c.value = 0'))
+    assert records[0].missing is None
+
+
+def test_same_path_twice_is_one_field(cosmos_script, documents):
+    records = list(cosmos_script.query_records(documents, ['id', 'id'], 'c.value = 4'))
+    assert records == [('4',)]
+    assert records[0]._fields == ('id',)
+
+
+@pytest.mark.parametrize('paths', [['a.b', 'a_b'], ['_ts', 'ts']])
+def test_colliding_record_fields_are_rejected(cosmos_script, paths):
+    with pytest.raises(ValueError, match='would both be the record field'):
+        cosmos_script._record_spec(paths)
+
+
+def test_invalid_record_field_is_rejected(cosmos_script):
+    with pytest.raises(ValueError, match='not a valid name'):
+        cosmos_script._record_spec(['class'])
+
+
+def test_named_tuple_spec(cosmos_script, documents):
+    from typing import NamedTuple
+
+    class Summary(NamedTuple):
+        id: str
+        value: int
+
+    assert sorted(cosmos_script.query_records(documents, Summary, 'c.value >= 8')) == [('8', 8), ('9', 9)]
+
+
+def test_compare_projection(cosmos_script, documents):
+    result = cosmos_script.compare_projection(documents, ['id'], 'c.value >= 0')
+    assert result['select_star']['items'] == result['projection']['items'] == 10
+    assert result['payload_bytes_saved'] > 0
+
+
+def test_bulk_delete_on_container_partitioned_by_id(cosmos_script, cosmos_client):
+    container = cosmos_client.create_database_if_not_exists('db').create_container('by_id', partition_key_path='/id')
+    for i in range(5):
+        container.upsert_item({'id': str(i), 'value': i})
+    result = cosmos_script.bulk_delete_by_query(container, 'c.value < 3', 'id')
+    assert result['matched'] == result['deleted'] == 3
+    assert sorted(item['id'] for item in container.read_all_items()) == ['3', '4']
@@ -0,0 +1,42 @@
+import pytest
+
+
+@pytest.fixture
+def reports(blob_service):
+    container = blob_service.create_container('reports')
+    container.upload_blob('daily.csv', b'x' * 10)
+    container.upload_blob('weekly.csv', b'y' * 20)
+    container.upload_blob('no-snapshots.csv', b'z')
+    return container
+
+
+def listing(container):
+    return [(blob.name, blob.snapshot) for blob in container.list_blobs(include=['snapshots'])]
+
+
+def test_keeps_the_newest_snapshots_and_every_base_blob(blob_script, reports):
+    created = [blob_script.create_snapshots('reports', prefix='daily')['daily.csv'] for _ in range(5)]
+    weekly = [blob_script.create_snapshots('reports', prefix='weekly')['weekly.csv'] for _ in range(2)]
+
+    result = blob_script.prune_snapshots('reports', keep_last=2)
+    assert (result['blobs'], result['snapshots'], result['deleted'], result['failed']) == (2, 7, 3, 0)
+    assert result['bytes_reclaimed'] == 3 * 10
+    assert listing(reports) == [('daily.csv', created[3]), ('daily.csv', created[4]), ('daily.csv', None),
+                                ('no-snapshots.csv', None),
+                                ('weekly.csv', weekly[0]), ('weekly.csv', weekly[1]), ('weekly.csv', None)]
+
+
+def test_keep_none_deletes_only_snapshots(blob_script, reports):
+    blob_script.create_snapshots('reports')
+    result = blob_script.prune_snapshots('reports', keep_last=0)
+    assert result['deleted'] == 3
+    assert listing(reports) == [('daily.csv', None), ('no-snapshots.csv', None), ('weekly.csv', None)]
+
+
+def test_dry_run_deletes_nothing(blob_script, reports):
+    blob_script.create_snapshots('reports', prefix='daily')
+    blob_script.create_snapshots('reports', prefix='daily')
+    before = listing(reports)
+    result = blob_script.prune_snapshots('reports', keep_last=1, dry_run=True)
+    assert (result['expired'], result['deleted'], result['bytes_reclaimed']) == (1, 0, 10)
+    assert listing(reports) == before
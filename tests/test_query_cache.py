@@ -0,0 +1,104 @@
+import pytest
+
+
+@pytest.fixture
+def cache(cosmos_script):
+    return cosmos_script.CosmosQueryCache(ttl=300)
+
+
+@pytest.fixture
+def documents(container):
+    for i in range(10):
+        container.upsert_item({'id': str(i), 'pk': f'p{i % 2}', 'value': i, 'tags': ['a']})
+    return container
+
+
+class SharedHeadersContainer:
+    # another thread using the same client overwrites last_response_headers after every page
+    def __init__(self, container):
+        self.container = container
+
+    def __getattr__(self, name):
+        return getattr(self.container, name)
+
+    def query_items(self, **kwargs):
+        self.query = kwargs
+        return self
+
+    def by_page(self):
+        for page in self.container.query_items(**self.query).by_page():
+            self.container.client_connection.last_response_headers = {'x-ms-request-charge': '1000'}
+            yield page
+
+
+def test_repeated_query_is_a_hit(cache, documents):
+    first = cache.query_items(documents, "SELECT * FROM c WHERE c.value < 3")
+    second = cache.query_items(documents, "SELECT * FROM c WHERE c.value<3")
+    assert sorted(item['id'] for item in first) == sorted(item['id'] for item in second) == ['0', '1', '2']
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+    assert cache.stats['ru_saved'] == cache.stats['ru_spent'] > 0
+
+
+def test_containers_with_the_same_name_are_kept_apart(cosmos_client, cache, documents):
+    other = cosmos_client.create_database_if_not_exists('other_db').create_container_if_not_exists(
+        'items', partition_key_path='/pk')
+    other.upsert_item({'id': 'x', 'pk': 'p0', 'value': 1})
+    assert len(cache.query_items(documents, "SELECT * FROM c WHERE c.value = 1")) == 1
+    assert [item['id'] for item in cache.query_items(other, "SELECT * FROM c WHERE c.value = 1")] == ['x']
+    assert cache.stats['misses'] == 2
+
+    cache.upsert_item(other, {'id': 'y', 'pk': 'p0', 'value': 1})
+    assert len(cache.query_items(documents, "SELECT * FROM c WHERE c.value = 1")) == 1
+    assert cache.stats['hits'] == 1
+
+
+def test_request_charge_comes_from_each_response(cache, documents):
+    charges = []
+    list(documents.query_items(query="SELECT * FROM c", enable_cross_partition_query=True,
+                               response_hook=lambda headers, _: charges.append(float(headers['x-ms-request-charge']))))
+    cache.query_items(SharedHeadersContainer(documents), "SELECT * FROM c")
+    assert cache.stats['ru_spent'] == pytest.approx(sum(charges))
+
+
+def test_results_are_copies(cache, documents):
+    items = cache.query_items(documents, "SELECT * FROM c WHERE c.value = 5")
+    items[0]['value'] = 'changed'
+    items[0]['tags'].append('b')
+    items.clear()
+    again = cache.query_items(documents, "SELECT * FROM c WHERE c.value = 5")
+    assert again[0]['value'] == 5 and again[0]['tags'] == ['a']
+    assert cache.stats['hits'] == 1
+
+
+def test_write_drops_the_cached_partition(cache, documents):
+    cache.query_items(documents, "SELECT * FROM c WHERE c.value = 11", partition_key='p1')
+    cache.upsert_item(documents, {'id': '11', 'pk': 'p1', 'value': 11})
+    assert [item['id'] for item in cache.query_items(documents, "SELECT * FROM c WHERE c.value = 11",
+                                                      partition_key='p1')] == ['11']
+    assert cache.stats['invalidations'] == 1
+
+
+def test_bracket_property_names_are_kept_verbatim(cosmos_script):
+    query, parameters = cosmos_script.parameterize_query('SELECT * FROM c WHERE c["a=b"] = 1 AND c[ "x , y" ]=\'v\'')
+    assert query == 'SELECT * FROM c WHERE c["a=b"] = @lit0 AND c[ "x , y" ] = @lit1'
+    assert parameters == [{'name': '@lit0', 'value': 1}, {'name': '@lit1', 'value': 'v'}]
+
+
+def test_escaped_quote_is_one_string(cosmos_script):
+    query, parameters = cosmos_script.parameterize_query("SELECT * FROM c WHERE c.name = 'It''s' AND c.x >= -2.5")
+    assert query == "SELECT * FROM c WHERE c.name = @lit0 AND c.x >= @lit1"
+    assert parameters == [{'name': '@lit0', 'value': "It's"}, {'name': '@lit1', 'value': -2.5}]
+
+
+def test_generated_names_skip_the_callers_parameters(cosmos_script):
+    query, parameters = cosmos_script.parameterize_query(
+        "SELECT * FROM c WHERE c.a = @lit1 AND c.b = 'x' AND c.c = 'y'", [{'name': '@lit1', 'value': 1}])
+    assert query == "SELECT * FROM c WHERE c.a = @lit1 AND c.b = @lit0 AND c.c = @lit2"
+    assert parameters == [{'name': '@lit1', 'value': 1}, {'name': '@lit0', 'value': 'x'}, {'name': '@lit2', 'value': 'y'}]
+
+
+def test_cached_query_with_quoted_names_returns_the_right_items(cache, container):
+    container.upsert_item({'id': '1', 'pk': 'p', 'a=b': 1, 'name': "It's"})
+    container.upsert_item({'id': '2', 'pk': 'p', 'a = b': 1, 'name': "Its"})
+    assert [item['id'] for item in cache.query_items(container, 'SELECT * FROM c WHERE c["a=b"] = 1')] == ['1']
+    assert [item['id'] for item in cache.query_items(container, "SELECT * FROM c WHERE c.name = 'It''s'")] == ['1']
@@ -0,0 +1,70 @@
+import pytest
+from azure.cosmos import exceptions
+
+import fakes
+
+
+@pytest.fixture
+def documents(container):
+    for i in range(25):
+        container.upsert_item({'id': str(i), 'pk': f'p{i % 3}', 'value': i})
+    return container
+
+
+@pytest.fixture
+def scheduler(cosmos_script):
+    return cosmos_script.RUScheduler(ru_per_second=100000)
+
+
+def test_page_charges_come_from_each_response(scheduler, documents, monkeypatch):
+    # another thread using the same client overwrites last_response_headers after every request
+    request = fakes.FakeContainer._request
+
+    def shared(self, *args, **kwargs):
+        headers = request(self, *args, **kwargs)
+        self.client_connection.last_response_headers = {'x-ms-request-charge': '1000'}
+        return headers
+
+    monkeypatch.setattr(fakes.FakeContainer, '_request', shared)
+    charges = []
+    items = list(scheduler.query_items(documents, "SELECT * FROM c", max_item_count=10,
+                                       response_hook=lambda headers, _: charges.append(float(headers['x-ms-request-charge']))))
+    assert len(items) == 25 and len(charges) == 3
+    assert scheduler.stats['ru_charged'] == pytest.approx(sum(charges))
+
+    hooked = []
+    scheduler.run(documents.upsert_item, body={'id': 'x', 'pk': 'p0'}, response_hook=lambda headers, _: hooked.append(headers))
+    assert scheduler.stats['ru_charged'] == pytest.approx(sum(charges) + float(hooked[0]['x-ms-request-charge']))
+
+
+def test_throttled_page_is_asked_for_again(scheduler, documents, monkeypatch):
+    request = fakes.FakeContainer._request
+    calls = []
+
+    def throttled_once(self, *args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:  # the second page
+            error = exceptions.CosmosHttpResponseError(status_code=429, message="Request rate is large.")
+            error.headers = {'x-ms-retry-after-ms': '10', 'x-ms-request-charge': '0'}
+            raise error
+        return request(self, *args, **kwargs)
+
+    monkeypatch.setattr(fakes.FakeContainer, '_request', throttled_once)
+    items = list(scheduler.query_items(documents, "SELECT * FROM c", max_item_count=10))
+    assert sorted(int(item['id']) for item in items) == list(range(25))
+    assert scheduler.stats['throttled'] == 1
+    assert scheduler.stats['requests'] == 3
+
+
+def test_query_gives_up_after_max_retries(cosmos_script, documents, monkeypatch):
+    scheduler = cosmos_script.RUScheduler(ru_per_second=100000, max_retries=1)
+
+    def throttled(self, *args, **kwargs):
+        error = exceptions.CosmosHttpResponseError(status_code=429, message="Request rate is large.")
+        error.headers = {'x-ms-retry-after-ms': '10'}
+        raise error
+
+    monkeypatch.setattr(fakes.FakeContainer, '_request', throttled)
+    with pytest.raises(exceptions.CosmosHttpResponseError):
+        list(scheduler.query_items(documents, "SELECT * FROM c"))
+    assert scheduler.stats['throttled'] == 1
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import fakes
+
+
+@pytest.fixture
+def local(tmp_path):
+    for name, data in {'a.txt': b'a', 'b.txt': b'b', 'sub/c.txt': b'c'}.items():
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(data)
+    return tmp_path
+
+
+@pytest.fixture
+def target(blob_service):
+    return blob_service.create_container('target')
+
+
+def contents(container):
+    return {blob['name']: container.get_blob_client(blob['name']).download_blob().readall()
+            for blob in container.list_blobs()}
+
+
+def test_second_run_only_sends_the_delta(blob_script, local, target):
+    first = blob_script.sync_directory(str(local), 'target', prefix='n/', hash_workers=1)
+    assert (first['uploaded'], first['hashed'], first['failed']) == (3, 3, 0)
+
+    (local / 'b.txt').write_bytes(b'changed')
+    (local / 'copy-of-a.txt').write_bytes(b'a')
+    second = blob_script.sync_directory(str(local), 'target', prefix='n/', hash_workers=1)
+    assert (second['unchanged'], second['uploaded'], second['copied'], second['hashed']) == (2, 1, 1, 2)
+    assert contents(target) == {'n/a.txt': b'a', 'n/b.txt': b'changed', 'n/sub/c.txt': b'c', 'n/copy-of-a.txt': b'a'}
+
+
+def test_failed_upload_is_counted_and_resumed(blob_script, local, target, monkeypatch):
+    upload_blob = fakes.FakeBlobClient.upload_blob
+
+    def refused_for_b(self, data, **kwargs):
+        if self.blob_name.endswith('b.txt'):
+            raise fakes._status_error(500, "InternalError")
+        return upload_blob(self, data, **kwargs)
+
+    (local / 'copy-of-b.txt').write_bytes(b'b')
+    monkeypatch.setattr(fakes.FakeBlobClient, 'upload_blob', refused_for_b)
+    first = blob_script.sync_directory(str(local), 'target', hash_workers=1)
+    # b.txt failed, and copy-of-b.txt would have been copied from it
+    assert (first['uploaded'], first['copied'], first['failed']) == (2, 0, 2)
+    with open(local / '.blob_sync_manifest.json') as f:
+        assert len(json.load(f)) == 4
+
+    monkeypatch.setattr(fakes.FakeBlobClient, 'upload_blob', upload_blob)
+    second = blob_script.sync_directory(str(local), 'target', hash_workers=1)
+    assert (second['hashed'], second['unchanged'], second['uploaded'], second['copied'], second['failed']) == (0, 2, 1, 1, 0)
+    assert contents(target) == {'a.txt': b'a', 'b.txt': b'b', 'sub/c.txt': b'c', 'copy-of-b.txt': b'b'}
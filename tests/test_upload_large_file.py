@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import fakes
+
+
+@pytest.fixture
+def large_file(tmp_path):
+    path = tmp_path / 'large.bin'
+    path.write_bytes(os.urandom(10 * 1024 + 300))
+    return path
+
+
+@pytest.fixture
+def blob_client(blob_service):
+    return blob_service.create_container('uploads').get_blob_client('large.bin')
+
+
+def test_rerun_only_stages_the_missing_blocks(blob_script, large_file, blob_client, monkeypatch):
+    stage_block = fakes.FakeBlobClient.stage_block
+    staged = []
+
+    def fail_on_the_fifth_block(self, block_id, data, **kwargs):
+        if len(staged) == 4:
+            raise fakes._status_error(500, "InternalError")
+        staged.append(block_id)
+        return stage_block(self, block_id, data, **kwargs)
+
+    monkeypatch.setattr(fakes.FakeBlobClient, 'stage_block', fail_on_the_fifth_block)
+    with pytest.raises(Exception):
+        blob_script.upload_large_file(blob_client, str(large_file), block_size=1024, max_workers=1)
+    with pytest.raises(Exception):
+        blob_client.get_blob_properties()  # nothing committed
+
+    resent = []
+
+    def counted(self, block_id, data, **kwargs):
+        resent.append(block_id)
+        return stage_block(self, block_id, data, **kwargs)
+
+    monkeypatch.setattr(fakes.FakeBlobClient, 'stage_block', counted)
+    result = blob_script.upload_large_file(blob_client, str(large_file), block_size=1024, max_workers=1)
+    assert (result['blocks'], result['reused_blocks']) == (11, 4)
+    assert result['bytes_uploaded'] == 6 * 1024 + 300
+    assert not set(resent) & set(staged)
+    assert blob_client.download_blob().readall() == large_file.read_bytes()
+
+
+def test_changed_file_does_not_reuse_old_blocks(blob_script, large_file, blob_client):
+    blob_script.upload_large_file(blob_client, str(large_file), block_size=1024)
+    large_file.write_bytes(os.urandom(3 * 1024))
+    result = blob_script.upload_large_file(blob_client, str(large_file), block_size=1024)
+    assert result['reused_blocks'] == 0
+    assert blob_client.download_blob().readall() == large_file.read_bytes()